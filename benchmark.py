@@ -0,0 +1,582 @@
+"""Benchmark suite for the render, build & dry-run deploy phases of all sites."""
+
+import argparse
+import datetime
+import functools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, NamedTuple
+
+import htpy as h
+
+import build
+import deploy
+from components import component_base, component_body
+from sites import SITE_MODULE_NAMES, SITES_MAP
+from utils import PROJECT_ROOT, cache, logging_setup
+from utils.validators import Hostname
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Mapping, Sequence
+    from typing import Final
+
+__all__: Sequence[str] = (
+    "BenchmarkResult",
+    "compare_benchmark_results",
+    "load_benchmark_history",
+    "run",
+    "run_benchmarks",
+)
+
+
+BENCHMARK_HISTORY_FILE_PATH: Final[Path] = (
+    PROJECT_ROOT / ".cache/static-websites/benchmark-history.json"
+)
+
+DEFAULT_REPETITIONS: Final[int] = 5
+DEFAULT_REGRESSION_THRESHOLD: Final[float] = 0.1
+DEFAULT_IMPORT_TIME_BUDGET: Final[float] = 0.25
+DEFAULT_SYNTHETIC_PAGE_COUNTS: Final[Sequence[int]] = (1_000, 10_000)
+
+IMPORT_TIME_BENCHMARK_NAME: Final[str] = "import_time/console"
+
+# NOTE: Stands in for `ssh` during the dry-run deploy benchmark, by running the remote command locally
+LOCAL_SSH_SCRIPT: Final[str] = """#!/bin/sh
+while [ "$#" -gt 0 ]; do
+    case "$1" in
+        -[lopiF]) shift 2 ;;
+        -*) shift ;;
+        *) break ;;
+    esac
+done
+shift
+exec sh -c "$*"
+"""
+
+
+class BenchmarkResult(NamedTuple):
+    """The timings (in seconds) of every repetition of a single benchmark case."""
+
+    name: str
+    timings: Sequence[float]
+
+    @property
+    def median(self) -> float:
+        """The median time taken by a single repetition of this benchmark case."""
+        return statistics.median(self.timings)
+
+    @property
+    def minimum(self) -> float:
+        """The fastest time taken by a single repetition of this benchmark case."""
+        return min(self.timings)
+
+
+def _time_repeatedly(
+    function: Callable[[], object],
+    *,
+    repetitions: int,
+    setup: Callable[[], object] | None = None,
+) -> Sequence[float]:
+    """Time the given function, calling the (untimed) `setup` before every repetition."""
+    timings: list[float] = []
+
+    _: int
+    for _ in range(repetitions):
+        if setup is not None:
+            setup()
+
+        start_time: float = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+
+    return timings
+
+
+def _render_site_pages(site_name: str) -> None:
+    page_content: h.Element
+    for page_content in SITES_MAP[site_name].values():
+        str(page_content)
+
+
+def _build_site_into(site_name: str, site_deploy_directory: Path) -> None:
+    build.build_single_site(
+        site_name=site_name,
+        site_pages=SITES_MAP[site_name],
+        site_deploy_directory=site_deploy_directory,
+    )
+
+
+def _evict_site_modules() -> None:
+    """Remove every imported site module, so that their pages are constructed from scratch."""
+    module_name: str
+    for module_name in SITE_MODULE_NAMES.values():
+        sys.modules.pop(f"sites.{module_name}", None)
+
+
+def _reimport_site_modules() -> None:
+    """
+    Import every site module afresh.
+
+    Site pages may contain generators, which can only be rendered once,
+    so every repetition of a benchmark case must render a newly constructed set of pages.
+    """
+    _evict_site_modules()
+
+    site_name: str
+    for site_name in SITES_MAP:
+        SITES_MAP[site_name]
+
+
+def _generate_synthetic_pages(page_count: int) -> Mapping[PurePosixPath, h.HTMLElement]:
+    return {
+        PurePosixPath(f"page-{page_number:05d}/index.html"): component_base(
+            body=component_body(
+                header=h.h1[f"Synthetic page {page_number:d}"],
+                main=[
+                    h.p[f"Paragraph {paragraph_number:d} of synthetic page {page_number:d}."]
+                    for paragraph_number in range(10)
+                ],
+                footer=h.a(href="/")["Home"],
+            ),
+            page_title_prefix=page_number,
+        )
+        for page_number in range(page_count)
+    }
+
+
+def _benchmark_rendering(*, repetitions: int) -> Iterable[BenchmarkResult]:
+    site_name: str
+    for site_name in SITES_MAP:
+        yield BenchmarkResult(
+            f"render/{site_name}",
+            _time_repeatedly(
+                functools.partial(_render_site_pages, site_name),
+                repetitions=repetitions,
+                setup=_reimport_site_modules,
+            ),
+        )
+
+
+def _benchmark_single_site_builds(*, repetitions: int) -> Iterable[BenchmarkResult]:
+    temporary_directory: str
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        site_name: str
+        for site_name in SITES_MAP:
+            yield BenchmarkResult(
+                f"build_single_site/{site_name}",
+                _time_repeatedly(
+                    functools.partial(
+                        _build_site_into, site_name, Path(temporary_directory) / site_name
+                    ),
+                    repetitions=repetitions,
+                    setup=_reimport_site_modules,
+                ),
+            )
+
+
+def _benchmark_all_sites_builds(
+    *, repetitions: int, deploy_directory: Path, cache_directory: Path
+) -> Iterable[BenchmarkResult]:
+    """
+    Benchmark building all sites, from cold, warm & the site build cache.
+
+    A cold build starts without any `deploy/` directory, build cache or imported site modules,
+    whereas a warm build starts with all three left over from the previous build.
+    Neither uses the site build cache,
+    whereas a cached build restores every (unchanged) site's pages from it.
+    The given `deploy_directory` & `cache_directory` are deleted between repetitions,
+    so they must be the temporary directories that the benchmarks are redirected into.
+    """
+
+    def _reset_build() -> None:
+        shutil.rmtree(deploy_directory, ignore_errors=True)
+        _evict_site_modules()
+
+    def _reset_cold_build() -> None:
+        shutil.rmtree(cache_directory, ignore_errors=True)
+        _reset_build()
+
+    yield BenchmarkResult(
+        "build_all_sites/cold",
+        _time_repeatedly(
+            functools.partial(build.build_all_sites, use_site_cache=False),
+            repetitions=repetitions,
+            setup=_reset_cold_build,
+        ),
+    )
+    yield BenchmarkResult(
+        "build_all_sites/warm",
+        _time_repeatedly(
+            functools.partial(build.build_all_sites, use_site_cache=False),
+            repetitions=repetitions,
+            setup=_reimport_site_modules,
+        ),
+    )
+
+    _reimport_site_modules()
+    build.build_all_sites()
+    yield BenchmarkResult(
+        "build_all_sites/cached",
+        _time_repeatedly(build.build_all_sites, repetitions=repetitions, setup=_reset_build),
+    )
+
+
+def _benchmark_synthetic_builds(
+    *, repetitions: int, page_counts: Iterable[int]
+) -> Iterable[BenchmarkResult]:
+    temporary_directory: str
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        page_count: int
+        for page_count in page_counts:
+            synthetic_pages: Mapping[PurePosixPath, h.HTMLElement] = _generate_synthetic_pages(
+                page_count
+            )
+
+            yield BenchmarkResult(
+                f"build_synthetic/{page_count:d}_pages",
+                _time_repeatedly(
+                    functools.partial(
+                        build.build_single_site,
+                        site_name="synthetic",
+                        site_pages=synthetic_pages,
+                        site_deploy_directory=Path(temporary_directory) / "synthetic",
+                    ),
+                    repetitions=repetitions,
+                ),
+            )
+
+
+def _benchmark_dry_run_deploy(*, repetitions: int) -> Iterable[BenchmarkResult]:
+    """
+    Benchmark a dry-run deployment of all sites, to a local target directory.
+
+    `rsync` is run for real, but `ssh` is replaced by a script
+    that runs the remote side of the transfer locally, so no network access is needed.
+    """
+    if shutil.which("rsync") is None:
+        sys.stderr.write("Skipping dry-run deploy benchmark: `rsync` is not installed.\n")
+        return
+
+    _reimport_site_modules()
+    built_site_paths: Final[Sequence[Path]] = sorted(
+        build.build_all_sites(use_site_cache=False)
+    )
+    ORIGINAL_PATH: Final[str] = os.environ.get("PATH", "")
+
+    temporary_directory: str
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        local_ssh_path: Path = Path(temporary_directory) / "bin/ssh"
+        local_ssh_path.parent.mkdir()
+        local_ssh_path.write_text(LOCAL_SSH_SCRIPT, encoding="utf-8")
+        local_ssh_path.chmod(0o755)
+
+        os.environ["PATH"] = f"{local_ssh_path.parent}{os.pathsep}{ORIGINAL_PATH}"
+        try:
+            yield BenchmarkResult(
+                "deploy_all_sites/dry_run",
+                _time_repeatedly(
+                    functools.partial(
+                        deploy.deploy_all_sites,
+                        frozenset(built_site_paths),
+                        verbosity=0,
+                        remote_hostname=Hostname("127.0.0.1"),
+                        remote_directory=Path(temporary_directory) / "target",
+                        preflight=False,
+                        dry_run=True,
+                    ),
+                    repetitions=repetitions,
+                ),
+            )
+        finally:
+            os.environ["PATH"] = ORIGINAL_PATH
+
+
+def _benchmark_import_time(*, repetitions: int) -> Iterable[BenchmarkResult]:
+    """Benchmark the time taken to import the console entry point in a fresh interpreter."""
+
+    def _measure_import_time() -> float:
+        return float(
+            subprocess.run(
+                (
+                    sys.executable,
+                    "-c",
+                    (
+                        "import time; start_time = time.perf_counter(); import console; "
+                        "print(time.perf_counter() - start_time)"
+                    ),
+                ),
+                cwd=PROJECT_ROOT,
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+        )
+
+    yield BenchmarkResult(
+        IMPORT_TIME_BENCHMARK_NAME,
+        [_measure_import_time() for _ in range(repetitions)],
+    )
+
+
+def run_benchmarks(
+    *,
+    repetitions: int = DEFAULT_REPETITIONS,
+    synthetic_page_counts: Iterable[int] = DEFAULT_SYNTHETIC_PAGE_COUNTS,
+) -> Mapping[str, BenchmarkResult]:
+    """
+    Run every benchmark case, returning the results keyed by benchmark case name.
+
+    Every case runs locally, without any network access.
+    Sites are built into a temporary `deploy/` directory, with a temporary build cache,
+    so the developer's built sites & build cache are never replaced or evicted.
+    """
+    temporary_directory: str
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        DEPLOY_DIRECTORY: Path = Path(temporary_directory) / "deploy"
+        CACHE_DIRECTORY: Path = Path(temporary_directory) / "cache"
+
+        with (
+            build.use_deploy_directory(DEPLOY_DIRECTORY),
+            cache.use_cache_directory(CACHE_DIRECTORY),
+        ):
+            return {
+                benchmark_result.name: benchmark_result
+                for benchmark_results in (
+                    _benchmark_import_time(repetitions=repetitions),
+                    _benchmark_rendering(repetitions=repetitions),
+                    _benchmark_single_site_builds(repetitions=repetitions),
+                    _benchmark_all_sites_builds(
+                        repetitions=repetitions,
+                        deploy_directory=DEPLOY_DIRECTORY,
+                        cache_directory=CACHE_DIRECTORY,
+                    ),
+                    _benchmark_synthetic_builds(
+                        repetitions=repetitions, page_counts=synthetic_page_counts
+                    ),
+                    _benchmark_dry_run_deploy(repetitions=repetitions),
+                )
+                for benchmark_result in benchmark_results
+            }
+
+
+def load_benchmark_history() -> Sequence[Mapping[str, BenchmarkResult]]:
+    """Load the results of every previously recorded benchmark run, oldest first."""
+    if not BENCHMARK_HISTORY_FILE_PATH.is_file():
+        return []
+
+    raw_benchmark_history: object = json.loads(
+        BENCHMARK_HISTORY_FILE_PATH.read_text(encoding="utf-8")
+    )
+    if not isinstance(raw_benchmark_history, list):
+        INVALID_BENCHMARK_HISTORY_MESSAGE: Final[str] = (
+            f"Invalid benchmark history file: {BENCHMARK_HISTORY_FILE_PATH}"
+        )
+        raise TypeError(INVALID_BENCHMARK_HISTORY_MESSAGE)
+
+    return [
+        {
+            benchmark_name: BenchmarkResult(
+                benchmark_name, [float(timing) for timing in raw_benchmark_result["timings"]]
+            )
+            for benchmark_name, raw_benchmark_result in raw_benchmark_run["results"].items()
+        }
+        for raw_benchmark_run in raw_benchmark_history
+    ]
+
+
+def _record_benchmark_results(benchmark_results: Mapping[str, BenchmarkResult]) -> None:
+    raw_benchmark_history: list[object] = (
+        json.loads(BENCHMARK_HISTORY_FILE_PATH.read_text(encoding="utf-8"))
+        if BENCHMARK_HISTORY_FILE_PATH.is_file()
+        else []
+    )
+    raw_benchmark_history.append(
+        {
+            "timestamp": datetime.datetime.now(tz=datetime.UTC).isoformat(),
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "results": {
+                benchmark_result.name: {
+                    "median": benchmark_result.median,
+                    "minimum": benchmark_result.minimum,
+                    "timings": list(benchmark_result.timings),
+                }
+                for benchmark_result in benchmark_results.values()
+            },
+        }
+    )
+
+    BENCHMARK_HISTORY_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    temporary_benchmark_history_file_path: Path = BENCHMARK_HISTORY_FILE_PATH.with_suffix(
+        ".json.tmp"
+    )
+    temporary_benchmark_history_file_path.write_text(
+        f"{json.dumps(raw_benchmark_history, indent=4)}\n", encoding="utf-8"
+    )
+    temporary_benchmark_history_file_path.replace(BENCHMARK_HISTORY_FILE_PATH)
+
+
+def compare_benchmark_results(
+    baseline_results: Mapping[str, BenchmarkResult],
+    current_results: Mapping[str, BenchmarkResult],
+    *,
+    regression_threshold: float = DEFAULT_REGRESSION_THRESHOLD,
+) -> Sequence[str]:
+    """
+    Get the names of every benchmark case that has regressed beyond the given threshold.
+
+    Cases are compared by their median timings,
+    with the threshold given as a fraction of the baseline (e.g. `0.1` for 10% slower).
+    Cases missing from either set of results are never considered to have regressed.
+    """
+    return [
+        benchmark_name
+        for benchmark_name, current_result in current_results.items()
+        if benchmark_name in baseline_results
+        and current_result.median
+        > baseline_results[benchmark_name].median * (1 + regression_threshold)
+    ]
+
+
+def _format_benchmark_results(
+    current_results: Mapping[str, BenchmarkResult],
+    baseline_results: Mapping[str, BenchmarkResult] | None,
+    *,
+    flagged_benchmark_names: Iterable[str],
+) -> str:
+    FLAGGED_BENCHMARK_NAMES: Final[frozenset[str]] = frozenset(flagged_benchmark_names)
+    NAME_COLUMN_WIDTH: Final[int] = max(map(len, current_results), default=0)
+
+    formatted_lines: list[str] = [
+        f"{'Benchmark':<{NAME_COLUMN_WIDTH}}  {'Median':>10}  {'Minimum':>10}"
+        + (f"  {'Baseline':>10}  {'Change':>8}" if baseline_results is not None else "")
+    ]
+
+    benchmark_name: str
+    current_result: BenchmarkResult
+    for benchmark_name, current_result in current_results.items():
+        formatted_line: str = (
+            f"{benchmark_name:<{NAME_COLUMN_WIDTH}}  "
+            f"{current_result.median * 1000:>8.1f}ms  {current_result.minimum * 1000:>8.1f}ms"
+        )
+
+        baseline_result: BenchmarkResult | None = (
+            baseline_results.get(benchmark_name) if baseline_results is not None else None
+        )
+        if baseline_result is not None:
+            formatted_line += (
+                f"  {baseline_result.median * 1000:>8.1f}ms  "
+                f"{(current_result.median / baseline_result.median - 1):>+8.1%}"
+            )
+
+        if benchmark_name in FLAGGED_BENCHMARK_NAMES:
+            formatted_line += "  REGRESSION"
+
+        formatted_lines.append(formatted_line)
+
+    return "\n".join(formatted_lines)
+
+
+def _get_argument_parser() -> argparse.ArgumentParser:
+    argument_parser: Final[argparse.ArgumentParser] = argparse.ArgumentParser(
+        prog="python -m benchmark", description=__doc__
+    )
+    argument_parser.add_argument(
+        "--repetitions",
+        type=int,
+        default=DEFAULT_REPETITIONS,
+        help="Number of timed repetitions of each benchmark case. (Default: %(default)d)",
+    )
+    argument_parser.add_argument(
+        "--synthetic-page-counts",
+        type=int,
+        nargs="*",
+        default=list(DEFAULT_SYNTHETIC_PAGE_COUNTS),
+        help="Numbers of generated pages to build in the synthetic scale cases.",
+    )
+    argument_parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Compare against the previously recorded run & fail if any case has regressed.",
+    )
+    argument_parser.add_argument(
+        "--regression-threshold",
+        type=float,
+        default=DEFAULT_REGRESSION_THRESHOLD,
+        help="Fractional slow-down counted as a regression. (Default: %(default)g)",
+    )
+    argument_parser.add_argument(
+        "--import-time-budget",
+        type=float,
+        default=DEFAULT_IMPORT_TIME_BUDGET,
+        help="Maximum median seconds to import the console module. (Default: %(default)g)",
+    )
+    argument_parser.add_argument(
+        "--no-record",
+        action="store_true",
+        help="Do not save the results of this run to the benchmark history file.",
+    )
+    return argument_parser
+
+
+def run(argv: Sequence[str] | None = None) -> int:
+    """Run the benchmark suite, returning a non-zero exit code if any case has regressed."""
+    parsed_arguments: Final[argparse.Namespace] = _get_argument_parser().parse_args(argv)
+
+    logging_setup.setup(verbosity=0)
+
+    benchmark_history: Final[Sequence[Mapping[str, BenchmarkResult]]] = (
+        load_benchmark_history() if parsed_arguments.compare else []
+    )
+    baseline_results: Final[Mapping[str, BenchmarkResult] | None] = (
+        benchmark_history[-1] if benchmark_history else None
+    )
+
+    current_results: Final[Mapping[str, BenchmarkResult]] = run_benchmarks(
+        repetitions=parsed_arguments.repetitions,
+        synthetic_page_counts=parsed_arguments.synthetic_page_counts,
+    )
+
+    flagged_benchmark_names: list[str] = (
+        list(
+            compare_benchmark_results(
+                baseline_results,
+                current_results,
+                regression_threshold=parsed_arguments.regression_threshold,
+            )
+        )
+        if baseline_results is not None
+        else []
+    )
+
+    import_time_result: BenchmarkResult | None = current_results.get(
+        IMPORT_TIME_BENCHMARK_NAME
+    )
+    if (
+        import_time_result is not None
+        and import_time_result.median > parsed_arguments.import_time_budget
+        and IMPORT_TIME_BENCHMARK_NAME not in flagged_benchmark_names
+    ):
+        flagged_benchmark_names.append(IMPORT_TIME_BENCHMARK_NAME)
+
+    formatted_benchmark_results: Final[str] = _format_benchmark_results(
+        current_results, baseline_results, flagged_benchmark_names=flagged_benchmark_names
+    )
+    sys.stdout.write(f"{formatted_benchmark_results}\n")
+
+    if not parsed_arguments.no_record:
+        _record_benchmark_results(current_results)
+
+    return 1 if flagged_benchmark_names else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -1,33 +1,67 @@
 """Build and render functions for whole sites and single HTML pages."""
 
+import contextlib
 import logging
+import os
 import shutil
 import traceback
-from logging import LoggerAdapter
-from subprocess import CalledProcessError
+from pathlib import Path
+from subprocess import CalledProcessError, TimeoutExpired
 from typing import TYPE_CHECKING
 
-from sites import SITES_MAP
-from utils import PROJECT_ROOT
+from sites import (
+    DEFAULT_MAX_INLINED_ASSET_SIZE,
+    DEFAULT_PERFORMANCE_BUDGET,
+    SITE_MAX_INLINED_ASSET_SIZES,
+    SITE_PERFORMANCE_BUDGETS,
+    SITES_MAP,
+)
+from utils import (
+    PROJECT_ROOT,
+    asset_inlining,
+    budgets,
+    get_source_date_epoch,
+    logging_setup,
+    manifest,
+    memory,
+    page_stages,
+    profiling,
+    sass_compilation,
+    script_bundling,
+    site_cache,
+    tracing,
+)
 
 if TYPE_CHECKING:
-    from collections.abc import Mapping, Sequence
+    from collections.abc import Iterator, Mapping, Sequence
     from collections.abc import Set as AbstractSet
-    from logging import Logger
-    from pathlib import Path, PurePosixPath
+    from logging import Logger, LoggerAdapter
+    from pathlib import PurePosixPath
     from typing import Final
 
     import htpy as h
 
     from utils import CaughtException
 
-__all__: Sequence[str] = ("build_all_sites", "build_single_page", "build_single_site")
+__all__: Sequence[str] = (
+    "DEPLOY_DIRECTORY",
+    "build_all_sites",
+    "build_single_page",
+    "build_single_site",
+    "check_site_performance_budget",
+    "get_site_deploy_directory",
+    "report_build_outcomes",
+    "restore_single_site",
+    "try_build_single_site",
+    "use_deploy_directory",
+)
 
 
 logger: Final[Logger] = logging.getLogger("static-websites-builder")
-extra_context_logger: Final[Logger] = logging.getLogger(
-    "static-websites-builder-extra-context"
-)
+
+DEPLOY_DIRECTORY: Final[Path] = PROJECT_ROOT / "deploy"
+
+_deploy_directory: Path = DEPLOY_DIRECTORY
 
 
 def build_single_page(
@@ -44,104 +78,367 @@ def build_single_page(
         )
         raise ValueError(INVALID_PAGE_PATH_MESSAGE)
 
-    PAGE_LOGGER: LoggerAdapter[Logger] = LoggerAdapter(
-        extra_context_logger, {"extra_context": f"{site_name}/{page_path.as_posix()}"}
+    PAGE_LOGGER: LoggerAdapter[Logger] = logging_setup.get_context_logger(
+        f"{site_name}/{page_path.as_posix()}"
     )
 
     DEPLOY_PAGE_PATH: Path = site_deploy_directory / page_path
 
-    DEPLOY_PAGE_PATH.parent.mkdir(parents=True, exist_ok=True)
-
-    rendered_page: str = str(page_content)
+    span_attributes: dict[str, int | str]
+    with tracing.span(
+        "build_single_page",
+        phase="build-page",
+        site_name=site_name,
+        page_path=page_path.as_posix(),
+    ) as span_attributes:
+        DEPLOY_PAGE_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+        with (
+            profiling.profile_phase("render", site_name=site_name),
+            memory.measure_phase("render", site_name=site_name),
+        ):
+            rendered_page: str = f"{str(page_content).strip()}\n"
+
+        PAGE_LOGGER.debug("HTML successfully rendered.")
+
+        with (
+            profiling.profile_phase("page-stages", site_name=site_name),
+            memory.measure_phase("page-stages", site_name=site_name),
+        ):
+            rendered_page = page_stages.apply_page_stages(
+                rendered_page, page_path=page_path, site_deploy_directory=site_deploy_directory
+            )
 
-    PAGE_LOGGER.debug("HTML successfully rendered.")
+        with (
+            profiling.profile_phase("write", site_name=site_name),
+            memory.measure_phase("write", site_name=site_name),
+        ):
+            encoded_page: bytes = rendered_page.encode("utf-8")
+            DEPLOY_PAGE_PATH.write_bytes(encoded_page)
 
-    DEPLOY_PAGE_PATH.write_text(f"{rendered_page.strip()}\n", encoding="utf-8")
+        span_attributes["bytes"] = len(encoded_page)
 
     PAGE_LOGGER.debug("Rendered HTML file successfully saved to `deploy/` directory.")
 
 
+def _normalise_modification_times(site_deploy_directory: Path, timestamp: int) -> None:
+    """
+    Set the modification time of every file & directory within the given site to `timestamp`.
+
+    This prevents the time of the build (or of the checkout of the static files)
+    from leaking into the uploaded site, when building reproducibly.
+    """
+    directory_path: str
+    directory_names: list[str]
+    file_names: list[str]
+    for directory_path, directory_names, file_names in os.walk(
+        site_deploy_directory, topdown=False
+    ):
+        entry_name: str
+        for entry_name in (*directory_names, *file_names):
+            os.utime(
+                Path(directory_path) / entry_name,
+                (timestamp, timestamp),
+                follow_symlinks=False,
+            )
+
+    os.utime(site_deploy_directory, (timestamp, timestamp))
+
+
+def _prepare_site_deploy_directory(
+    *, site_name: str, site_deploy_directory: Path, site_logger: LoggerAdapter[Logger]
+) -> int | None:
+    """
+    Create an empty `deploy/` directory for the given site, containing its static files.
+
+    Returns the `SOURCE_DATE_EPOCH` that the site is being built reproducibly with, if any.
+    """
+    site_logger.debug("Creating `deploy/` directory.")
+
+    if site_deploy_directory.exists():
+        shutil.rmtree(site_deploy_directory)
+    site_deploy_directory.mkdir(parents=True)
+
+    source_date_epoch: int | None = get_source_date_epoch()
+    static_dir: Path = PROJECT_ROOT / f"static/{site_name}"
+    with profiling.profile_phase("static-linking", site_name=site_name):
+        if static_dir.is_dir() and source_date_epoch is None:
+            site_logger.debug(
+                "Creating symlink to original static directory "
+                "from inside `deploy/` directory."
+            )
+            (site_deploy_directory / "static").symlink_to(static_dir, target_is_directory=True)
+
+        elif static_dir.is_dir():
+            # NOTE: Static files are copied (rather than linked) when building reproducibly,
+            # so that their modification times can be normalised without touching originals
+            site_logger.debug("Copying original static directory into `deploy/` directory.")
+            shutil.copytree(static_dir, site_deploy_directory / "static")
+
+    return source_date_epoch
+
+
+def _finalise_site_deploy_directory(
+    *, site_name: str, site_deploy_directory: Path, source_date_epoch: int | None
+) -> manifest.Manifest:
+    """
+    Apply every whole-site optimisation to the given site, then save its manifest.
+
+    This is also applied to sites restored from the build cache,
+    because the optimisations create & change static files (which are not cached).
+    """
+    with profiling.profile_phase("sass-compilation", site_name=site_name):
+        sass_compilation.compile_site_stylesheets(site_deploy_directory=site_deploy_directory)
+
+    with profiling.profile_phase("script-bundling", site_name=site_name):
+        script_bundling.bundle_site_scripts(site_deploy_directory=site_deploy_directory)
+
+    max_inlined_asset_size: Final[int | None] = SITE_MAX_INLINED_ASSET_SIZES.get(
+        site_name, DEFAULT_MAX_INLINED_ASSET_SIZE
+    )
+    if max_inlined_asset_size is not None:
+        with profiling.profile_phase("asset-inlining", site_name=site_name):
+            asset_inlining.inline_site_assets(
+                site_deploy_directory=site_deploy_directory,
+                max_inlined_size=max_inlined_asset_size,
+            )
+
+    if source_date_epoch is not None:
+        _normalise_modification_times(site_deploy_directory, source_date_epoch)
+
+    with profiling.profile_phase("manifest", site_name=site_name):
+        return manifest.create_site_manifest(site_deploy_directory)
+
+
 def build_single_site(
     *,
     site_name: str,
     site_pages: Mapping[PurePosixPath, h.Element],
     site_deploy_directory: Path,
+    site_fingerprint: str | None = None,
 ) -> None:
-    """Render a single site's HTML pages into string outputs."""
-    SITE_LOGGER: Final[LoggerAdapter[Logger]] = LoggerAdapter(
-        extra_context_logger, {"extra_context": site_name}
-    )
+    """
+    Render a single site's HTML pages into string outputs.
+
+    If `site_fingerprint` is given, the rendered pages are stored in the build cache
+    before any whole-site optimisations are applied,
+    so that restoring them later can apply those optimisations again.
+    """
+    SITE_LOGGER: Final[LoggerAdapter[Logger]] = logging_setup.get_context_logger(site_name)
 
     SITE_LOGGER.debug("Begin building single site.")
 
-    SITE_LOGGER.debug("Creating `deploy/` directory.")
+    span_attributes: dict[str, int | str]
+    with tracing.span(
+        "build_single_site", phase="build", site_name=site_name
+    ) as span_attributes:
+        source_date_epoch: int | None = _prepare_site_deploy_directory(
+            site_name=site_name,
+            site_deploy_directory=site_deploy_directory,
+            site_logger=SITE_LOGGER,
+        )
 
-    if site_deploy_directory.exists():
-        shutil.rmtree(site_deploy_directory)
-    site_deploy_directory.mkdir(parents=True)
+        page_path: PurePosixPath
+        page_content: h.Element
+        for page_path, page_content in site_pages.items():
+            build_single_page(
+                page_path=page_path,
+                page_content=page_content,
+                site_name=site_name,
+                site_deploy_directory=site_deploy_directory,
+            )
 
-    SITE_LOGGER.debug(
-        "Creating symlink to original static directory from inside `deploy/` directory."
-    )
+        if site_fingerprint is not None:
+            site_cache.store_site_pages(
+                site_fingerprint,
+                site_deploy_directory=site_deploy_directory,
+                page_paths=site_pages.keys(),
+            )
 
-    static_dir: Path = PROJECT_ROOT / f"static/{site_name}"
-    if static_dir.is_dir():
-        (site_deploy_directory / "static").symlink_to(static_dir, target_is_directory=True)
-
-    page_path: PurePosixPath
-    page_content: h.Element
-    for page_path, page_content in site_pages.items():
-        build_single_page(
-            page_path=page_path,
-            page_content=page_content,
+        site_manifest: manifest.Manifest = _finalise_site_deploy_directory(
             site_name=site_name,
             site_deploy_directory=site_deploy_directory,
+            source_date_epoch=source_date_epoch,
         )
 
+        span_attributes["page_count"] = len(site_pages)
+        span_attributes["bytes"] = site_manifest.total_size
+        span_attributes["html_bytes"] = site_manifest.html_size
+
+    SITE_LOGGER.debug("Site manifest successfully saved alongside `deploy/` directory.")
+
     SITE_LOGGER.debug("Completed building single site successfully.")
 
 
-def build_all_sites() -> AbstractSet[Path]:
-    """Render all sites HTML pages into string outputs."""
-    logger.info("Begin building all sites.")
+def restore_single_site(
+    *,
+    site_name: str,
+    cached_pages: Mapping[PurePosixPath, bytes],
+    site_deploy_directory: Path,
+) -> None:
+    """
+    Save a single site's previously rendered HTML pages, without rendering them again.
+
+    The site's `deploy/` directory is otherwise created exactly as by `build_single_site()`.
+    """
+    SITE_LOGGER: Final[LoggerAdapter[Logger]] = logging_setup.get_context_logger(site_name)
+
+    SITE_LOGGER.debug("Begin restoring single site from build cache.")
+
+    span_attributes: dict[str, int | str]
+    with tracing.span(
+        "restore_single_site", phase="build", site_name=site_name, restored=1
+    ) as span_attributes:
+        source_date_epoch: int | None = _prepare_site_deploy_directory(
+            site_name=site_name,
+            site_deploy_directory=site_deploy_directory,
+            site_logger=SITE_LOGGER,
+        )
+
+        page_path: PurePosixPath
+        page_content: bytes
+        for page_path, page_content in cached_pages.items():
+            if page_path.is_absolute():
+                INVALID_PAGE_PATH_MESSAGE: str = (
+                    "Page path must be relative to site name "
+                    "(cannot be an absolute `PurePosixPath`)."
+                )
+                raise ValueError(INVALID_PAGE_PATH_MESSAGE)
+
+            deploy_page_path: Path = site_deploy_directory / page_path
+            deploy_page_path.parent.mkdir(parents=True, exist_ok=True)
+            deploy_page_path.write_bytes(page_content)
+
+        site_manifest: manifest.Manifest = _finalise_site_deploy_directory(
+            site_name=site_name,
+            site_deploy_directory=site_deploy_directory,
+            source_date_epoch=source_date_epoch,
+        )
+
+        span_attributes["page_count"] = len(cached_pages)
+        span_attributes["bytes"] = site_manifest.total_size
+        span_attributes["html_bytes"] = site_manifest.html_size
+
+    SITE_LOGGER.debug("Completed restoring single site from build cache successfully.")
+
+
+@contextlib.contextmanager
+def use_deploy_directory(deploy_directory: Path) -> Iterator[None]:
+    """
+    Build sites into the given directory (rather than `deploy/`), until this context exits.
+
+    This keeps throwaway builds (e.g. benchmarks) from replacing the real built sites.
+    """
+    global _deploy_directory  # noqa: PLW0603
+
+    original_deploy_directory: Final[Path] = _deploy_directory
+    _deploy_directory = deploy_directory
+    try:
+        yield
+    finally:
+        _deploy_directory = original_deploy_directory
 
-    built_sites: dict[Path, CaughtException | None] = {}
 
-    site_name: str
-    site_pages: Mapping[PurePosixPath, h.Element]
-    for site_name, site_pages in SITES_MAP.items():
-        site_deploy_directory: Path = PROJECT_ROOT / f"deploy/{site_name}"
+def get_site_deploy_directory(site_name: str) -> Path:
+    """Get the path of the `deploy/` directory that the given site will be built into."""
+    return _deploy_directory / site_name
 
-        try:
-            build_single_site(
+
+def check_site_performance_budget(*, site_name: str, site_deploy_directory: Path) -> None:
+    """
+    Check the given built site's pages against its configured performance budget.
+
+    `PerformanceBudgetExceededError` is raised if any page exceeds the budget,
+    so that the site is reported as failing to build (and is not deployed).
+    """
+    with profiling.profile_phase("budgets", site_name=site_name):
+        budgets.check_site_budget(
+            site_name,
+            site_deploy_directory=site_deploy_directory,
+            site_manifest=manifest.load_site_manifest(site_deploy_directory),
+            budget=SITE_PERFORMANCE_BUDGETS.get(site_name, DEFAULT_PERFORMANCE_BUDGET),
+        )
+
+
+def try_build_single_site(
+    *, site_name: str, use_site_cache: bool = True
+) -> CaughtException | None:
+    """
+    Build the single given site, returning (rather than raising) any caught exception.
+
+    This allows a single site's build failure to be isolated from the building of other sites.
+    If `use_site_cache` is set, and none of the site's inputs have changed since it was
+    last built, the site's pages are restored from the build cache
+    (without the site's module ever being imported).
+    Either way, the site is then checked against its performance budget.
+    """
+    SITE_DEPLOY_DIRECTORY: Final[Path] = get_site_deploy_directory(site_name)
+
+    try:
+        site_fingerprint: str | None = (
+            site_cache.get_site_fingerprint(site_name) if use_site_cache else None
+        )
+        cached_pages: Mapping[PurePosixPath, bytes] | None = (
+            site_cache.load_site_pages(site_fingerprint)
+            if site_fingerprint is not None
+            else None
+        )
+
+        if cached_pages is not None:
+            restore_single_site(
                 site_name=site_name,
-                site_pages=site_pages,
-                site_deploy_directory=site_deploy_directory,
+                cached_pages=cached_pages,
+                site_deploy_directory=SITE_DEPLOY_DIRECTORY,
             )
-        except (
-            ValueError,
-            RuntimeError,
-            AttributeError,
-            TypeError,
-            OSError,
-            CalledProcessError,
-        ) as caught_exception:
-            built_sites[site_deploy_directory] = caught_exception
-            continue
-        else:
-            built_sites[site_deploy_directory] = None
+            check_site_performance_budget(
+                site_name=site_name, site_deploy_directory=SITE_DEPLOY_DIRECTORY
+            )
+            return None
+
+        with (
+            profiling.profile_phase("import", site_name=site_name),
+            memory.measure_phase("import", site_name=site_name),
+        ):
+            site_pages: Mapping[PurePosixPath, h.Element] = SITES_MAP[site_name]
 
+        build_single_site(
+            site_name=site_name,
+            site_pages=site_pages,
+            site_deploy_directory=SITE_DEPLOY_DIRECTORY,
+            site_fingerprint=site_fingerprint,
+        )
+        check_site_performance_budget(
+            site_name=site_name, site_deploy_directory=SITE_DEPLOY_DIRECTORY
+        )
+    except (
+        ValueError,
+        RuntimeError,
+        AttributeError,
+        TypeError,
+        OSError,
+        CalledProcessError,
+        TimeoutExpired,
+    ) as caught_exception:
+        return caught_exception
+
+    return None
+
+
+def report_build_outcomes(
+    built_sites: Mapping[Path, CaughtException | None],
+) -> AbstractSet[Path]:
+    """Log the failure of any of the given site builds, then return the successful ones."""
     site_path: Path
     build_outcome: CaughtException | None
     for site_path, build_outcome in built_sites.items():
         FORMATTED_SITE_NAME: str = (
             site_path.parent.name if site_path.name == "deploy" else site_path.name
         )
-        site_name_logger: LoggerAdapter[Logger] = LoggerAdapter(
-            extra_context_logger, {"extra_context": FORMATTED_SITE_NAME}
+        site_name_logger: LoggerAdapter[Logger] = logging_setup.get_context_logger(
+            FORMATTED_SITE_NAME
         )
-        build_failed_logger: LoggerAdapter[Logger] = LoggerAdapter(
-            extra_context_logger, {"extra_context": f"{FORMATTED_SITE_NAME} | Build Failed"}
+        build_failed_logger: LoggerAdapter[Logger] = logging_setup.get_context_logger(
+            f"{FORMATTED_SITE_NAME} | Build Failed"
         )
 
         if build_outcome is None:
@@ -150,7 +447,8 @@ def build_all_sites() -> AbstractSet[Path]:
         traceback_messages: Sequence[str] = traceback.format_exception(build_outcome)
 
         build_failed_logger.error(traceback_messages[-1].strip())
-        site_name_logger.debug("%s\n", "".join(traceback_messages[:-1]).strip())
+        if site_name_logger.isEnabledFor(logging.DEBUG):
+            site_name_logger.debug("%s\n", "".join(traceback_messages[:-1]).strip())
 
     built_site_paths: AbstractSet[Path] = {
         site_path for site_path, build_outcome in built_sites.items() if build_outcome is None
@@ -160,3 +458,27 @@ def build_all_sites() -> AbstractSet[Path]:
         logger.info("Building all sites completed successfully.")
 
     return built_site_paths
+
+
+def build_all_sites(
+    *, site_names: AbstractSet[str] | None = None, use_site_cache: bool = True
+) -> AbstractSet[Path]:
+    """
+    Render all sites HTML pages into string outputs.
+
+    If `site_names` is given, only those sites will be built
+    (the modules of any other sites are never imported).
+    See `try_build_single_site()` for the meaning of `use_site_cache`.
+    """
+    logger.info("Begin building all sites.")
+
+    with tracing.span("build_all_sites", phase="build-all"):
+        return report_build_outcomes(
+            {
+                get_site_deploy_directory(site_name): try_build_single_site(
+                    site_name=site_name, use_site_cache=use_site_cache
+                )
+                for site_name in SITES_MAP
+                if site_names is None or site_name in site_names
+            }
+        )
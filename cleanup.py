@@ -2,32 +2,26 @@
 
 import logging
 import shutil
-from logging import LoggerAdapter
 from typing import TYPE_CHECKING, Final
 
-from utils import PROJECT_ROOT
+from utils import PROJECT_ROOT, cache, logging_setup
 
 if TYPE_CHECKING:
     from collections.abc import Sequence
-    from logging import Logger
+    from logging import Logger, LoggerAdapter
     from pathlib import Path
     from typing import Final
 
-__all__: Sequence[str] = ("cleanup_all_sites",)
+__all__: Sequence[str] = ("cleanup_all_sites", "cleanup_cache")
 
 
 logger: Final[Logger] = logging.getLogger("static-websites-builder")
-extra_context_logger: Final[Logger] = logging.getLogger(
-    "static-websites-builder-extra-context"
-)
 
 
 def cleanup_all_sites(*, dry_run: bool = True) -> None:
     """Delete any temporary build/deploy directories created for all sites."""
     dry_run_logger: Final[LoggerAdapter[Logger] | Logger] = (
-        LoggerAdapter(extra_context_logger, {"extra_context": "dry_run=True"})
-        if dry_run
-        else logger
+        logging_setup.get_context_logger("dry_run=True") if dry_run else logger
     )
 
     dry_run_logger.debug("Running clean-up on all sites.")
@@ -37,3 +31,28 @@ def cleanup_all_sites(*, dry_run: bool = True) -> None:
         shutil.rmtree(deploy_dir)
 
     dry_run_logger.debug("Successfully completed clean-up on all sites.")
+
+
+def cleanup_cache(
+    *, max_size: int | None = cache.DEFAULT_MAX_CACHE_SIZE, max_age: float | None = None
+) -> None:
+    """
+    Evict the least recently used entries from the persistent build cache.
+
+    Unlike `cleanup_all_sites()`, the cache is never wiped entirely;
+    only entries unused for `max_age` seconds, or beyond the `max_size` limit, are evicted.
+    """
+    logger.debug("Running clean-up of build cache.")
+
+    garbage_collection_outcome: cache.GarbageCollectionOutcome = cache.collect_garbage(
+        max_size=max_size, max_age=max_age
+    )
+
+    if garbage_collection_outcome.evicted_count:
+        logger.info(
+            "Evicted %d entries (%d bytes) from build cache.",
+            garbage_collection_outcome.evicted_count,
+            garbage_collection_outcome.evicted_size,
+        )
+
+    logger.debug("Successfully completed clean-up of build cache.")
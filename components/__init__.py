@@ -7,6 +7,7 @@ import htpy as h
 from markupsafe import Markup
 
 import utils
+from utils.page_stages.resource_hints import RESOURCE_HINTS_COMMENT
 
 if TYPE_CHECKING:
     from collections.abc import Mapping, Sequence
@@ -96,8 +97,14 @@ def component_base(  # noqa: PLR0913
     theme_colour_secondary: str | None = None,
     extra_head: h.Node | None = None,
     extra_html_tag_properties: Mapping[str, h.Attribute] | None = None,
+    resource_hints: bool = True,
 ) -> h.HTMLElement:
-    """Generate base site component."""
+    """
+    Generate base site component.
+
+    Unless disabled, resource hints are added to the head once the page has been rendered
+    (see `utils.page_stages.resource_hints`).
+    """
     if page_title_prefix is not None:
         if not isinstance(page_title, (str, int, bool)):
             INVALID_PAGE_TITLE_TYPE_MESSAGE: Final[str] = (
@@ -172,6 +179,7 @@ def component_base(  # noqa: PLR0913
             h.meta(charset="utf-8"),
             h.meta(content="IE=edge", http_equiv="X-UA-Compatible"),
             viewport_meta,
+            h.comment(RESOURCE_HINTS_COMMENT) if resource_hints else None,
             h.link(href=site_url, rel="canonical"),
             stylesheets,
             h.link(href="/favicon.ico", rel="shortcut icon", type="image/png"),
@@ -183,7 +191,7 @@ def component_base(  # noqa: PLR0913
                     sizes=f"{favicon_png_size}x{favicon_png_size}",
                     type="image/png",
                 )
-                for favicon_png_size in favicon_png_sizes
+                for favicon_png_size in sorted(favicon_png_sizes)
             ),
             h.link(href="/site.webmanifest", rel="manifest"),
             (
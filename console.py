@@ -9,7 +9,19 @@ from typing import TYPE_CHECKING, overload
 import build
 import cleanup
 import deploy
-from utils import logging_setup, validators
+import pipeline
+import sites
+import utils
+from utils import (
+    cache,
+    change_detection,
+    logging_setup,
+    memory,
+    metrics,
+    profiling,
+    tracing,
+    validators,
+)
 
 if TYPE_CHECKING:
     from collections.abc import Sequence
@@ -104,7 +116,164 @@ def _get_validated_string_environment_variable[T: validators.SimpleValidator[str
     return validator(raw_value)
 
 
-def run() -> int:
+def _get_positive_integer_env_variable(environment_variable_name: str, *, default: int) -> int:
+    raw_integer: str = os.environ.get(
+        f"{ENVIRONMENT_VARIABLE_PREFIX}{environment_variable_name.upper()}", str(default)
+    ).strip()
+
+    integer: int = int(raw_integer)
+    if integer < 1:
+        INVALID_POSITIVE_INTEGER_MESSAGE: Final[str] = (
+            f"Invalid positive integer value: {raw_integer!r}."
+        )
+        raise ValueError(INVALID_POSITIVE_INTEGER_MESSAGE)
+
+    return integer
+
+
+def _get_optional_positive_integer_env_variable(environment_variable_name: str) -> int | None:
+    if f"{ENVIRONMENT_VARIABLE_PREFIX}{environment_variable_name.upper()}" not in os.environ:
+        return None
+
+    return _get_positive_integer_env_variable(environment_variable_name, default=1)
+
+
+def _parse_remote_target(raw_remote_target: str) -> deploy.DeployTarget:
+    """
+    Parse a single `[username@]hostname[:directory]` remote target string.
+
+    IPv6 addresses must be enclosed in square brackets if they are followed by a directory.
+    """
+    raw_username: str
+    raw_host_and_directory: str
+    raw_username, _, raw_host_and_directory = raw_remote_target.rpartition("@")
+
+    raw_hostname: str
+    raw_directory: str
+    if raw_host_and_directory.startswith("["):
+        raw_hostname, _, raw_directory = raw_host_and_directory[1:].partition("]")
+        raw_directory = raw_directory.removeprefix(":")
+    elif raw_host_and_directory.count(":") > 1:
+        raw_hostname, raw_directory = raw_host_and_directory, ""
+    else:
+        raw_hostname, _, raw_directory = raw_host_and_directory.partition(":")
+
+    return deploy.DeployTarget(
+        hostname=validators.Hostname(raw_hostname),
+        username=validators.Username(raw_username) if raw_username.strip() else None,
+        directory=Path(raw_directory.strip()) if raw_directory.strip() else None,
+    )
+
+
+def _get_remote_targets_env_variable() -> Sequence[deploy.DeployTarget]:
+    """
+    Retrieve the comma-separated list of remote targets to deploy to.
+
+    Each target can override the global remote username & directory
+    using the `[username@]hostname[:directory]` syntax.
+    """
+    raw_value: str | None = os.environ.get(f"{ENVIRONMENT_VARIABLE_PREFIX}REMOTE_IP")
+    if raw_value is None:
+        return ()
+
+    return tuple(
+        _parse_remote_target(raw_remote_target.strip("\n\r\t .-_"))
+        for raw_remote_target in raw_value.split(",")
+        if raw_remote_target.strip("\n\r\t .-_")
+    )
+
+
+def _setup_reproducible_build() -> None:
+    """
+    Fix every time-dependent value of the built sites, if reproducible builds are enabled.
+
+    An explicitly given `SOURCE_DATE_EPOCH` is always honoured,
+    otherwise it is set to the date of the current `HEAD` commit,
+    so that every build of the same commit is byte-identical.
+    """
+    if not _get_boolean_env_variable("REPRODUCIBLE"):
+        return
+
+    if utils.get_source_date_epoch() is None:
+        os.environ[utils.SOURCE_DATE_EPOCH_ENVIRONMENT_VARIABLE_NAME] = str(
+            change_detection.get_head_commit_timestamp()
+        )
+
+    logger.debug(
+        "Building reproducibly with %s=%s.",
+        utils.SOURCE_DATE_EPOCH_ENVIRONMENT_VARIABLE_NAME,
+        utils.get_source_date_epoch(),
+    )
+
+
+def _setup_instrumentation() -> None:
+    if _get_boolean_env_variable("PROFILE"):
+        profiling.enable(
+            _get_validated_string_environment_variable("PROFILE_DIRECTORY", Path)
+            or profiling.DEFAULT_PROFILE_DIRECTORY
+        )
+
+    if _get_boolean_env_variable("MEMORY_REPORT"):
+        site_memory_limit: int | None = _get_optional_positive_integer_env_variable(
+            "SITE_MEMORY_LIMIT_MIB"
+        )
+        memory.enable(
+            site_size_limit=(
+                site_memory_limit * 1024**2 if site_memory_limit is not None else None
+            )
+        )
+
+
+def _cleanup_cache() -> None:
+    cache_max_age: int | None = _get_optional_positive_integer_env_variable(
+        "CACHE_MAX_AGE_DAYS"
+    )
+
+    cleanup.cleanup_cache(
+        max_size=(
+            _get_positive_integer_env_variable(
+                "CACHE_MAX_SIZE_MIB", default=cache.DEFAULT_MAX_CACHE_SIZE // 1024**2
+            )
+            * 1024**2
+        ),
+        max_age=cache_max_age * 24 * 60 * 60 if cache_max_age is not None else None,
+    )
+
+
+def _report_instrumentation(*, deployed_site_names: AbstractSet[str], succeeded: bool) -> None:
+    """Summarise this run's timings, then save any requested metrics, traces & reports."""
+    tracing.log_site_summary()
+
+    metrics_file_path: Path | None = _get_validated_string_environment_variable(
+        "METRICS_FILE", Path
+    )
+    if metrics_file_path is not None:
+        metrics.write_textfile(
+            metrics_file_path, deployed_site_names=deployed_site_names, succeeded=succeeded
+        )
+        logger.info("Saved Prometheus metrics into file: %s", metrics_file_path)
+
+    trace_file_path: Path | None = _get_validated_string_environment_variable(
+        "TRACE_FILE", Path
+    )
+    if trace_file_path is not None:
+        tracing.export_chrome_trace(trace_file_path)
+        logger.info("Saved Chrome trace into file: %s", trace_file_path)
+
+    profiling.write_profiles(
+        summary_length=_get_positive_integer_env_variable(
+            "PROFILE_SUMMARY_LENGTH", default=profiling.DEFAULT_SUMMARY_LENGTH
+        )
+    )
+
+    memory.write_report(
+        top_allocations_count=_get_positive_integer_env_variable(
+            "MEMORY_REPORT_TOP_COUNT", default=memory.DEFAULT_TOP_ALLOCATIONS_COUNT
+        )
+    )
+
+
+def run() -> int:  # noqa: PLR0915
     """Run the static websites builder and deployment script."""
     if sys.argv[1:]:
         UNEXPECTED_ARGUMENTS_MESSAGE: Final[str] = (
@@ -116,12 +285,18 @@ def run() -> int:
 
     verbosity: Literal[0, 1, 2, 3] = _get_verbosity_env_variable(is_dry_run=dry_run)
 
-    logging_setup.setup(verbosity=verbosity)
-
-    remote_hostname: validators.Hostname | None = _get_validated_string_environment_variable(
-        "REMOTE_IP", validators.Hostname
+    logging_setup.setup(
+        verbosity=verbosity, queued=_get_boolean_env_variable("QUEUED_LOGGING")
     )
-    if not dry_run and remote_hostname is None:
+
+    if _get_boolean_env_variable("CLEANUP_CACHE_ONLY"):
+        _cleanup_cache()
+        return 0
+
+    _setup_reproducible_build()
+
+    remote_targets: Sequence[deploy.DeployTarget] = _get_remote_targets_env_variable()
+    if not dry_run and not remote_targets:
         MISSING_REMOTE_IP_MESSAGE: Final[str] = (
             f'No "{ENVIRONMENT_VARIABLE_PREFIX}REMOTE_IP" was specified '
             f"when using {ENVIRONMENT_VARIABLE_PREFIX}DRY_RUN=False."
@@ -135,33 +310,93 @@ def run() -> int:
         "REMOTE_DIRECTORY", Path
     )
 
-    try:
-        built_site_paths: AbstractSet[Path] = build.build_all_sites()
+    only_changed: bool = _get_boolean_env_variable("ONLY_CHANGED")
 
-        if not built_site_paths:
-            logger.warning("All sites failed to build. (Or no sites exist.)")
-            return 1
+    site_names: AbstractSet[str] | None = None
+    if only_changed:
+        site_names = change_detection.get_changed_site_names(frozenset(sites.SITES_MAP))
 
-        deployed_site_names: AbstractSet[str] = deploy.deploy_all_sites(  # type: ignore[call-overload]  # ty: ignore[no-matching-overload]  # noqa: CAR123
-            built_site_paths,
-            verbosity=verbosity,
-            remote_hostname=remote_hostname,
-            remote_username=remote_username,
-            remote_directory=remote_directory,
-            dry_run=dry_run,
+        if not site_names:
+            logger.info("No sites have changed since they were last deployed.")
+            return 0
+
+        logger.info(
+            "Only building & deploying changed sites: %s", ", ".join(sorted(site_names))
         )
 
+    host_concurrency: int = _get_positive_integer_env_variable(
+        "HOST_CONCURRENCY", default=deploy.DEFAULT_HOST_CONCURRENCY
+    )
+    atomic_promotion: bool = _get_boolean_env_variable("ATOMIC_PROMOTION")
+    preflight: bool = _get_boolean_env_variable("PREFLIGHT", default=True)
+    use_site_cache: bool = _get_boolean_env_variable("SITE_CACHE", default=True)
+
+    _setup_instrumentation()
+
+    deployed_site_names: AbstractSet[str] = frozenset()
+    succeeded: bool = False
+
+    try:
+        built_site_paths: AbstractSet[Path]
+
+        if _get_boolean_env_variable("PIPELINED"):
+            built_site_paths, deployed_site_names = pipeline.build_and_deploy_all_sites(
+                site_names=site_names,
+                verbosity=verbosity,
+                remote_targets=remote_targets,
+                remote_username=remote_username,
+                remote_directory=remote_directory,
+                host_concurrency=host_concurrency,
+                atomic_promotion=atomic_promotion,
+                preflight=preflight,
+                dry_run=dry_run,
+                use_site_cache=use_site_cache,
+            )
+
+            if not built_site_paths:
+                logger.warning("All sites failed to build. (Or no sites exist.)")
+                return 1
+
+        else:
+            built_site_paths = build.build_all_sites(
+                site_names=site_names, use_site_cache=use_site_cache
+            )
+
+            if not built_site_paths:
+                logger.warning("All sites failed to build. (Or no sites exist.)")
+                return 1
+
+            deployed_site_names = deploy.deploy_all_sites(
+                built_site_paths,
+                verbosity=verbosity,
+                remote_targets=remote_targets,
+                remote_username=remote_username,
+                remote_directory=remote_directory,
+                host_concurrency=host_concurrency,
+                atomic_promotion=atomic_promotion,
+                preflight=preflight,
+                dry_run=dry_run,
+            )
+
         if not deployed_site_names:
             logger.warning("All sites failed to deploy.")
             return 1
 
+        if only_changed and not dry_run:
+            change_detection.record_deployed_site_names(deployed_site_names)
+
         sys.stdout.write(",".join(deployed_site_names))
+        succeeded = True
         return 0
 
     finally:
+        _report_instrumentation(deployed_site_names=deployed_site_names, succeeded=succeeded)
+
         if dry_run:
             cleanup.cleanup_all_sites(dry_run=dry_run)
 
+        _cleanup_cache()
+
 
 if __name__ == "__main__":
     raise SystemExit(run())
@@ -1,34 +1,106 @@
 """Deployment functions for whole static websites."""
 
+import asyncio
+import functools
 import logging
 import os
+import re
+import shlex
 import subprocess
 import traceback
-from logging import LoggerAdapter
 from pathlib import Path
 from subprocess import CalledProcessError
-from typing import TYPE_CHECKING, overload
+from typing import TYPE_CHECKING, NamedTuple, overload, override
 
+from exceptions import MutuallyExclusiveArgsError
+from utils import logging_setup, manifest, profiling, subprocesses, tracing
 from utils.validators import Hostname
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import AsyncIterator, Mapping, Sequence
     from collections.abc import Set as AbstractSet
-    from logging import Logger
+    from logging import Logger, LoggerAdapter
     from subprocess import CompletedProcess
     from typing import Final, Literal
 
     from utils import CaughtException
     from utils.validators import Username
 
-__all__: Sequence[str] = ("deploy_all_sites", "deploy_single_site")
+__all__: Sequence[str] = (
+    "DEFAULT_HOST_CONCURRENCY",
+    "DeployTarget",
+    "deploy_all_sites",
+    "deploy_single_site",
+    "deploy_sites_as_built",
+    "promote_single_site",
+)
 
 
 logger: Final[Logger] = logging.getLogger("static-websites-builder")
-extra_context_logger: Final[Logger] = logging.getLogger(
-    "static-websites-builder-extra-context"
+
+DEFAULT_HOST_CONCURRENCY: Final[int] = 2
+
+SSH_COMMAND: Final[Sequence[str]] = (
+    "ssh",
+    "-o",
+    "UserKnownHostsFile=/dev/null",
+    "-o",
+    "StrictHostKeyChecking=no",
 )
 
+RSYNC_PROGRESS_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"\A\s*(?P<transferred_bytes>[\d,]+)\s+(?P<percentage>\d+)%\s+"
+    r"(?P<rate>\S+/s)\s+(?P<remaining_time>\d+:\d{2}:\d{2})"
+)
+
+RSYNC_STATS_BYTES_SENT_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"\A\s*Total bytes sent:\s*(?P<sent_bytes>[\d,]+)"
+)
+
+STAGING_DIRECTORY_SUFFIX: Final[str] = ".incoming"
+PREVIOUS_DIRECTORY_SUFFIX: Final[str] = ".previous"
+RELEASES_DIRECTORY_SUFFIX: Final[str] = ".releases"
+
+
+PROMOTION_SCRIPT_TEMPLATE: Final[str] = (
+    "set -e; "
+    "mkdir -p {releases_directory}; "
+    'r={releases_directory}/"$(date -u +%Y%m%dT%H%M%SZ)-$$"; '
+    'mv {staging_directory} "$r"; '
+    'o=""; if [ -L {live_directory} ]; then o="$(readlink {live_directory})"; '
+    "elif [ -e {live_directory} ]; "
+    'then o={releases_directory}/"initial-$$"; mv {live_directory} "$o"; fi; '
+    'ln -sfn "$r" {live_directory}.link; mv -T {live_directory}.link {live_directory}; '
+    "if [ -d {previous_directory} ] && [ ! -L {previous_directory} ]; "
+    "then rm -rf {previous_directory}; fi; "
+    'if [ -n "$o" ]; then ln -sfn "$o" {previous_directory}.link; '
+    "mv -T {previous_directory}.link {previous_directory}; fi; "
+    "for d in {releases_directory}/*; do "
+    'if [ "$d" != "$r" ] && [ "$d" != "$o" ]; then rm -rf "$d"; fi; done'
+)
+
+PREFLIGHT_SCRIPT_TEMPLATE: Final[str] = (
+    'd={remote_directory}; p="$d"; '
+    'while [ ! -e "$p" ]; do p="$(dirname "$p")"; done; '
+    'if [ -w "$p" ]; then w=1; else w=0; fi; '
+    'a="$(df -k --output=avail "$p" | tail -n 1)"; '
+    'm="$(df --output=target "$p" | tail -n 1)"; '
+    """printf '%s\\t%s\\t%s\\t%s\\n' "$w" "$((a * 1024))" "$m" "$d"; """
+)
+
+
+class DeployTarget(NamedTuple):
+    """Remote server to deploy to, with optional per-host username & directory overrides."""
+
+    hostname: Hostname
+    username: Username | None = None
+    directory: Path | None = None
+
+    @override
+    def __str__(self) -> str:
+        """Return the `[username@]hostname` representation of this deployment target."""
+        return f"{f'{self.username}@' if self.username else ''}{self.hostname}"
+
 
 def _get_posix_remote_directory(
     raw_remote_directory: Path | None,
@@ -58,7 +130,128 @@ def _get_posix_remote_directory(
     return (Path("/srv") / site_name).as_posix()
 
 
-def deploy_single_site(
+@functools.cache
+def _has_configured_ssh_hostname(remote_hostname: str) -> bool:
+    """
+    Whether a `Host` block in the user's SSH config gives the given host its own `HostName`.
+
+    This is read from the effective configuration printed by `ssh -G`.
+    """
+    ssh_configuration_error: OSError | CalledProcessError | subprocess.TimeoutExpired
+    try:
+        ssh_configuration: str = subprocess.run(
+            (*SSH_COMMAND, "-G", remote_hostname),
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=5,
+        ).stdout
+    except (OSError, CalledProcessError, subprocess.TimeoutExpired) as ssh_configuration_error:
+        logger.debug(
+            "Could not read SSH config for %s: %s", remote_hostname, ssh_configuration_error
+        )
+        return False
+
+    return any(
+        configured_hostname.strip().lower() != remote_hostname.lower()
+        for option_name, _, configured_hostname in (
+            configuration_line.partition(" ")
+            for configuration_line in ssh_configuration.splitlines()
+        )
+        if option_name == "hostname"
+    )
+
+
+def _get_ssh_command(remote_hostname: Hostname) -> Sequence[str]:
+    """
+    Get the SSH command to connect to the given host, using its already-resolved address.
+
+    The address is passed as the `HostName` option (rather than replacing the hostname),
+    so any matching `Host` blocks in the user's SSH config still apply.
+    If one of those blocks gives its own `HostName`, that is used instead,
+    because the command-line option would otherwise override it.
+    """
+    if _has_configured_ssh_hostname(str(remote_hostname)):
+        return SSH_COMMAND
+
+    return (*SSH_COMMAND, "-o", f"HostName={remote_hostname.resolved_address}")
+
+
+def _get_ssh_destination(
+    *,
+    remote_hostname: Hostname,
+    remote_username: Username | None = None,
+    bracket_ipv6_address: bool = False,
+) -> str:
+    formatted_hostname: str = str(remote_hostname)
+    if bracket_ipv6_address and ":" in formatted_hostname:
+        formatted_hostname = f"[{formatted_hostname}]"
+
+    return f"{f'{remote_username}@' if remote_username else ''}{formatted_hostname}"
+
+
+async def _run_logged_subprocess(
+    args: Sequence[str], *, site_name_logger: LoggerAdapter[Logger]
+) -> int | None:
+    """
+    Run the given command, logging each line of its output as soon as it is produced.
+
+    Any rsync progress lines are parsed,
+    and only logged each time the transfer passes another tenth of completion.
+    Returns the number of bytes sent according to rsync's final statistics
+    (or its last progress line), if it reported any.
+    """
+    next_logged_progress_percentage: int = 0
+    transferred_byte_count: int | None = None
+
+    def _log_stdout_line(line: str) -> None:
+        nonlocal next_logged_progress_percentage, transferred_byte_count
+
+        stats_match: re.Match[str] | None = RSYNC_STATS_BYTES_SENT_PATTERN.match(line)
+        if stats_match is not None:
+            transferred_byte_count = int(stats_match.group("sent_bytes").replace(",", ""))
+
+        progress_match: re.Match[str] | None = RSYNC_PROGRESS_PATTERN.match(line)
+        if progress_match is None:
+            site_name_logger.debug("%s stdout: %s", args[0], line.strip())
+            return
+
+        transferred_byte_count = int(
+            progress_match.group("transferred_bytes").replace(",", "")
+        )
+
+        progress_percentage: int = int(progress_match.group("percentage"))
+        if progress_percentage < next_logged_progress_percentage:
+            return
+
+        site_name_logger.debug(
+            "%s progress: %d%% (%s bytes transferred at %s, %s remaining)",
+            args[0],
+            progress_percentage,
+            progress_match.group("transferred_bytes"),
+            progress_match.group("rate"),
+            progress_match.group("remaining_time"),
+        )
+        next_logged_progress_percentage = (progress_percentage // 10 + 1) * 10
+
+    def _log_stderr_line(line: str) -> None:
+        site_name_logger.debug("%s stderr: %s", args[0], line.strip())
+
+    no_command_error: FileNotFoundError
+    try:
+        await subprocesses.run_streamed_subprocess(
+            args, on_stdout_line=_log_stdout_line, on_stderr_line=_log_stderr_line
+        )
+    except FileNotFoundError as no_command_error:
+        NO_COMMAND_MESSAGE: Final[str] = (
+            f"{args[0]!r} command not found. (Ensure it is installed on your system.)"
+        )
+        raise RuntimeError(NO_COMMAND_MESSAGE) from no_command_error
+
+    return transferred_byte_count
+
+
+async def deploy_single_site(
     site_path: Path,
     *,
     verbosity: Literal[0, 1, 2, 3] = 1,
@@ -66,30 +259,30 @@ def deploy_single_site(
     remote_username: Username | None = None,
     remote_directory: Path | None = None,
     dry_run: bool = False,
+    staged: bool = False,
 ) -> None:
     """
     Deploy the single given static website to the remote server.
 
     This is done by copying the contents of the site's built/rendered `deploy/` directory
     to the remote server with the given copy authentication credentials.
+    If `staged` is set, the contents are instead copied into a sibling staging directory
+    (hard-linking any unchanged files against the currently live release),
+    ready to be made live later by `promote_single_site()`.
     """
     FORMATTED_SITE_NAME: Final[str] = (
         site_path.parent.name if site_path.name == "deploy" else site_path.name
     )
-    site_name_logger: Final[LoggerAdapter[Logger]] = LoggerAdapter(
-        extra_context_logger,
-        {"extra_context": FORMATTED_SITE_NAME},
+    site_name_logger: Final[LoggerAdapter[Logger]] = logging_setup.get_context_logger(
+        FORMATTED_SITE_NAME
     )
-    dry_run_site_name_logger: Final[LoggerAdapter[Logger]] = LoggerAdapter(
-        extra_context_logger,
-        {
-            "extra_context": f"{FORMATTED_SITE_NAME}{' | dry_run=True' if dry_run else ''}",
-        },
+    dry_run_site_name_logger: Final[LoggerAdapter[Logger]] = logging_setup.get_context_logger(
+        f"{FORMATTED_SITE_NAME}{' | dry_run=True' if dry_run else ''}"
     )
 
     site_name_logger.debug("Begin deploying single site.")
 
-    if not site_path.is_dir():
+    if not await asyncio.to_thread(site_path.is_dir):
         PATH_IS_NOT_DIRECTORY_MESSAGE: Final[str] = (
             f"Path to site's root directory is not a directory: {site_path}"
         )
@@ -104,8 +297,9 @@ def deploy_single_site(
     site_name_logger.debug("Successfully retrieved resolved remote directory path.")
 
     dry_run_site_name_logger.debug(
-        "Beginning %supload of `deploy/` directory to remote server.",
+        "Beginning %s%supload of `deploy/` directory to remote server.",
         "mock " if dry_run else "",
+        "staged " if staged else "",
     )
 
     rsync_args: list[str] = [
@@ -118,54 +312,602 @@ def deploy_single_site(
         "--checksum",
         "--delete",
         "--timeout=5",
+        "--stats",
         "-e",
-        "ssh -o UserKnownHostsFile=/dev/null -o StrictHostKeyChecking=no",
+        shlex.join(_get_ssh_command(remote_hostname)),
     ]
 
+    if staged:
+        rsync_args.append(f"--link-dest={POSIX_REMOTE_DIRECTORY}")
+
     if dry_run:
         rsync_args.append("--dry-run")
 
+    if verbosity > 1:
+        rsync_args.append("--info=progress2")
+
     if verbosity > 2:
         rsync_args.append("--verbose")
 
+    SSH_DESTINATION: Final[str] = _get_ssh_destination(
+        remote_hostname=remote_hostname,
+        remote_username=remote_username,
+        bracket_ipv6_address=True,
+    )
+
     rsync_args.extend(
         (
             f"{site_path}{os.sep}",
             (
-                f"{f'{remote_username}@' if remote_username else ''}"
-                f"{remote_hostname}:"
-                f"{POSIX_REMOTE_DIRECTORY}"
+                f"{SSH_DESTINATION}:"
+                f"{POSIX_REMOTE_DIRECTORY}{STAGING_DIRECTORY_SUFFIX if staged else ''}"
             ),
         ),
     )
 
-    no_rsync_command_error: FileNotFoundError
+    span_attributes: dict[str, int | str]
+    with tracing.span(
+        "deploy_single_site",
+        phase="deploy",
+        site_name=FORMATTED_SITE_NAME,
+        target=str(remote_hostname),
+        staged=str(staged).lower(),
+    ) as span_attributes:
+        transferred_byte_count: int | None = await _run_logged_subprocess(
+            rsync_args, site_name_logger=site_name_logger
+        )
+
+        if transferred_byte_count is not None:
+            span_attributes["transferred_bytes"] = transferred_byte_count
+
+    site_name_logger.debug("Completed deploying single site successfully.")
+
+
+async def promote_single_site(
+    site_name: str,
+    *,
+    remote_hostname: Hostname,
+    remote_username: Username | None = None,
+    remote_directory: Path | None = None,
+    dry_run: bool = False,
+) -> None:
+    """
+    Make a previously staged upload of the given site the live release on the remote server.
+
+    The staged upload is moved into the site's releases directory,
+    then the live path (a link to the current release) is atomically replaced
+    by a link to it, so the live path never stops existing.
+    The outgoing release is kept (linked from the previous path) as a backup,
+    until the next promotion.
+    The first promotion onto a live path that is still a real directory
+    must move that directory aside first, so only that single promotion is not atomic.
+    """
+    site_name_logger: Final[LoggerAdapter[Logger]] = logging_setup.get_context_logger(
+        site_name
+    )
+
+    POSIX_REMOTE_DIRECTORY: Final[str] = _get_posix_remote_directory(
+        remote_directory, site_name=site_name, remote_username=remote_username
+    )
+    LIVE_DIRECTORY: Final[str] = shlex.quote(POSIX_REMOTE_DIRECTORY)
+    STAGING_DIRECTORY: Final[str] = shlex.quote(
+        f"{POSIX_REMOTE_DIRECTORY}{STAGING_DIRECTORY_SUFFIX}"
+    )
+    PREVIOUS_DIRECTORY: Final[str] = shlex.quote(
+        f"{POSIX_REMOTE_DIRECTORY}{PREVIOUS_DIRECTORY_SUFFIX}"
+    )
+    RELEASES_DIRECTORY: Final[str] = shlex.quote(
+        f"{POSIX_REMOTE_DIRECTORY}{RELEASES_DIRECTORY_SUFFIX}"
+    )
+
+    if dry_run:
+        site_name_logger.debug("Skipping mock promotion of staged release (dry_run=True).")
+        return
+
+    with tracing.span(
+        "promote_single_site",
+        phase="promote",
+        site_name=site_name,
+        target=str(remote_hostname),
+    ):
+        await _run_logged_subprocess(
+            (
+                *_get_ssh_command(remote_hostname),
+                _get_ssh_destination(
+                    remote_hostname=remote_hostname, remote_username=remote_username
+                ),
+                PROMOTION_SCRIPT_TEMPLATE.format(
+                    live_directory=LIVE_DIRECTORY,
+                    staging_directory=STAGING_DIRECTORY,
+                    previous_directory=PREVIOUS_DIRECTORY,
+                    releases_directory=RELEASES_DIRECTORY,
+                ),
+            ),
+            site_name_logger=site_name_logger,
+        )
+
+    site_name_logger.debug("Promoted staged release to live successfully.")
+
+
+def _format_byte_count(byte_count: float) -> str:
+    unit: str
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if byte_count < 1024:
+            return f"{byte_count:.1f} {unit}"
+
+        byte_count /= 1024
+
+    return f"{byte_count:.1f} TiB"
+
+
+def _preflight_check_target(
+    remote_target: DeployTarget,
+    *,
+    remote_username: Username | None,
+    required_bytes_by_directory: Mapping[str, int],
+) -> Sequence[str]:
+    """
+    Check that the given target can be deployed to, returning a description of any problems.
+
+    A single SSH connection checks that the nearest existing ancestor
+    of each resolved remote directory is writable,
+    and that its filesystem has enough free space for every site that will be uploaded to it.
+    The whole size of each site is required, even though rsync only transfers changed files,
+    because the remote state is not known beforehand (e.g. a new or emptied remote directory
+    needs every file), so this is a deliberately conservative bound.
+    """
+    preflight_script: str = "".join(
+        PREFLIGHT_SCRIPT_TEMPLATE.format(remote_directory=shlex.quote(posix_remote_directory))
+        for posix_remote_directory in required_bytes_by_directory
+    )
+
+    preflight_error: CalledProcessError | subprocess.TimeoutExpired
     try:
         process_output: CompletedProcess[str] = subprocess.run(
-            rsync_args,
+            (
+                *_get_ssh_command(remote_target.hostname),
+                "-o",
+                "BatchMode=yes",
+                "-o",
+                "ConnectTimeout=5",
+                _get_ssh_destination(
+                    remote_hostname=remote_target.hostname, remote_username=remote_username
+                ),
+                preflight_script,
+            ),
             capture_output=True,
             text=True,
             check=True,
+            timeout=30,
         )
-    except FileNotFoundError as no_rsync_command_error:
-        NO_RSYNC_COMMAND_MESSAGE: Final[str] = (
-            f"{'rsync'!r} command not found. (Ensure it is installed on your system.)"
+    except FileNotFoundError:
+        return (f"{'ssh'!r} command not found. (Ensure it is installed on your system.)",)
+    except subprocess.TimeoutExpired as preflight_error:
+        return (f"SSH pre-flight check timed out after {preflight_error.timeout:g} seconds.",)
+    except CalledProcessError as preflight_error:
+        stderr_lines: Sequence[str] = str(preflight_error.stderr).strip().splitlines()
+        return (f"SSH connection failed{f': {stderr_lines[-1]}' if stderr_lines else '.'}",)
+
+    problems: list[str] = []
+    required_bytes_by_mount_point: dict[str, int] = {}
+    free_bytes_by_mount_point: dict[str, int] = {}
+
+    output_line: str
+    for output_line in process_output.stdout.splitlines():
+        raw_is_writable: str
+        raw_free_bytes: str
+        mount_point: str
+        posix_remote_directory: str
+        raw_is_writable, raw_free_bytes, mount_point, posix_remote_directory = (
+            output_line.split("\t", maxsplit=3)
         )
-        raise RuntimeError(NO_RSYNC_COMMAND_MESSAGE) from no_rsync_command_error
 
-    if process_output.stdout:
-        site_name_logger.debug(
-            "rsync subprocess stdout:\n%s",
-            f"{process_output.stdout.strip()}\n",
+        if raw_is_writable != "1":
+            problems.append(f"Remote directory is not writable: {posix_remote_directory}")
+
+        free_bytes_by_mount_point[mount_point] = int(raw_free_bytes)
+        required_bytes_by_mount_point[mount_point] = required_bytes_by_mount_point.get(
+            mount_point, 0
+        ) + required_bytes_by_directory.get(posix_remote_directory, 0)
+
+    if len(free_bytes_by_mount_point) == 0 and required_bytes_by_directory:
+        problems.append("Could not determine remote directory permissions & free disk space.")
+
+    required_bytes: int
+    for mount_point, required_bytes in required_bytes_by_mount_point.items():
+        if free_bytes_by_mount_point[mount_point] < required_bytes:
+            problems.append(
+                f"Not enough free disk space on {mount_point!r} "
+                f"(requires {_format_byte_count(required_bytes)}, "
+                f"only {_format_byte_count(free_bytes_by_mount_point[mount_point])} free)."
+            )
+
+    return problems
+
+
+async def _preflight_check_all_targets(
+    site_sizes: Mapping[str, int],
+    *,
+    remote_targets: Sequence[DeployTarget],
+    default_remote_username: Username | None,
+    default_remote_directory: Path | None,
+) -> bool:
+    """
+    Run the pre-flight checks against every remote target concurrently.
+
+    All problems found on every remote target are reported together,
+    then whether all the checks passed is returned.
+    """
+    preflight_problems: Final[Mapping[DeployTarget, Sequence[str]]] = dict(
+        zip(
+            remote_targets,
+            await asyncio.gather(
+                *(
+                    asyncio.to_thread(
+                        _preflight_check_target,
+                        remote_target,
+                        remote_username=remote_target.username or default_remote_username,
+                        required_bytes_by_directory={
+                            _get_posix_remote_directory(
+                                remote_target.directory or default_remote_directory,
+                                site_name=site_name,
+                                remote_username=(
+                                    remote_target.username or default_remote_username
+                                ),
+                            ): site_size
+                            for site_name, site_size in site_sizes.items()
+                        },
+                    )
+                    for remote_target in remote_targets
+                )
+            ),
+            strict=True,
         )
+    )
 
-    if process_output.stderr:
-        site_name_logger.debug(
-            "rsync subprocess stderr:\n%s",
-            f"{process_output.stderr.strip()}\n",
+    if not any(preflight_problems.values()):
+        logger.debug("Pre-flight checks passed on all remote deployment servers.")
+        return True
+
+    logger.error("Pre-flight checks failed, so no sites will be deployed.")
+
+    failed_remote_target: DeployTarget
+    target_preflight_problems: Sequence[str]
+    for failed_remote_target, target_preflight_problems in preflight_problems.items():
+        preflight_failed_logger: LoggerAdapter[Logger] = logging_setup.get_context_logger(
+            f"{failed_remote_target} | Pre-flight Failed"
         )
 
-    site_name_logger.debug("Completed deploying single site successfully.")
+        preflight_problem: str
+        for preflight_problem in target_preflight_problems:
+            preflight_failed_logger.error(preflight_problem)
+
+    return False
+
+
+async def _deploy_site_to_all_targets(  # noqa: PLR0913
+    site_path: Path,
+    *,
+    remote_targets: Sequence[DeployTarget],
+    host_semaphores: Mapping[Hostname, asyncio.Semaphore],
+    verbosity: Literal[0, 1, 2, 3],
+    default_remote_username: Username | None,
+    default_remote_directory: Path | None,
+    atomic_promotion: bool,
+    dry_run: bool,
+) -> Mapping[DeployTarget, CaughtException | None]:
+    FORMATTED_SITE_NAME: Final[str] = (
+        site_path.parent.name if site_path.name == "deploy" else site_path.name
+    )
+
+    async def _deploy_to_target(remote_target: DeployTarget) -> CaughtException | None:
+        async with host_semaphores[remote_target.hostname]:
+            try:
+                await deploy_single_site(
+                    site_path,
+                    verbosity=verbosity,
+                    remote_hostname=remote_target.hostname,
+                    remote_username=remote_target.username or default_remote_username,
+                    remote_directory=remote_target.directory or default_remote_directory,
+                    dry_run=dry_run,
+                    staged=atomic_promotion,
+                )
+            except (
+                ValueError,
+                RuntimeError,
+                AttributeError,
+                TypeError,
+                OSError,
+                CalledProcessError,
+            ) as caught_exception:
+                return caught_exception
+
+        return None
+
+    async def _promote_on_target(remote_target: DeployTarget) -> CaughtException | None:
+        async with host_semaphores[remote_target.hostname]:
+            try:
+                await promote_single_site(
+                    FORMATTED_SITE_NAME,
+                    remote_hostname=remote_target.hostname,
+                    remote_username=remote_target.username or default_remote_username,
+                    remote_directory=remote_target.directory or default_remote_directory,
+                    dry_run=dry_run,
+                )
+            except (
+                ValueError,
+                RuntimeError,
+                AttributeError,
+                TypeError,
+                OSError,
+                CalledProcessError,
+            ) as caught_exception:
+                return caught_exception
+
+        return None
+
+    deployment_outcomes: dict[DeployTarget, CaughtException | None] = dict(
+        zip(
+            remote_targets,
+            await asyncio.gather(
+                *(_deploy_to_target(remote_target) for remote_target in remote_targets)
+            ),
+            strict=True,
+        )
+    )
+
+    if not atomic_promotion:
+        return deployment_outcomes
+
+    if any(outcome is not None for outcome in deployment_outcomes.values()):
+        logging_setup.get_context_logger(FORMATTED_SITE_NAME).warning(
+            "Not promoting staged release, because not every host received the files."
+        )
+        return deployment_outcomes
+
+    return dict(
+        zip(
+            remote_targets,
+            await asyncio.gather(
+                *(_promote_on_target(remote_target) for remote_target in remote_targets)
+            ),
+            strict=True,
+        )
+    )
+
+
+def _log_outcome_matrix(
+    deployed_sites: Mapping[str, Mapping[DeployTarget, CaughtException | None]],
+    *,
+    remote_targets: Sequence[DeployTarget],
+) -> None:
+    rows: list[Sequence[str]] = [("site", *(str(target) for target in remote_targets))]
+    rows.extend(
+        (
+            site_name,
+            *(
+                "deployed" if outcomes[remote_target] is None else "FAILED"
+                for remote_target in remote_targets
+            ),
+        )
+        for site_name, outcomes in sorted(deployed_sites.items())
+    )
+
+    column_widths: Sequence[int] = [
+        max(len(cell) for cell in column) for column in zip(*rows, strict=True)
+    ]
+
+    row: Sequence[str]
+    for row in rows:
+        logger.info(
+            " | ".join(
+                cell.ljust(column_width)
+                for cell, column_width in zip(row, column_widths, strict=True)
+            ).rstrip()
+        )
+
+
+def _report_deployment_outcomes(
+    deployed_sites: Mapping[str, Mapping[DeployTarget, CaughtException | None]],
+    *,
+    remote_targets: Sequence[DeployTarget],
+) -> AbstractSet[str]:
+    site_name: str
+    deployment_outcomes: Mapping[DeployTarget, CaughtException | None]
+    for site_name, deployment_outcomes in deployed_sites.items():
+        site_name_logger: LoggerAdapter[Logger] = logging_setup.get_context_logger(site_name)
+
+        remote_target: DeployTarget
+        deployment_outcome: CaughtException | None
+        for remote_target, deployment_outcome in deployment_outcomes.items():
+            if deployment_outcome is None:
+                continue
+
+            deployment_failed_logger: LoggerAdapter[Logger] = logging_setup.get_context_logger(
+                f"{site_name}"
+                f"{f' -> {remote_target}' if len(remote_targets) > 1 else ''}"
+                " | Deployment Failed"
+            )
+
+            traceback_messages: Sequence[str] = traceback.format_exception(deployment_outcome)
+
+            deployment_failed_logger.error(traceback_messages[-1].strip())
+            if site_name_logger.isEnabledFor(logging.DEBUG):
+                site_name_logger.debug("%s\n", "".join(traceback_messages[:-1]).strip())
+
+    if len(remote_targets) > 1:
+        _log_outcome_matrix(deployed_sites, remote_targets=remote_targets)
+
+    deployed_site_names: AbstractSet[str] = {
+        site_name
+        for site_name, deployment_outcomes in deployed_sites.items()
+        if all(outcome is None for outcome in deployment_outcomes.values())
+    }
+
+    if deployed_site_names:
+        logger.info("Deploying all sites completed successfully.")
+
+    return deployed_site_names
+
+
+async def deploy_sites_as_built(  # noqa: PLR0913
+    site_paths: AsyncIterator[Path],
+    *,
+    expected_site_sizes: Mapping[str, int],
+    verbosity: Literal[0, 1, 2, 3] = 1,
+    remote_targets: Sequence[DeployTarget] | None = None,
+    remote_hostname: Hostname | None = None,
+    remote_username: Username | None = None,
+    remote_directory: Path | None = None,
+    host_concurrency: int = DEFAULT_HOST_CONCURRENCY,
+    atomic_promotion: bool = False,
+    preflight: bool = True,
+    dry_run: bool = False,
+) -> AbstractSet[str]:
+    """
+    Deploy each static website as soon as its path is produced by the given async iterator.
+
+    This allows uploads to overlap with the building of any sites that come after them.
+    See `deploy_all_sites()` for the meaning of the remaining arguments.
+    The pre-flight checks use the given `expected_site_sizes` (keyed by site name),
+    because the sites will not all have been built by the time the checks are run.
+    """
+    dry_run_logger: Final[LoggerAdapter[Logger] | Logger] = (
+        logging_setup.get_context_logger("dry_run=True") if dry_run else logger
+    )
+
+    logger.info("Begin deploying all sites.")
+
+    if remote_targets and remote_hostname:
+        raise MutuallyExclusiveArgsError(
+            mutually_exclusive_arguments={
+                frozenset({"remote_targets"}),
+                frozenset({"remote_hostname"}),
+            }
+        )
+
+    if host_concurrency < 1:
+        INVALID_HOST_CONCURRENCY_MESSAGE: Final[str] = (
+            f"{'host_concurrency'!r} must be at least 1."
+        )
+        raise ValueError(INVALID_HOST_CONCURRENCY_MESSAGE)
+
+    if not remote_targets:
+        if not dry_run and not remote_hostname:
+            NO_REMOTE_HOSTNAME_MESSAGE: Final[str] = f"No {'remote_hostname'!r} was specified."
+            raise ValueError(NO_REMOTE_HOSTNAME_MESSAGE)
+
+        remote_targets = (
+            DeployTarget(
+                Hostname("192.168.0.1") if remote_hostname is None else remote_hostname
+            ),
+        )
+
+    dry_run_logger.debug(
+        "Opening %sconnection to %d remote deployment server(s).",
+        "mock " if dry_run else "",
+        len(remote_targets),
+    )
+
+    preflight_task: Final[asyncio.Task[bool] | None] = (
+        asyncio.create_task(
+            _preflight_check_all_targets(
+                expected_site_sizes,
+                remote_targets=remote_targets,
+                default_remote_username=remote_username,
+                default_remote_directory=remote_directory,
+            )
+        )
+        if preflight and not dry_run
+        else None
+    )
+
+    host_semaphores: Final[Mapping[Hostname, asyncio.Semaphore]] = {
+        remote_target.hostname: asyncio.Semaphore(host_concurrency)
+        for remote_target in remote_targets
+    }
+
+    async def _deploy_site_after_preflight(
+        site_path: Path,
+    ) -> Mapping[DeployTarget, CaughtException | None] | None:
+        if preflight_task is not None and not await preflight_task:
+            return None
+
+        return await _deploy_site_to_all_targets(
+            site_path,
+            remote_targets=remote_targets,
+            host_semaphores=host_semaphores,
+            verbosity=verbosity,
+            default_remote_username=remote_username,
+            default_remote_directory=remote_directory,
+            atomic_promotion=atomic_promotion,
+            dry_run=dry_run,
+        )
+
+    deployment_tasks: dict[
+        str, asyncio.Task[Mapping[DeployTarget, CaughtException | None] | None]
+    ] = {}
+
+    with tracing.span("deploy_sites_as_built", phase="deploy-all"):
+        try:
+            site_path: Path
+            async for site_path in site_paths:
+                if (
+                    preflight_task is not None
+                    and preflight_task.done()
+                    and not preflight_task.result()
+                ):
+                    break
+
+                deployment_tasks[
+                    site_path.parent.name if site_path.name == "deploy" else site_path.name
+                ] = asyncio.create_task(_deploy_site_after_preflight(site_path))
+
+            if preflight_task is not None and not await preflight_task:
+                await asyncio.gather(*deployment_tasks.values())
+                return frozenset()
+
+            deployed_sites: dict[str, Mapping[DeployTarget, CaughtException | None]] = {}
+
+            site_name: str
+            deployment_task: asyncio.Task[Mapping[DeployTarget, CaughtException | None] | None]
+            for site_name, deployment_task in deployment_tasks.items():
+                deployment_outcomes: (
+                    Mapping[DeployTarget, CaughtException | None] | None
+                ) = await deployment_task
+                if deployment_outcomes is not None:
+                    deployed_sites[site_name] = deployment_outcomes
+        except BaseException:
+            # NOTE: Cancel every outstanding deployment (e.g. on Ctrl-C) before propagating,
+            # so that no queued upload can start once the rest of the run has been abandoned
+            outstanding_tasks: Sequence[asyncio.Task[object]] = [
+                *deployment_tasks.values(),
+                *([preflight_task] if preflight_task is not None else []),
+            ]
+
+            outstanding_task: asyncio.Task[object]
+            for outstanding_task in outstanding_tasks:
+                outstanding_task.cancel()
+
+            await asyncio.gather(*outstanding_tasks, return_exceptions=True)
+            raise
+
+        return _report_deployment_outcomes(deployed_sites, remote_targets=remote_targets)
+
+
+@overload
+def deploy_all_sites(
+    site_paths: AbstractSet[Path],
+    *,
+    remote_targets: Sequence[DeployTarget],
+    verbosity: Literal[0, 1, 2, 3] = ...,
+    remote_username: Username | None = ...,
+    remote_directory: Path | None = ...,
+    host_concurrency: int = ...,
+    atomic_promotion: bool = ...,
+    preflight: bool = ...,
+    dry_run: bool = ...,
+) -> AbstractSet[str]: ...
 
 
 @overload
@@ -176,6 +918,9 @@ def deploy_all_sites(
     verbosity: Literal[0, 1, 2, 3] = ...,
     remote_username: Username | None = ...,
     remote_directory: Path | None = ...,
+    host_concurrency: int = ...,
+    atomic_promotion: bool = ...,
+    preflight: bool = ...,
     dry_run: Literal[False] = ...,
 ) -> AbstractSet[str]: ...
 
@@ -189,107 +934,75 @@ def deploy_all_sites(
     remote_username: Username | None = ...,
     remote_hostname: Hostname | None = ...,
     remote_directory: Path | None = ...,
+    host_concurrency: int = ...,
+    atomic_promotion: bool = ...,
+    preflight: bool = ...,
 ) -> AbstractSet[str]: ...
 
 
-def deploy_all_sites(
+def deploy_all_sites(  # noqa: PLR0913
     site_paths: AbstractSet[Path],
     *,
     verbosity: Literal[0, 1, 2, 3] = 1,
+    remote_targets: Sequence[DeployTarget] | None = None,
     remote_hostname: Hostname | None = None,
     remote_username: Username | None = None,
     remote_directory: Path | None = None,
+    host_concurrency: int = DEFAULT_HOST_CONCURRENCY,
+    atomic_promotion: bool = False,
+    preflight: bool = True,
     dry_run: bool = False,
 ) -> AbstractSet[str]:
     """
     Deploy all static websites.
 
     This is done by copying the built and rendered contents of each site's `deploy/` directory
-    to the specified remote server.
+    to every specified remote server concurrently,
+    with at most `host_concurrency` uploads in flight to any single server.
+    The `remote_username` & `remote_directory` apply to any remote targets
+    that do not provide their own override.
+
+    If `atomic_promotion` is set, each site is first uploaded to a staging directory
+    on every server, and only made live once all servers have received it,
+    so that the servers never serve different versions of the same site.
+    Only sites that were successfully deployed to every remote server are returned.
+
+    Unless `preflight` is disabled (or this is a dry-run), every remote server is first
+    checked concurrently for SSH connectivity, write permission on each remote directory
+    and enough free disk space for the built sites.
+    If any of these checks fail, no sites are deployed at all.
     """
-    dry_run_logger: Final[LoggerAdapter[Logger] | Logger] = (
-        LoggerAdapter(
-            extra_context_logger,
-            {
-                "extra_context": "dry_run=True",
-            },
-        )
-        if dry_run
-        else logger
-    )
-
-    logger.info("Begin deploying all sites.")
-
-    deployed_sites: dict[str, CaughtException | None] = {}
-
-    if not dry_run and not remote_hostname:
-        NO_REMOTE_HOSTNAME_MESSAGE: Final[str] = f"No {'remote_hostname'!r} was specified."
-        raise ValueError(NO_REMOTE_HOSTNAME_MESSAGE)
-
-    real_hostname: Hostname = (
-        Hostname("192.168.0.1") if remote_hostname is None else remote_hostname
-    )
-
-    dry_run_logger.debug(
-        "Opening %sconnection to remote deployment server.",
-        "mock " if dry_run else "",
-    )
-
-    site_path: Path
-    for site_path in site_paths:
-        FORMATTED_SITE_NAME: str = (
-            site_path.parent.name if site_path.name == "deploy" else site_path.name
-        )
 
-        try:
-            deploy_single_site(
-                site_path,
+    async def _iterate_site_paths() -> AsyncIterator[Path]:
+        site_path: Path
+        for site_path in sorted(site_paths):
+            yield site_path
+
+    # NOTE: Concurrent uploads interleave on the one event loop, so they are profiled together
+    with profiling.profile_phase("rsync"):
+        return asyncio.run(
+            deploy_sites_as_built(
+                _iterate_site_paths(),
+                expected_site_sizes=(
+                    {
+                        (
+                            site_path.parent.name
+                            if site_path.name == "deploy"
+                            else site_path.name
+                        ): (manifest.load_site_manifest(site_path).total_size)
+                        for site_path in site_paths
+                    }
+                    if preflight and not dry_run
+                    else {}
+                ),
                 verbosity=verbosity,
-                remote_hostname=real_hostname,
+                remote_targets=remote_targets,
+                remote_hostname=remote_hostname,
                 remote_username=remote_username,
                 remote_directory=remote_directory,
+                host_concurrency=host_concurrency,
+                atomic_promotion=atomic_promotion,
+                preflight=preflight,
                 dry_run=dry_run,
             )
-        except (
-            ValueError,
-            RuntimeError,
-            AttributeError,
-            TypeError,
-            OSError,
-            CalledProcessError,
-        ) as caught_exception:
-            deployed_sites[FORMATTED_SITE_NAME] = caught_exception
-            continue
-        else:
-            deployed_sites[FORMATTED_SITE_NAME] = None
-
-    site_name: str
-    deployment_outcome: CaughtException | None
-    for site_name, deployment_outcome in deployed_sites.items():
-        site_name_logger: LoggerAdapter[Logger] = LoggerAdapter(
-            extra_context_logger,
-            {"extra_context": site_name},
-        )
-        deployment_failed_logger: LoggerAdapter[Logger] = LoggerAdapter(
-            extra_context_logger,
-            {"extra_context": f"{site_name} | Deployment Failed"},
         )
-
-        if deployment_outcome is None:
-            continue
-
-        traceback_messages: Sequence[str] = traceback.format_exception(deployment_outcome)
-
-        deployment_failed_logger.error(traceback_messages[-1].strip())
-        site_name_logger.debug("%s\n", "".join(traceback_messages[:-1]).strip())
-
-    deployed_site_names: AbstractSet[str] = {
-        site_name
-        for site_name, deployment_outcome in deployed_sites.items()
-        if deployment_outcome is None
-    }
-
-    if deployed_site_names:
-        logger.info("Deploying all sites completed successfully.")
-
-    return deployed_site_names
@@ -10,7 +10,12 @@ if TYPE_CHECKING:
     from collections.abc import Set as AbstractSet
     from typing import Final
 
-__all__: Sequence[str] = ("BaseError", "MutuallyExclusiveArgsError")
+__all__: Sequence[str] = (
+    "BaseError",
+    "MutuallyExclusiveArgsError",
+    "PerformanceBudgetExceededError",
+    "SiteMemoryLimitExceededError",
+)
 
 
 class BaseError(BaseException, abc.ABC):
@@ -116,3 +121,65 @@ class MutuallyExclusiveArgsError(BaseError, ValueError):
             constructed_message += f"or with argument `{'`/`'.join(second_argument)}`"
 
         return constructed_message
+
+
+class PerformanceBudgetExceededError(BaseError, RuntimeError):
+    """Exception class for when a built site's pages exceed its performance budget."""
+
+    @classproperty
+    @override
+    def DEFAULT_MESSAGE(cls) -> str:
+        return "The built site exceeded its configured performance budget."
+
+    @override
+    def __init__(
+        self,
+        message: str | None = None,
+        site_name: str | None = None,
+        budget_violations: Sequence[str] | None = None,
+    ) -> None:
+        self.site_name: str | None = site_name
+        self.budget_violations: Sequence[str] | None = budget_violations
+
+        super().__init__(
+            (
+                message
+                if message or site_name is None or not budget_violations
+                else (
+                    f"Site {site_name!r} exceeded its performance budget: "
+                    f"{'; '.join(budget_violations)}."
+                )
+            ),
+        )
+
+
+class SiteMemoryLimitExceededError(BaseError, RuntimeError):
+    """Exception class for when building a site allocates more memory than is allowed."""
+
+    @classproperty
+    @override
+    def DEFAULT_MESSAGE(cls) -> str:
+        return "Building the site exceeded its configured peak memory limit."
+
+    @override
+    def __init__(
+        self,
+        message: str | None = None,
+        site_name: str | None = None,
+        peak_size: int | None = None,
+        size_limit: int | None = None,
+    ) -> None:
+        self.site_name: str | None = site_name
+        self.peak_size: int | None = peak_size
+        self.size_limit: int | None = size_limit
+
+        super().__init__(
+            (
+                message
+                if message or site_name is None or peak_size is None or size_limit is None
+                else (
+                    f"Building site {site_name!r} allocated a peak of {peak_size} bytes, "
+                    f"exceeding its limit of {size_limit} bytes."
+                )
+            ),
+        )
@@ -0,0 +1,437 @@
+"""Load test the local preview server by replaying realistic page views of each built site."""
+
+import argparse
+import concurrent.futures
+import functools
+import http.client
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+from typing import TYPE_CHECKING, NamedTuple
+
+import build
+import serve
+from sites import SITES_MAP
+from utils import html_assets, logging_setup, manifest
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, MutableMapping, Sequence
+    from pathlib import Path, PurePosixPath
+    from typing import Final
+
+__all__: Sequence[str] = (
+    "LOAD_TEST_VARIANTS",
+    "LoadTestResult",
+    "PageView",
+    "get_site_page_views",
+    "run",
+    "run_load_test",
+)
+
+
+DEFAULT_CONCURRENCY: Final[int] = 8
+DEFAULT_PAGE_VIEW_COUNT: Final[int] = 200
+DEFAULT_SERVER_URL: Final[str] = f"http://{serve.DEFAULT_HOST}:{serve.DEFAULT_PORT}"
+REQUEST_TIMEOUT: Final[float] = 10.0
+
+LOAD_TEST_VARIANTS: Final[Sequence[str]] = ("cold", "warm")
+BROWSER_ACCEPT_ENCODING: Final[str] = "gzip, deflate, br, zstd"
+
+
+class PageView(NamedTuple):
+    """The paths of every request made by a browser to view a single page (page first)."""
+
+    page_path: PurePosixPath
+    request_paths: Sequence[PurePosixPath]
+
+
+class _PageViewOutcome(NamedTuple):
+    latency: float
+    request_latencies: Sequence[float]
+    transferred_size: int
+    error_count: int
+
+
+class LoadTestResult(NamedTuple):
+    """The measurements of replaying many page views of a single site, in a single variant."""
+
+    site_name: str
+    variant: str
+    duration: float
+    page_view_latencies: Sequence[float]
+    request_latencies: Sequence[float]
+    transferred_size: int
+    error_count: int
+
+    @property
+    def requests_per_page_view(self) -> float:
+        """The mean number of requests made by each page view."""
+        return len(self.request_latencies) / max(len(self.page_view_latencies), 1)
+
+    @property
+    def bytes_per_page_view(self) -> float:
+        """The mean size of the response bodies received by each page view."""
+        return self.transferred_size / max(len(self.page_view_latencies), 1)
+
+    @property
+    def page_views_per_second(self) -> float:
+        """The throughput of page views, across every concurrent client."""
+        return len(self.page_view_latencies) / self.duration
+
+    @property
+    def requests_per_second(self) -> float:
+        """The throughput of requests, across every concurrent client."""
+        return len(self.request_latencies) / self.duration
+
+
+def _get_percentile(latencies: Sequence[float], percentile: int) -> float:
+    if len(latencies) < 2:
+        return latencies[0] if latencies else 0.0
+
+    return statistics.quantiles(latencies, n=100, method="inclusive")[percentile - 1]
+
+
+def get_site_page_views(site_name: str) -> Sequence[PageView]:
+    """
+    Get a page view for every HTML page of the given (built) site.
+
+    Each page view requests the page, followed by every same-site asset that a browser
+    would fetch when loading it (see `html_assets.get_page_view_asset_references()`).
+    """
+    SITE_DEPLOY_DIRECTORY: Final[Path] = build.get_site_deploy_directory(site_name)
+    SITE_MANIFEST: Final[manifest.Manifest] = manifest.load_site_manifest(
+        SITE_DEPLOY_DIRECTORY
+    )
+
+    return [
+        PageView(
+            page_path=page_path,
+            request_paths=[
+                page_path,
+                *html_assets.get_page_view_asset_references(
+                    page_path, (SITE_DEPLOY_DIRECTORY / page_path).read_text(encoding="utf-8")
+                ),
+            ],
+        )
+        for page_path in sorted(SITE_MANIFEST.files)
+        if page_path.suffix == ".html"
+    ]
+
+
+class _LoadTestClient:
+    """
+    Replays page views against the preview server, with one connection per thread.
+
+    Every request is sent with the site's name as its `Host` header,
+    so that the server selects the site when serving all sites at once.
+    """
+
+    def __init__(self, server_url: str, *, site_name: str) -> None:
+        split_server_url: urllib.parse.SplitResult = urllib.parse.urlsplit(server_url)
+        if split_server_url.scheme != "http" or split_server_url.hostname is None:
+            INVALID_SERVER_URL_MESSAGE: Final[str] = (
+                f"Server URL must be an `http://` URL, not: {server_url!r}."
+            )
+            raise ValueError(INVALID_SERVER_URL_MESSAGE)
+
+        self.site_name: str = site_name
+        self.etags: MutableMapping[PurePosixPath, str] = {}
+
+        self._hostname: str = split_server_url.hostname
+        self._port: int = split_server_url.port or 80
+        self._thread_local: threading.local = threading.local()
+        self._connections: list[http.client.HTTPConnection] = []
+        self._connections_lock: threading.Lock = threading.Lock()
+
+    def _get_connection(self) -> http.client.HTTPConnection:
+        connection: http.client.HTTPConnection | None = getattr(
+            self._thread_local, "connection", None
+        )
+        if connection is None:
+            connection = http.client.HTTPConnection(
+                self._hostname, self._port, timeout=REQUEST_TIMEOUT
+            )
+            self._thread_local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+
+        return connection
+
+    def close(self) -> None:
+        """Close every thread's connection to the server."""
+        with self._connections_lock:
+            connection: http.client.HTTPConnection
+            for connection in self._connections:
+                connection.close()
+
+            self._connections.clear()
+
+    def _request(
+        self, request_path: PurePosixPath, *, variant: str
+    ) -> tuple[float, int, int] | None:
+        """
+        Request the given path as a browser would in the given variant.
+
+        In the warm variant, files that are still fresh in the browser's cache
+        (according to the production `Cache-Control` policy) are not requested at all,
+        in which case `None` is returned.
+        """
+        headers: dict[str, str] = {
+            "Host": self.site_name,
+            "Accept-Encoding": BROWSER_ACCEPT_ENCODING,
+        }
+        if variant == "warm":
+            if "no-cache" not in serve.get_cache_control(request_path):
+                return None
+
+            etag: str | None = self.etags.get(request_path)
+            if etag is not None:
+                headers["If-None-Match"] = etag
+
+        connection: Final[http.client.HTTPConnection] = self._get_connection()
+
+        start_time: Final[float] = time.perf_counter()
+        connection.request(
+            "GET", f"/{urllib.parse.quote(request_path.as_posix())}", headers=headers
+        )
+        response: Final[http.client.HTTPResponse] = connection.getresponse()
+        response_body: Final[bytes] = response.read()
+        latency: Final[float] = time.perf_counter() - start_time
+
+        response_etag: str | None = response.getheader("ETag")
+        if variant == "cold" and response_etag is not None:
+            self.etags[request_path] = response_etag
+
+        if response.will_close:
+            connection.close()
+
+        return latency, len(response_body), int(response.status >= 400)
+
+    def replay_page_view(self, page_view: PageView, *, variant: str) -> _PageViewOutcome:
+        """Request every path of the given page view in turn, as the given variant."""
+        request_latencies: list[float] = []
+        transferred_size: int = 0
+        error_count: int = 0
+
+        start_time: Final[float] = time.perf_counter()
+
+        request_path: PurePosixPath
+        for request_path in page_view.request_paths:
+            request_outcome: tuple[float, int, int] | None = self._request(
+                request_path, variant=variant
+            )
+            if request_outcome is None:
+                continue
+
+            request_latencies.append(request_outcome[0])
+            transferred_size += request_outcome[1]
+            error_count += request_outcome[2]
+
+        return _PageViewOutcome(
+            latency=time.perf_counter() - start_time,
+            request_latencies=request_latencies,
+            transferred_size=transferred_size,
+            error_count=error_count,
+        )
+
+
+def _replay_page_views(
+    load_test_client: _LoadTestClient,
+    page_views: Sequence[PageView],
+    *,
+    variant: str,
+    concurrency: int,
+) -> LoadTestResult:
+    """
+    Replay all the given page views with `concurrency` clients at once.
+
+    Every connection is closed afterwards,
+    so that idle connections do not hold any of the server's workers during the next run.
+    """
+    start_time: Final[float] = time.perf_counter()
+
+    try:
+        executor: concurrent.futures.ThreadPoolExecutor
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            page_view_outcomes: Sequence[_PageViewOutcome] = list(
+                executor.map(
+                    functools.partial(load_test_client.replay_page_view, variant=variant),
+                    page_views,
+                )
+            )
+    finally:
+        load_test_client.close()
+
+    return LoadTestResult(
+        site_name=load_test_client.site_name,
+        variant=variant,
+        duration=time.perf_counter() - start_time,
+        page_view_latencies=[
+            page_view_outcome.latency for page_view_outcome in page_view_outcomes
+        ],
+        request_latencies=[
+            request_latency
+            for page_view_outcome in page_view_outcomes
+            for request_latency in page_view_outcome.request_latencies
+        ],
+        transferred_size=sum(
+            page_view_outcome.transferred_size for page_view_outcome in page_view_outcomes
+        ),
+        error_count=sum(
+            page_view_outcome.error_count for page_view_outcome in page_view_outcomes
+        ),
+    )
+
+
+def run_load_test(
+    *,
+    site_names: Iterable[str],
+    server_url: str = DEFAULT_SERVER_URL,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    page_view_count: int = DEFAULT_PAGE_VIEW_COUNT,
+) -> Sequence[LoadTestResult]:
+    """
+    Replay page views of each given site against the running preview server.
+
+    Each site is load tested cold (an empty browser cache), then warm
+    (a browser cache filled by the cold run, so only revalidated files are requested).
+    The given number of page views is spread evenly across every page of the site,
+    and replayed by `concurrency` clients at once.
+    """
+    load_test_results: list[LoadTestResult] = []
+
+    site_name: str
+    for site_name in site_names:
+        site_page_views: Sequence[PageView] = get_site_page_views(site_name)
+        if not site_page_views:
+            continue
+
+        replayed_page_views: Sequence[PageView] = [
+            site_page_views[page_view_number % len(site_page_views)]
+            for page_view_number in range(page_view_count)
+        ]
+        load_test_client: _LoadTestClient = _LoadTestClient(server_url, site_name=site_name)
+
+        # NOTE: The variants must run in order, because the warm variant revalidates the ETags
+        # received by the cold variant
+        load_test_results.extend(
+            _replay_page_views(
+                load_test_client,
+                replayed_page_views,
+                variant=variant,
+                concurrency=concurrency,
+            )
+            for variant in LOAD_TEST_VARIANTS
+        )
+
+    return load_test_results
+
+
+def _format_load_test_results(load_test_results: Iterable[LoadTestResult]) -> str:
+    LOAD_TEST_RESULTS: Final[Sequence[LoadTestResult]] = list(load_test_results)
+    NAME_COLUMN_WIDTH: Final[int] = max(
+        (
+            len(f"{load_test_result.site_name}/{load_test_result.variant}")
+            for load_test_result in LOAD_TEST_RESULTS
+        ),
+        default=0,
+    )
+
+    HEADER_LINE: Final[str] = (
+        f"{'Load test':<{NAME_COLUMN_WIDTH}}  {'Req/view':>8}  {'KiB/view':>8}  "
+        f"{'Views/s':>8}  {'Req/s':>8}  {'Req p50':>9}  {'Req p99':>9}  "
+        f"{'View p50':>9}  {'View p99':>9}  {'Errors':>6}"
+    )
+
+    return "\n".join(
+        (
+            HEADER_LINE,
+            *(
+                f"{f'{result.site_name}/{result.variant}':<{NAME_COLUMN_WIDTH}}  "
+                f"{result.requests_per_page_view:>8.1f}  "
+                f"{result.bytes_per_page_view / 1024:>8.1f}  "
+                f"{result.page_views_per_second:>8.1f}  "
+                f"{result.requests_per_second:>8.1f}  "
+                f"{_get_percentile(result.request_latencies, 50) * 1000:>7.2f}ms  "
+                f"{_get_percentile(result.request_latencies, 99) * 1000:>7.2f}ms  "
+                f"{_get_percentile(result.page_view_latencies, 50) * 1000:>7.2f}ms  "
+                f"{_get_percentile(result.page_view_latencies, 99) * 1000:>7.2f}ms  "
+                f"{result.error_count:>6d}"
+                for result in LOAD_TEST_RESULTS
+            ),
+        )
+    )
+
+
+def _get_argument_parser() -> argparse.ArgumentParser:
+    argument_parser: Final[argparse.ArgumentParser] = argparse.ArgumentParser(
+        prog="python -m loadtest", description=__doc__
+    )
+    argument_parser.add_argument(
+        "--site",
+        action="append",
+        choices=list(SITES_MAP),
+        dest="sites",
+        help="Only load test this site (may be given multiple times). (Default: all sites)",
+    )
+    argument_parser.add_argument(
+        "--server-url",
+        default=DEFAULT_SERVER_URL,
+        help="URL of the running preview server (`python -m serve`). (Default: %(default)s)",
+    )
+    argument_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Number of clients replaying page views at once. (Default: %(default)d)",
+    )
+    argument_parser.add_argument(
+        "--page-views",
+        type=int,
+        default=DEFAULT_PAGE_VIEW_COUNT,
+        help="Number of page views replayed per site & variant. (Default: %(default)d)",
+    )
+    return argument_parser
+
+
+def run(argv: Sequence[str] | None = None) -> int:
+    """Run the load test, returning a non-zero exit code if the server could not be reached."""
+    parsed_arguments: Final[argparse.Namespace] = _get_argument_parser().parse_args(argv)
+
+    logging_setup.setup(verbosity=0)
+
+    if parsed_arguments.concurrency < 1 or parsed_arguments.page_views < 1:
+        INVALID_LOAD_MESSAGE: Final[str] = (
+            "Concurrency & number of page views must both be at least 1."
+        )
+        raise ValueError(INVALID_LOAD_MESSAGE)
+
+    try:
+        load_test_results: Sequence[LoadTestResult] = run_load_test(
+            site_names=parsed_arguments.sites or list(SITES_MAP),
+            server_url=parsed_arguments.server_url,
+            concurrency=parsed_arguments.concurrency,
+            page_view_count=parsed_arguments.page_views,
+        )
+    except FileNotFoundError as file_not_found_error:
+        sys.stderr.write(
+            f"Could not find built site ({file_not_found_error.filename}): "
+            "build the sites first.\n"
+        )
+        return 1
+    except ConnectionRefusedError:
+        sys.stderr.write(
+            f"Could not connect to {parsed_arguments.server_url}: "
+            "start the preview server first (with `python -m serve`).\n"
+        )
+        return 1
+
+    sys.stdout.write(f"{_format_load_test_results(load_test_results)}\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
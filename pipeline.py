@@ -0,0 +1,134 @@
+"""Pipelined build & deploy orchestration, so that site uploads overlap with rendering."""
+
+import asyncio
+import contextlib
+import logging
+import os
+from typing import TYPE_CHECKING
+
+import build
+import deploy
+from sites import SITES_MAP
+from utils import PROJECT_ROOT, manifest
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Sequence
+    from collections.abc import Set as AbstractSet
+    from logging import Logger
+    from pathlib import Path
+    from typing import Final, Literal
+
+    from utils import CaughtException
+    from utils.validators import Hostname, Username
+
+__all__: Sequence[str] = ("build_and_deploy_all_sites",)
+
+
+logger: Final[Logger] = logging.getLogger("static-websites-builder")
+
+
+def _estimate_site_size(site_name: str) -> int:
+    """
+    Estimate the total size of the given site, before it has been built.
+
+    The manifest from the site's previous build is used if there is one,
+    otherwise the size of the site's static directory (which dominates its total size).
+    """
+    site_deploy_directory: Path = build.get_site_deploy_directory(site_name)
+    if manifest.get_site_manifest_path(site_deploy_directory).is_file():
+        return manifest.load_site_manifest(site_deploy_directory).total_size
+
+    return sum(
+        (PROJECT_ROOT / "static" / site_name / directory_path / file_name).stat().st_size
+        for directory_path, _, file_names in os.walk(PROJECT_ROOT / "static" / site_name)
+        for file_name in file_names
+    )
+
+
+def build_and_deploy_all_sites(  # noqa: PLR0913
+    *,
+    site_names: AbstractSet[str] | None = None,
+    verbosity: Literal[0, 1, 2, 3] = 1,
+    remote_targets: Sequence[deploy.DeployTarget] | None = None,
+    remote_hostname: Hostname | None = None,
+    remote_username: Username | None = None,
+    remote_directory: Path | None = None,
+    host_concurrency: int = deploy.DEFAULT_HOST_CONCURRENCY,
+    atomic_promotion: bool = False,
+    preflight: bool = True,
+    dry_run: bool = False,
+    use_site_cache: bool = True,
+) -> tuple[AbstractSet[Path], AbstractSet[str]]:
+    """
+    Build all sites, deploying each one as soon as it has been built.
+
+    Sites are built one at a time in a worker thread,
+    while the uploads of previously built sites continue on the event loop,
+    so the total time approaches the longer of the build & deploy phases,
+    rather than their sum.
+    A site that fails to build is reported in the same way as by `build.build_all_sites()`,
+    and is never deployed.
+    See `build.try_build_single_site()` for the meaning of `use_site_cache`.
+
+    Returns the paths of all successfully built sites,
+    and the names of all successfully deployed sites.
+    """
+    SELECTED_SITE_NAMES: Final[Sequence[str]] = [
+        site_name for site_name in SITES_MAP if site_names is None or site_name in site_names
+    ]
+
+    built_sites: Final[dict[Path, CaughtException | None]] = {}
+
+    async def _build_sites_in_turn() -> AsyncGenerator[Path]:
+        logger.info("Begin building all sites.")
+
+        try:
+            site_name: str
+            for site_name in SELECTED_SITE_NAMES:
+                build_outcome: CaughtException | None = await asyncio.to_thread(
+                    build.try_build_single_site,
+                    site_name=site_name,
+                    use_site_cache=use_site_cache,
+                )
+                built_sites[build.get_site_deploy_directory(site_name)] = build_outcome
+
+                if build_outcome is None:
+                    yield build.get_site_deploy_directory(site_name)
+
+        finally:
+            build.report_build_outcomes(built_sites)
+
+    async def _build_and_deploy_all_sites() -> AbstractSet[str]:
+        built_site_paths: AsyncGenerator[Path]
+        async with contextlib.aclosing(_build_sites_in_turn()) as built_site_paths:
+            return await deploy.deploy_sites_as_built(
+                built_site_paths,
+                expected_site_sizes=(
+                    {
+                        site_name: _estimate_site_size(site_name)
+                        for site_name in SELECTED_SITE_NAMES
+                    }
+                    if preflight and not dry_run
+                    else {}
+                ),
+                verbosity=verbosity,
+                remote_targets=remote_targets,
+                remote_hostname=remote_hostname,
+                remote_username=remote_username,
+                remote_directory=remote_directory,
+                host_concurrency=host_concurrency,
+                atomic_promotion=atomic_promotion,
+                preflight=preflight,
+                dry_run=dry_run,
+            )
+
+    deployed_site_names: Final[AbstractSet[str]] = asyncio.run(_build_and_deploy_all_sites())
+
+    return (
+        {
+            site_path
+            for site_path, build_outcome in built_sites.items()
+            if build_outcome is None
+        },
+        deployed_site_names,
+    )
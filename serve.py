@@ -0,0 +1,723 @@
+"""Local preview server for built sites, mirroring production compression & caching."""
+
+import argparse
+import concurrent.futures
+import gzip
+import http.server
+import logging
+import mimetypes
+import threading
+import urllib.parse
+from http import HTTPStatus
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING, NamedTuple, cast, override
+
+import build
+from sites import SITES_MAP
+from utils import budgets, cache, logging_setup, manifest
+
+if TYPE_CHECKING:
+    import socket
+    from collections.abc import Iterable, Mapping, Sequence
+    from logging import Logger
+    from pathlib import Path
+    from typing import BinaryIO, ClassVar, Final, Literal
+
+__all__: Sequence[str] = ("LiveReloadBroadcaster", "get_cache_control", "run", "serve")
+
+
+logger: Final[Logger] = logging.getLogger("static-websites-builder")
+
+DEFAULT_HOST: Final[str] = "127.0.0.1"
+DEFAULT_PORT: Final[int] = 8000
+DEFAULT_WORKER_COUNT: Final[int] = 8
+KEEP_ALIVE_TIMEOUT: Final[float] = 5.0
+COPY_CHUNK_SIZE: Final[int] = 64 * 1024
+
+LIVE_RELOAD_PATH: Final[str] = "/__live-reload"
+LIVE_RELOAD_KEEP_ALIVE_INTERVAL: Final[float] = 15.0
+LIVE_RELOAD_SCRIPT: Final[bytes] = (
+    f'<script>new EventSource("{LIVE_RELOAD_PATH}")'
+    '.addEventListener("reload",()=>location.reload());</script>\n'
+).encode()
+
+# NOTE: In order of preference, when the client accepts more than one
+SIDECAR_ENCODINGS: Final[Sequence[tuple[str, str]]] = (("br", ".br"), ("gzip", ".gz"))
+
+REVALIDATED_CACHE_CONTROL: Final[str] = "no-cache"
+STATIC_CACHE_CONTROL: Final[str] = "public, max-age=86400, stale-while-revalidate=604800"
+ROOT_ASSET_CACHE_CONTROL: Final[str] = "public, max-age=3600"
+
+
+def get_cache_control(page_path: PurePosixPath) -> str:
+    """
+    Get the `Cache-Control` header that the given file of a site is served with in production.
+
+    HTML pages are always revalidated (cheaply, by ETag), so that deployments appear at once.
+    Static files are not fingerprinted, so are only cached for a day (whilst revalidating),
+    and the remaining root files (e.g. favicons & web manifests) for an hour.
+    """
+    if page_path.suffix in {".html", ""}:
+        return REVALIDATED_CACHE_CONTROL
+
+    if page_path.parts[0] == "static":
+        return STATIC_CACHE_CONTROL
+
+    return ROOT_ASSET_CACHE_CONTROL
+
+
+def _get_gzipped_content(file_path: Path, *, sha256: str) -> bytes:
+    """Gzip the given file (as production's web server does), cached by its content hash."""
+    cache_key: Final[str] = cache.get_cache_key("gzip", str(budgets.COMPRESSION_LEVEL), sha256)
+    cached_gzipped_content: bytes | None = cache.load("gzipped_files", cache_key)
+    if cached_gzipped_content is not None:
+        return cached_gzipped_content
+
+    gzipped_content: Final[bytes] = gzip.compress(
+        file_path.read_bytes(), compresslevel=budgets.COMPRESSION_LEVEL, mtime=0
+    )
+    cache.store("gzipped_files", cache_key, gzipped_content)
+
+    return gzipped_content
+
+
+class _ByteRange(NamedTuple):
+    start: int
+    end: int
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start + 1
+
+
+def _parse_byte_range(raw_range: str, size: int) -> _ByteRange | Literal[False] | None:
+    """
+    Parse a single-range `Range` header against a representation of the given size.
+
+    `None` is returned if the header should be ignored (e.g. it requests multiple ranges),
+    and `False` if the requested range cannot be satisfied.
+    """
+    unit: str
+    raw_byte_range: str
+    unit, _, raw_byte_range = raw_range.strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in raw_byte_range:
+        return None
+
+    raw_start: str
+    raw_end: str
+    raw_start, _, raw_end = raw_byte_range.strip().partition("-")
+    if not (raw_start.isdecimal() or raw_end.isdecimal()):
+        return None
+
+    if not raw_start:
+        suffix_length: int = int(raw_end)
+        if suffix_length == 0 or size == 0:
+            return False
+
+        return _ByteRange(start=max(size - suffix_length, 0), end=size - 1)
+
+    start: int = int(raw_start)
+    end: int = min(int(raw_end), size - 1) if raw_end.isdecimal() else size - 1
+    if start >= size or end < start:
+        return False
+
+    return _ByteRange(start=start, end=end)
+
+
+def _parse_accepted_encodings(raw_accept_encoding: str) -> Mapping[str, float]:
+    accepted_encodings: dict[str, float] = {}
+
+    raw_accepted_encoding: str
+    for raw_accepted_encoding in raw_accept_encoding.split(","):
+        encoding: str
+        raw_parameters: str
+        encoding, _, raw_parameters = raw_accepted_encoding.partition(";")
+
+        quality: float = 1.0
+        raw_parameter: str
+        for raw_parameter in raw_parameters.split(";"):
+            parameter_name: str
+            parameter_value: str
+            parameter_name, _, parameter_value = raw_parameter.partition("=")
+            if parameter_name.strip().lower() == "q":
+                try:
+                    quality = float(parameter_value)
+                except ValueError:
+                    quality = 0.0
+
+        if encoding.strip():
+            accepted_encodings[encoding.strip().lower()] = quality
+
+    return accepted_encodings
+
+
+def _etag_matches(raw_etags: str, etag: str) -> bool:
+    """Whether any of the given `If-None-Match` entity tags weakly match the given one."""
+    if raw_etags.strip() == "*":
+        return True
+
+    return any(
+        raw_etag.strip().removeprefix("W/") == etag.removeprefix("W/")
+        for raw_etag in raw_etags.split(",")
+    )
+
+
+class _ServedSite:
+    """A built site being served, whose manifest is reloaded whenever it is rebuilt."""
+
+    def __init__(self, site_name: str) -> None:
+        self.site_name: str = site_name
+        self.site_deploy_directory: Path = build.get_site_deploy_directory(site_name)
+
+        self._manifest: manifest.Manifest | None = None
+        self._manifest_modification_time: int | None = None
+        self._manifest_lock: threading.Lock = threading.Lock()
+
+    def get_manifest(self) -> manifest.Manifest | None:
+        """Get the site's current manifest, or `None` if the site has not been built."""
+        try:
+            manifest_modification_time: int = (
+                manifest.get_site_manifest_path(self.site_deploy_directory).stat().st_mtime_ns
+            )
+        except FileNotFoundError:
+            return None
+
+        with self._manifest_lock:
+            if manifest_modification_time != self._manifest_modification_time:
+                self._manifest = manifest.load_site_manifest(self.site_deploy_directory)
+                self._manifest_modification_time = manifest_modification_time
+
+            return self._manifest
+
+
+class LiveReloadBroadcaster:
+    """
+    Broadcasts that sites have been rebuilt to the pages open in browsers, using SSE.
+
+    Whilst a preview server has a broadcaster, every HTML page it serves
+    subscribes to the server-sent events of its site, and reloads itself when notified.
+    """
+
+    def __init__(self) -> None:
+        """Create a broadcaster, with no sites having been reloaded yet."""
+        self._condition: threading.Condition = threading.Condition()
+        self._reload_counts: dict[str, int] = {}
+        self._is_closed: bool = False
+
+    @property
+    def is_closed(self) -> bool:
+        """Whether the broadcaster has been closed, so every event stream should end."""
+        return self._is_closed
+
+    def get_reload_count(self, site_name: str) -> int:
+        """Get the number of times that the given site has been reloaded."""
+        with self._condition:
+            return self._reload_counts.get(site_name, 0)
+
+    def notify_reload(self, site_names: Iterable[str]) -> None:
+        """Notify the pages of each of the given sites that they should be reloaded."""
+        with self._condition:
+            site_name: str
+            for site_name in site_names:
+                self._reload_counts[site_name] = self._reload_counts.get(site_name, 0) + 1
+
+            self._condition.notify_all()
+
+    def wait_for_reload(self, site_name: str, reload_count: int, *, timeout: float) -> bool:
+        """Wait until the given site is reloaded again, returning whether it has been."""
+        with self._condition:
+            return (
+                self._condition.wait_for(
+                    lambda: (
+                        self._is_closed
+                        or self._reload_counts.get(site_name, 0) != reload_count
+                    ),
+                    timeout=timeout,
+                )
+                and not self._is_closed
+            )
+
+    def close(self) -> None:
+        """End every event stream, so that the workers serving them can be stopped."""
+        with self._condition:
+            self._is_closed = True
+            self._condition.notify_all()
+
+
+class _WorkerPoolHTTPServer(http.server.HTTPServer):
+    """
+    HTTP server that handles each connection on one of a fixed pool of worker threads.
+
+    Unlike `ThreadingHTTPServer` (which starts a new thread for every connection),
+    this bounds the concurrency, like the worker processes of a production web server.
+    """
+
+    def __init__(
+        self,
+        server_address: tuple[str, int],
+        *,
+        worker_count: int,
+        served_sites: Mapping[str, _ServedSite],
+        fixed_site_name: str | None,
+        live_reload_broadcaster: LiveReloadBroadcaster | None,
+    ) -> None:
+        self.served_sites: Mapping[str, _ServedSite] = served_sites
+        self.fixed_site_name: str | None = fixed_site_name
+        self.live_reload_broadcaster: LiveReloadBroadcaster | None = live_reload_broadcaster
+        self._worker_pool: concurrent.futures.ThreadPoolExecutor = (
+            concurrent.futures.ThreadPoolExecutor(
+                max_workers=worker_count, thread_name_prefix="serve-worker"
+            )
+        )
+
+        super().__init__(server_address, _PreviewRequestHandler)
+
+    def _process_request_in_worker(
+        self, request: socket.socket | tuple[bytes, socket.socket], client_address: object
+    ) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # noqa: BLE001
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    @override
+    def process_request(
+        self, request: socket.socket | tuple[bytes, socket.socket], client_address: object
+    ) -> None:
+        self._worker_pool.submit(self._process_request_in_worker, request, client_address)
+
+    @override
+    def server_close(self) -> None:
+        super().server_close()
+        self._worker_pool.shutdown(wait=True, cancel_futures=True)
+
+
+class _PreviewRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout: ClassVar[float | None] = KEEP_ALIVE_TIMEOUT
+
+    # NOTE: Headers & body are written separately, so Nagle's algorithm (combined with
+    # delayed ACKs) would otherwise add ~40ms to every response, unlike production servers
+    disable_nagle_algorithm: ClassVar[bool] = True
+
+    @property
+    def _preview_server(self) -> _WorkerPoolHTTPServer:
+        return cast("_WorkerPoolHTTPServer", self.server)
+
+    @override
+    def log_message(self, format: str, *args: object) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _select_site(self) -> _ServedSite | None:
+        """Select the site to serve, either the fixed one or by the request's `Host` header."""
+        if self._preview_server.fixed_site_name is not None:
+            return self._preview_server.served_sites[self._preview_server.fixed_site_name]
+
+        host: str = self.headers.get("Host", "").rpartition(":")[0] or self.headers.get(
+            "Host", ""
+        )
+        host = host.strip().lower().removesuffix(".")
+
+        site_name: str
+        served_site: _ServedSite
+        for site_name, served_site in self._preview_server.served_sites.items():
+            if host == site_name or host.startswith(f"{site_name}."):
+                return served_site
+
+        return None
+
+    def _send_empty_response(
+        self, status: HTTPStatus, headers: Mapping[str, str] | None = None
+    ) -> None:
+        self.send_response(status)
+
+        header_name: str
+        header_value: str
+        for header_name, header_value in (headers or {}).items():
+            self.send_header(header_name, header_value)
+
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _find_page_path(self, site_manifest: manifest.Manifest) -> PurePosixPath | None:
+        raw_path: str = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        requested_path: PurePosixPath = PurePosixPath(raw_path.lstrip("/"))
+        if ".." in requested_path.parts:
+            return None
+
+        if not requested_path.name:
+            return (
+                PurePosixPath("index.html")
+                if PurePosixPath("index.html") in site_manifest.files
+                else None
+            )
+
+        candidate_path: PurePosixPath
+        for candidate_path in (
+            requested_path,
+            requested_path / "index.html",
+            requested_path.with_name(f"{requested_path.name}.html"),
+        ):
+            if candidate_path in site_manifest.files:
+                return candidate_path
+
+        return None
+
+    def _negotiate_representation(
+        self, page_path: PurePosixPath, site_manifest: manifest.Manifest
+    ) -> tuple[PurePosixPath, str | None, bool]:
+        """
+        Choose the precompressed sidecar (if any) of the given file to send.
+
+        Compressible files without a sidecar are instead gzipped on the fly (if accepted),
+        as production's web server does, in which case the file's own path is returned.
+        Returns the path of the representation to send, its `Content-Encoding`,
+        and whether the response varies by `Accept-Encoding` at all.
+        """
+        accepted_encodings: Mapping[str, float] = _parse_accepted_encodings(
+            self.headers.get("Accept-Encoding", "")
+        )
+        varies: bool = False
+
+        encoding: str
+        sidecar_suffix: str
+        for encoding, sidecar_suffix in SIDECAR_ENCODINGS:
+            sidecar_path: PurePosixPath = page_path.with_name(
+                f"{page_path.name}{sidecar_suffix}"
+            )
+            if sidecar_path not in site_manifest.files:
+                continue
+
+            varies = True
+            if accepted_encodings.get(encoding, accepted_encodings.get("*", 0.0)) > 0:
+                return sidecar_path, encoding, varies
+
+        if not varies and budgets.is_compressible(page_path):
+            varies = True
+            if accepted_encodings.get("gzip", accepted_encodings.get("*", 0.0)) > 0:
+                return page_path, "gzip", varies
+
+        return page_path, None, varies
+
+    def _serve(self, *, send_body: bool) -> None:
+        served_site: _ServedSite | None = self._select_site()
+        site_manifest: manifest.Manifest | None = (
+            served_site.get_manifest() if served_site is not None else None
+        )
+        page_path: PurePosixPath | None = (
+            self._find_page_path(site_manifest) if site_manifest is not None else None
+        )
+        if served_site is None or site_manifest is None or page_path is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        representation_path: PurePosixPath
+        content_encoding: str | None
+        varies: bool
+        representation_path, content_encoding, varies = self._negotiate_representation(
+            page_path, site_manifest
+        )
+        if (
+            self._preview_server.live_reload_broadcaster is not None
+            and page_path.suffix == ".html"
+        ):
+            self._serve_live_reloaded_page(
+                served_site.site_deploy_directory / page_path, send_body=send_body
+            )
+            return
+
+        representation: manifest.ManifestEntry = site_manifest.files[representation_path]
+        gzipped_content: bytes | None = (
+            _get_gzipped_content(
+                served_site.site_deploy_directory / page_path, sha256=representation.sha256
+            )
+            if content_encoding is not None and representation_path == page_path
+            else None
+        )
+        representation_size: int = (
+            len(gzipped_content) if gzipped_content is not None else representation.size
+        )
+        etag: str = (
+            f'"{representation.sha256}-gzip"'
+            if gzipped_content is not None
+            else f'"{representation.sha256}"'
+        )
+
+        content_type: str | None = mimetypes.guess_type(page_path.name)[0]
+        headers: dict[str, str] = {
+            "ETag": etag,
+            "Cache-Control": get_cache_control(page_path),
+            "Accept-Ranges": "bytes",
+        }
+        if varies:
+            headers["Vary"] = "Accept-Encoding"
+
+        if _etag_matches(self.headers.get("If-None-Match", ""), etag):
+            self._send_empty_response(HTTPStatus.NOT_MODIFIED, headers)
+            return
+
+        headers["Content-Type"] = (
+            f"{content_type}; charset=utf-8"
+            if content_type is not None and content_type.startswith("text/")
+            else content_type or "application/octet-stream"
+        )
+        if content_encoding is not None:
+            headers["Content-Encoding"] = content_encoding
+
+        byte_range: _ByteRange | Literal[False] | None = None
+        if "Range" in self.headers and self.headers.get("If-Range", etag) == etag:
+            byte_range = _parse_byte_range(self.headers["Range"], representation_size)
+
+        if byte_range is False:
+            headers["Content-Range"] = f"bytes */{representation_size}"
+            self._send_empty_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, headers)
+            return
+
+        if byte_range is None:
+            byte_range = _ByteRange(start=0, end=representation_size - 1)
+            self.send_response(HTTPStatus.OK)
+        else:
+            headers["Content-Range"] = (
+                f"bytes {byte_range.start}-{byte_range.end}/{representation_size}"
+            )
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+
+        header_name: str
+        header_value: str
+        for header_name, header_value in headers.items():
+            self.send_header(header_name, header_value)
+        self.send_header("Content-Length", str(max(byte_range.length, 0)))
+        self.end_headers()
+
+        if send_body and byte_range.length > 0 and gzipped_content is not None:
+            self.wfile.write(gzipped_content[byte_range.start : byte_range.end + 1])
+        elif send_body and byte_range.length > 0:
+            self._copy_file_range(
+                served_site.site_deploy_directory / representation_path, byte_range
+            )
+
+    def _copy_file_range(self, file_path: Path, byte_range: _ByteRange) -> None:
+        file: BinaryIO
+        with file_path.open("rb") as file:
+            file.seek(byte_range.start)
+
+            remaining_length: int = byte_range.length
+            while remaining_length > 0:
+                chunk: bytes = file.read(min(COPY_CHUNK_SIZE, remaining_length))
+                if not chunk:
+                    break
+
+                self.wfile.write(chunk)
+                remaining_length -= len(chunk)
+
+    def _serve_live_reloaded_page(self, page_file_path: Path, *, send_body: bool) -> None:
+        """
+        Serve the given HTML page with the live-reload script injected into it.
+
+        The injected page is never cached (nor served compressed or by range),
+        so that reloading it always fetches the newly rebuilt page.
+        """
+        page_content: bytes = page_file_path.read_bytes()
+        body_end_index: int = page_content.rfind(b"</body>")
+        if body_end_index == -1:
+            body_end_index = len(page_content)
+        page_content = (
+            page_content[:body_end_index] + LIVE_RELOAD_SCRIPT + page_content[body_end_index:]
+        )
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page_content)))
+        self.end_headers()
+
+        if send_body:
+            self.wfile.write(page_content)
+
+    def _stream_live_reload_events(
+        self, live_reload_broadcaster: LiveReloadBroadcaster
+    ) -> None:
+        """Send a `reload` server-sent event whenever the selected site is rebuilt."""
+        served_site: _ServedSite | None = self._select_site()
+        if served_site is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        reload_count: int = live_reload_broadcaster.get_reload_count(served_site.site_name)
+
+        self.close_connection = True
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        try:
+            self.wfile.write(b"retry: 500\n\n")
+            self.wfile.flush()
+
+            while not live_reload_broadcaster.is_closed:
+                if live_reload_broadcaster.wait_for_reload(
+                    served_site.site_name,
+                    reload_count,
+                    timeout=LIVE_RELOAD_KEEP_ALIVE_INTERVAL,
+                ):
+                    self.wfile.write(
+                        f"event: reload\ndata: {served_site.site_name}\n\n".encode()
+                    )
+                    self.wfile.flush()
+                    return
+
+                # NOTE: Comment lines keep idle connections open through proxies,
+                # and detect closed browser tabs, which frees up their worker
+                self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except BrokenPipeError, ConnectionResetError:
+            return
+
+    def do_GET(self) -> None:
+        """Serve the requested file of the selected site."""
+        if (
+            self._preview_server.live_reload_broadcaster is not None
+            and urllib.parse.urlsplit(self.path).path == LIVE_RELOAD_PATH
+        ):
+            self._stream_live_reload_events(self._preview_server.live_reload_broadcaster)
+            return
+
+        self._serve(send_body=True)
+
+    def do_HEAD(self) -> None:
+        """Serve the headers of the requested file of the selected site."""
+        self._serve(send_body=False)
+
+
+def serve(
+    *,
+    site_name: str | None = None,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    worker_count: int = DEFAULT_WORKER_COUNT,
+    live_reload_broadcaster: LiveReloadBroadcaster | None = None,
+) -> None:
+    """
+    Serve the built `deploy/` directories of all sites (or only the given one) until stopped.
+
+    Without a fixed `site_name`, each request's site is chosen by its `Host` header,
+    matching either the site's name itself or any subdomain of it
+    (e.g. `infratek.localhost:8000`).
+    If a `live_reload_broadcaster` is given, every served HTML page is reloaded
+    whenever its site is notified as rebuilt.
+    Each open page holds one worker for its event stream, so set `worker_count` accordingly.
+    """
+    served_sites: Final[Mapping[str, _ServedSite]] = {
+        served_site_name: _ServedSite(served_site_name)
+        for served_site_name in SITES_MAP
+        if site_name is None or served_site_name == site_name
+    }
+
+    preview_server: _WorkerPoolHTTPServer
+    with _WorkerPoolHTTPServer(
+        (host, port),
+        worker_count=worker_count,
+        served_sites=served_sites,
+        fixed_site_name=site_name,
+        live_reload_broadcaster=live_reload_broadcaster,
+    ) as preview_server:
+        logger.info(
+            "Serving %s at http://%s:%d/ with %d worker(s).",
+            site_name or f"all sites (chosen by Host header: {', '.join(served_sites)})",
+            *preview_server.server_address[:2],
+            worker_count,
+        )
+
+        try:
+            preview_server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Stopped serving.")
+        finally:
+            if live_reload_broadcaster is not None:
+                live_reload_broadcaster.close()
+
+
+def _get_argument_parser() -> argparse.ArgumentParser:
+    argument_parser: Final[argparse.ArgumentParser] = argparse.ArgumentParser(
+        prog="python -m serve", description=__doc__
+    )
+    argument_parser.add_argument(
+        "--site",
+        choices=list(SITES_MAP),
+        help="Only serve this site, regardless of the Host header of each request.",
+    )
+    argument_parser.add_argument(
+        "--host",
+        default=DEFAULT_HOST,
+        help="Address to listen on. (Default: %(default)s)",
+    )
+    argument_parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help="Port to listen on. (Default: %(default)d)",
+    )
+    argument_parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKER_COUNT,
+        help="Number of worker threads handling connections. (Default: %(default)d)",
+    )
+    argument_parser.add_argument(
+        "--build",
+        action="store_true",
+        help="Build the served sites before starting to serve them.",
+    )
+    argument_parser.add_argument(
+        "--verbose",
+        "-v",
+        action="count",
+        default=0,
+        help="Log every request (at debug level).",
+    )
+    return argument_parser
+
+
+def run(argv: Sequence[str] | None = None) -> int:
+    """Run the local preview server, returning a non-zero exit code if nothing is built."""
+    parsed_arguments: Final[argparse.Namespace] = _get_argument_parser().parse_args(argv)
+
+    logging_setup.setup(verbosity=2 if parsed_arguments.verbose else 1)
+
+    if parsed_arguments.workers < 1:
+        INVALID_WORKER_COUNT_MESSAGE: Final[str] = "Number of workers must be at least 1."
+        raise ValueError(INVALID_WORKER_COUNT_MESSAGE)
+
+    if parsed_arguments.build:
+        build.build_all_sites(
+            site_names=(
+                frozenset({parsed_arguments.site})
+                if parsed_arguments.site is not None
+                else None
+            )
+        )
+
+    if not any(
+        manifest.get_site_manifest_path(build.get_site_deploy_directory(site_name)).is_file()
+        for site_name in SITES_MAP
+        if parsed_arguments.site is None or site_name == parsed_arguments.site
+    ):
+        logger.error("No built sites to serve. (Build them first, e.g. with `--build`.)")
+        return 1
+
+    serve(
+        site_name=parsed_arguments.site,
+        host=parsed_arguments.host,
+        port=parsed_arguments.port,
+        worker_count=parsed_arguments.workers,
+    )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -1,23 +1,60 @@
 """Common utils made available for use throughout this project."""
 
 import datetime
+import os
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-from git import InvalidGitRepositoryError, Repo
-
 if TYPE_CHECKING:
     from collections.abc import Sequence
-    from subprocess import CalledProcessError
+    from subprocess import CalledProcessError, TimeoutExpired
     from typing import Final
 
-    from git import PathLike
-
     type CaughtException = (
-        ValueError | RuntimeError | AttributeError | TypeError | OSError | CalledProcessError
+        ValueError
+        | RuntimeError
+        | AttributeError
+        | TypeError
+        | OSError
+        | CalledProcessError
+        | TimeoutExpired
     )
 
-__all__: Sequence[str] = ("PROJECT_ROOT", "CaughtException", "get_current_year")
+__all__: Sequence[str] = (
+    "PROJECT_ROOT",
+    "SOURCE_DATE_EPOCH_ENVIRONMENT_VARIABLE_NAME",
+    "CaughtException",
+    "get_current_year",
+    "get_source_date_epoch",
+)
+
+
+PROJECT_ROOT_ENVIRONMENT_VARIABLE_NAME: Final[str] = "STATIC_WEBSITES_BUILDER_PROJECT_ROOT"
+PROJECT_ROOT_MARKER_NAMES: Final[Sequence[str]] = (".git", "pyproject.toml")
+SOURCE_DATE_EPOCH_ENVIRONMENT_VARIABLE_NAME: Final[str] = "SOURCE_DATE_EPOCH"
+
+
+def get_source_date_epoch() -> int | None:
+    """
+    Get the fixed Unix timestamp that reproducible builds use in place of the current time.
+
+    This follows the reproducible-builds.org `SOURCE_DATE_EPOCH` specification,
+    so `None` is returned if the environment variable is not set (or is empty).
+    """
+    raw_source_date_epoch: str = os.environ.get(
+        SOURCE_DATE_EPOCH_ENVIRONMENT_VARIABLE_NAME, ""
+    ).strip()
+    if not raw_source_date_epoch:
+        return None
+
+    if not raw_source_date_epoch.isdecimal():
+        INVALID_SOURCE_DATE_EPOCH_MESSAGE: Final[str] = (
+            f"{SOURCE_DATE_EPOCH_ENVIRONMENT_VARIABLE_NAME} must be a non-negative integer "
+            f"number of seconds since the Unix epoch, not: {raw_source_date_epoch!r}."
+        )
+        raise ValueError(INVALID_SOURCE_DATE_EPOCH_MESSAGE)
+
+    return int(raw_source_date_epoch)
 
 
 def get_current_year() -> int:
@@ -26,24 +63,51 @@ def get_current_year() -> int:
 
     The current year will be retrieved
     based on a timezone-aware understanding of the current date,
-    according to the server this build script is running on.
+    according to the server this build script is running on,
+    unless `SOURCE_DATE_EPOCH` is set, in which case the year of that timestamp is used.
     """
+    source_date_epoch: int | None = get_source_date_epoch()
+    if source_date_epoch is not None:
+        return datetime.datetime.fromtimestamp(source_date_epoch, tz=datetime.UTC).year
+
     return datetime.datetime.now(tz=datetime.UTC).year
 
 
 def _get_project_root() -> Path:
-    try:
-        raw_project_root: PathLike | str | None = Repo(
-            Path.cwd(),
-            search_parent_directories=True,
-        ).working_tree_dir
-    except InvalidGitRepositoryError:
-        raw_project_root = None
-
-    if not raw_project_root:
-        return _get_readme_root()
-
-    return Path(raw_project_root)
+    """
+    Locate the root directory of this project, as cheaply as possible.
+
+    An explicit override from the environment is used if given,
+    otherwise the closest parent directory (of the current working directory)
+    containing a `.git` or `pyproject.toml` marker.
+    GitPython is deliberately not used here,
+    because importing it (and probing for the `git` binary) is slow
+    & would be paid by every invocation of this script.
+    """
+    raw_project_root_override: str = os.environ.get(
+        PROJECT_ROOT_ENVIRONMENT_VARIABLE_NAME, ""
+    ).strip()
+    if raw_project_root_override:
+        project_root_override: Path = Path(raw_project_root_override).expanduser().resolve()
+
+        if not project_root_override.is_dir():
+            INVALID_PROJECT_ROOT_MESSAGE: Final[str] = (
+                f"{PROJECT_ROOT_ENVIRONMENT_VARIABLE_NAME} must be an existing directory."
+            )
+            raise ValueError(INVALID_PROJECT_ROOT_MESSAGE)
+
+        return project_root_override
+
+    current_working_directory: Final[Path] = Path.cwd().resolve()
+
+    directory: Path
+    for directory in (current_working_directory, *current_working_directory.parents):
+        if any(
+            (directory / marker_name).exists() for marker_name in PROJECT_ROOT_MARKER_NAMES
+        ):
+            return directory
+
+    return _get_readme_root()
 
 
 def _get_readme_root() -> Path:
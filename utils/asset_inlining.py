@@ -0,0 +1,219 @@
+"""Inline each site's tiny assets as data URIs, into the pages & stylesheets that use them."""
+
+import base64
+import mimetypes
+import re
+import urllib.parse
+from typing import TYPE_CHECKING
+
+from utils import deploy_files, html_assets, logging_setup
+
+if TYPE_CHECKING:
+    from collections.abc import MutableMapping, MutableSequence, Sequence
+    from collections.abc import Set as AbstractSet
+    from logging import Logger, LoggerAdapter
+    from pathlib import Path, PurePosixPath
+    from typing import Final
+
+__all__: Sequence[str] = ("get_data_uri", "inline_site_assets")
+
+
+INLINED_MEDIA_TYPE_PREFIXES: Final[tuple[str, ...]] = ("font/", "image/")
+REFERENCING_FILE_SUFFIXES: Final[AbstractSet[str]] = {
+    ".css",
+    ".html",
+    ".js",
+    ".json",
+    ".mjs",
+    ".svg",
+    ".webmanifest",
+    ".xml",
+}
+SVG_URL_SAFE_CHARACTERS: Final[str] = " !$&'()*+,-./:;=?@[]_~"
+
+_CSS_URL_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"""url\(\s*(?:"(?P<double_quoted>[^"]*)"|'(?P<single_quoted>[^']*)'"""
+    r"""|(?P<unquoted>[^\s"')]*))\s*\)""",
+    re.IGNORECASE,
+)
+_SVG_INTER_TAG_WHITESPACE_PATTERN: Final[re.Pattern[str]] = re.compile(r">\s+<")
+_SVG_DOUBLE_QUOTED_ATTRIBUTE_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"""=\s*"([^"']*)\""""
+)
+
+
+def _encode_svg(svg_source: str) -> str:
+    """
+    URL-encode the given SVG, which is usually far shorter than base64-encoding it.
+
+    Attribute values are requoted with single quotes, and only the characters
+    that are unsafe within a quoted URL are percent-encoded.
+    """
+    minified_svg_source: Final[str] = _SVG_DOUBLE_QUOTED_ATTRIBUTE_PATTERN.sub(
+        r"='\1'", _SVG_INTER_TAG_WHITESPACE_PATTERN.sub("><", svg_source.strip())
+    )
+
+    return urllib.parse.quote(minified_svg_source, safe=SVG_URL_SAFE_CHARACTERS)
+
+
+def get_data_uri(file_path: Path, *, max_inlined_size: int) -> str | None:
+    """
+    Get the data URI of the given image or font, if it is no larger than `max_inlined_size`.
+
+    SVGs are URL-encoded, and every other format is base64-encoded.
+    `None` is returned for larger files, and for files that are not images or fonts.
+    """
+    media_type: Final[str | None] = mimetypes.guess_type(file_path.name)[0]
+    if (
+        media_type is None
+        or not media_type.startswith(INLINED_MEDIA_TYPE_PREFIXES)
+        or not file_path.is_file()
+        or file_path.stat().st_size > max_inlined_size
+    ):
+        return None
+
+    if media_type == "image/svg+xml":
+        try:
+            return f"data:{media_type},{_encode_svg(file_path.read_text(encoding='utf-8'))}"
+        except UnicodeDecodeError:
+            pass
+
+    return (
+        f"data:{media_type};base64,{base64.b64encode(file_path.read_bytes()).decode('ascii')}"
+    )
+
+
+class _AssetInliner:
+    """Replaces references to a single site's tiny assets, remembering which were inlined."""
+
+    def __init__(self, *, site_deploy_directory: Path, max_inlined_size: int) -> None:
+        self.inlined_paths: set[PurePosixPath] = set()
+        self._site_deploy_directory: Path = site_deploy_directory
+        self._max_inlined_size: int = max_inlined_size
+        self._data_uris: MutableMapping[PurePosixPath, str | None] = {}
+
+    def get_inlined_data_uri(self, referencing_path: PurePosixPath, url: str) -> str | None:
+        """Get the data URI to replace the given URL with, if its asset can be inlined."""
+        if urllib.parse.urlsplit(url).query or "#" in url:
+            return None
+
+        asset_path: Final[PurePosixPath | None] = html_assets.resolve_asset_path(
+            referencing_path, url
+        )
+        if asset_path is None:
+            return None
+
+        if asset_path not in self._data_uris:
+            self._data_uris[asset_path] = get_data_uri(
+                self._site_deploy_directory / asset_path,
+                max_inlined_size=self._max_inlined_size,
+            )
+
+        data_uri: Final[str | None] = self._data_uris[asset_path]
+        if data_uri is not None:
+            self.inlined_paths.add(asset_path)
+
+        return data_uri
+
+    def inline_stylesheet(self, stylesheet_path: PurePosixPath, stylesheet: str) -> str:
+        """Replace the `url()`s of the given stylesheet with the data URIs of their assets."""
+
+        def _replace_url(url_match: re.Match[str]) -> str:
+            data_uri: str | None = self.get_inlined_data_uri(
+                stylesheet_path, next(url for url in url_match.groups() if url is not None)
+            )
+
+            return f'url("{data_uri}")' if data_uri is not None else url_match.group(0)
+
+        return _CSS_URL_PATTERN.sub(_replace_url, stylesheet)
+
+    def inline_page(self, page_path: PurePosixPath, page: str) -> str:
+        """Replace the `src` of the given page's images with the data URIs of their assets."""
+        replacements: MutableSequence[tuple[html_assets.HTMLTag, str]] = []
+
+        image_tag: html_assets.HTMLTag
+        for image_tag in html_assets.parse_tags(page, tag_names={"img"}):
+            if "srcset" in image_tag.attributes:
+                continue
+
+            data_uri: str | None = self.get_inlined_data_uri(
+                page_path, image_tag.get_attribute("src") or ""
+            )
+            if data_uri is not None:
+                replacements.append(
+                    (
+                        image_tag,
+                        html_assets.format_start_tag(
+                            image_tag.name, {**image_tag.attributes, "src": data_uri}
+                        ),
+                    )
+                )
+
+        return html_assets.replace_tags(page, replacements)
+
+
+def inline_site_assets(
+    *, site_deploy_directory: Path, max_inlined_size: int
+) -> AbstractSet[PurePosixPath]:
+    """
+    Inline every tiny image & font referenced by the given built site, as data URIs.
+
+    Both the `url()`s of stylesheets and the `src` attributes of images are inlined
+    (unless the image has a `srcset`, or the URL has a query or fragment).
+    Inlined files are then removed from the site, unless any other file still mentions them.
+    Returns the paths of the removed files.
+    """
+    site_file_paths: Final[Sequence[PurePosixPath]] = deploy_files.get_site_file_paths(
+        site_deploy_directory
+    )
+    asset_inliner: Final[_AssetInliner] = _AssetInliner(
+        site_deploy_directory=site_deploy_directory, max_inlined_size=max_inlined_size
+    )
+
+    file_path: PurePosixPath
+    for file_path in site_file_paths:
+        if file_path.suffix not in {".css", ".html"}:
+            continue
+
+        source: str = (site_deploy_directory / file_path).read_text(encoding="utf-8")
+        inlined_source: str = (
+            asset_inliner.inline_stylesheet(file_path, source)
+            if file_path.suffix == ".css"
+            else asset_inliner.inline_page(file_path, source)
+        )
+        if inlined_source != source:
+            deploy_files.detach_deploy_file(site_deploy_directory, file_path).write_text(
+                inlined_source, encoding="utf-8"
+            )
+
+    referencing_sources: Final[Sequence[str]] = [
+        (site_deploy_directory / path).read_text(encoding="utf-8", errors="replace")
+        for path in site_file_paths
+        if path.suffix in REFERENCING_FILE_SUFFIXES and path not in asset_inliner.inlined_paths
+    ]
+    removed_paths: Final[AbstractSet[PurePosixPath]] = {
+        inlined_path
+        for inlined_path in asset_inliner.inlined_paths
+        if not any(
+            inlined_path.name in referencing_source
+            or urllib.parse.quote(inlined_path.name) in referencing_source
+            for referencing_source in referencing_sources
+        )
+    }
+
+    removed_path: PurePosixPath
+    for removed_path in sorted(removed_paths):
+        deploy_files.detach_deploy_file(site_deploy_directory, removed_path).unlink(
+            missing_ok=True
+        )
+
+    SITE_LOGGER: Final[LoggerAdapter[Logger]] = logging_setup.get_context_logger(
+        site_deploy_directory.name
+    )
+    SITE_LOGGER.debug(
+        "Inlined %d asset(s) as data URIs, removing %d of them.",
+        len(asset_inliner.inlined_paths),
+        len(removed_paths),
+    )
+
+    return removed_paths
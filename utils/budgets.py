@@ -0,0 +1,280 @@
+"""Measure each rendered page's weight & requests, and enforce each site's budgets for them."""
+
+import gzip
+import mimetypes
+from typing import TYPE_CHECKING, NamedTuple
+
+from exceptions import PerformanceBudgetExceededError
+from utils import cache, html_assets, logging_setup
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping, MutableMapping, Sequence
+    from collections.abc import Set as AbstractSet
+    from logging import Logger, LoggerAdapter
+    from pathlib import Path, PurePosixPath
+    from typing import Final
+
+    from utils import manifest
+
+__all__: Sequence[str] = (
+    "PageMeasurements",
+    "PerformanceBudget",
+    "check_site_budget",
+    "is_compressible",
+    "measure_site_pages",
+)
+
+
+COMPRESSION_LEVEL: Final[int] = 6
+COMPRESSIBLE_MEDIA_TYPES: Final[AbstractSet[str]] = {
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/xml",
+    "image/svg+xml",
+    "text/javascript",
+}
+IMAGE_ASSET_KINDS: Final[AbstractSet[str]] = {"icon", "image"}
+SIDECAR_SUFFIXES: Final[Sequence[str]] = (".br", ".gz")
+
+
+class PerformanceBudget(NamedTuple):
+    """
+    The maximum weight & requests allowed for every page of a site.
+
+    Sizes are in bytes, and any limit can be disabled by leaving it as `None`.
+    The first-view transfer size is compressed (as sent over the network),
+    whereas every other size is uncompressed.
+    """
+
+    max_html_size: int | None = None
+    max_first_view_transfer_size: int | None = None
+    max_render_blocking_size: int | None = None
+    max_request_count: int | None = None
+    max_image_size: int | None = None
+
+
+class PageMeasurements(NamedTuple):
+    """The weight & requests of viewing a single page with an empty browser cache."""
+
+    page_path: PurePosixPath
+    html_size: int
+    first_view_transfer_size: int
+    render_blocking_size: int
+    request_count: int
+    image_size: int
+
+
+def is_compressible(file_path: PurePosixPath) -> bool:
+    """Whether the given file is compressed by the web server when it is sent."""
+    media_type: Final[str | None] = mimetypes.guess_type(file_path.name)[0]
+
+    return media_type is not None and (
+        media_type.startswith("text/") or media_type in COMPRESSIBLE_MEDIA_TYPES
+    )
+
+
+def _get_compressed_size(
+    file_path: PurePosixPath,
+    *,
+    site_deploy_directory: Path,
+    site_manifest: manifest.Manifest,
+) -> int:
+    """
+    Get the size of the given file as transferred over the network.
+
+    Precompressed sidecars are used if they exist; otherwise compressible files are
+    gzipped (as the web server would), with each compressed size cached by content hash.
+    """
+    sidecar_sizes: Final[Sequence[int]] = [
+        site_manifest.files[sidecar_path].size
+        for sidecar_path in (
+            file_path.with_name(f"{file_path.name}{sidecar_suffix}")
+            for sidecar_suffix in SIDECAR_SUFFIXES
+        )
+        if sidecar_path in site_manifest.files
+    ]
+    if sidecar_sizes:
+        return min(sidecar_sizes)
+
+    file_entry: Final[manifest.ManifestEntry] = site_manifest.files[file_path]
+    if not is_compressible(file_path):
+        return file_entry.size
+
+    cache_key: Final[str] = cache.get_cache_key(
+        "gzip", str(COMPRESSION_LEVEL), file_entry.sha256
+    )
+    cached_compressed_size: bytes | None = cache.load("compressed_sizes", cache_key)
+    if cached_compressed_size is not None:
+        return int(cached_compressed_size)
+
+    compressed_size: int = len(
+        gzip.compress(
+            (site_deploy_directory / file_path).read_bytes(),
+            compresslevel=COMPRESSION_LEVEL,
+            mtime=0,
+        )
+    )
+    cache.store("compressed_sizes", cache_key, str(compressed_size).encode("ascii"))
+
+    return compressed_size
+
+
+def _is_render_blocking(asset_reference: html_assets.AssetReference) -> bool:
+    """
+    Whether the given asset blocks the page from rendering until it has been fetched.
+
+    This is every stylesheet (except print-only ones),
+    and every script that is neither asynchronous, deferred nor a module.
+    """
+    if asset_reference.kind == "stylesheet":
+        return (asset_reference.tag.get_attribute("media") or "all").strip() != "print"
+
+    if asset_reference.kind == "script":
+        return not (
+            "async" in asset_reference.tag.attributes
+            or "defer" in asset_reference.tag.attributes
+            or asset_reference.tag.get_attribute("type") == "module"
+        )
+
+    return False
+
+
+def measure_site_pages(
+    *, site_deploy_directory: Path, site_manifest: manifest.Manifest
+) -> Sequence[PageMeasurements]:
+    """
+    Measure viewing every HTML page of the given built site with an empty browser cache.
+
+    Each page's requests are resolved from the assets it references
+    (see `html_assets.get_page_view_asset_references()`).
+    Referenced assets that are missing from the site are counted as requests,
+    but do not add to any size.
+    """
+    compressed_sizes: MutableMapping[PurePosixPath, int] = {}
+    page_measurements: list[PageMeasurements] = []
+
+    page_path: PurePosixPath
+    for page_path in sorted(site_manifest.files):
+        if page_path.suffix != ".html":
+            continue
+
+        asset_references: Mapping[PurePosixPath, html_assets.AssetReference] = (
+            html_assets.get_page_view_asset_references(
+                page_path, (site_deploy_directory / page_path).read_text(encoding="utf-8")
+            )
+        )
+        built_asset_paths: Sequence[PurePosixPath] = [
+            asset_path for asset_path in asset_references if asset_path in site_manifest.files
+        ]
+
+        file_path: PurePosixPath
+        for file_path in (page_path, *built_asset_paths):
+            if file_path not in compressed_sizes:
+                compressed_sizes[file_path] = _get_compressed_size(
+                    file_path,
+                    site_deploy_directory=site_deploy_directory,
+                    site_manifest=site_manifest,
+                )
+
+        page_measurements.append(
+            PageMeasurements(
+                page_path=page_path,
+                html_size=site_manifest.files[page_path].size,
+                first_view_transfer_size=sum(
+                    compressed_sizes[file_path]
+                    for file_path in (page_path, *built_asset_paths)
+                ),
+                render_blocking_size=sum(
+                    site_manifest.files[asset_path].size
+                    for asset_path in built_asset_paths
+                    if _is_render_blocking(asset_references[asset_path])
+                ),
+                request_count=1 + len(asset_references),
+                image_size=max(
+                    (
+                        site_manifest.files[asset_path].size
+                        for asset_path in built_asset_paths
+                        if asset_references[asset_path].kind in IMAGE_ASSET_KINDS
+                    ),
+                    default=0,
+                ),
+            )
+        )
+
+    return page_measurements
+
+
+def _get_budget_violations(
+    page_measurements: PageMeasurements, budget: PerformanceBudget
+) -> Sequence[str]:
+    return [
+        (
+            f"{page_measurements.page_path}: {measurement_name} of {measured_value:,d} "
+            f"exceeds budget of {budget_limit:,d}"
+        )
+        for measurement_name, measured_value, budget_limit in (
+            ("HTML size", page_measurements.html_size, budget.max_html_size),
+            (
+                "first-view transfer size",
+                page_measurements.first_view_transfer_size,
+                budget.max_first_view_transfer_size,
+            ),
+            (
+                "render-blocking CSS/JS size",
+                page_measurements.render_blocking_size,
+                budget.max_render_blocking_size,
+            ),
+            ("request count", page_measurements.request_count, budget.max_request_count),
+            ("largest image size", page_measurements.image_size, budget.max_image_size),
+        )
+        if budget_limit is not None and measured_value > budget_limit
+    ]
+
+
+def check_site_budget(
+    site_name: str,
+    *,
+    site_deploy_directory: Path,
+    site_manifest: manifest.Manifest,
+    budget: PerformanceBudget,
+) -> Sequence[PageMeasurements]:
+    """
+    Check every page of the given built site against the site's performance budget.
+
+    Returns the measurements of every page, if they are all within the budget.
+    Otherwise, `PerformanceBudgetExceededError` is raised, listing every violation.
+    """
+    page_measurements: Final[Sequence[PageMeasurements]] = measure_site_pages(
+        site_deploy_directory=site_deploy_directory, site_manifest=site_manifest
+    )
+
+    budget_violations: Final[Sequence[str]] = [
+        budget_violation
+        for single_page_measurements in page_measurements
+        for budget_violation in _get_budget_violations(single_page_measurements, budget)
+    ]
+    if budget_violations:
+        raise PerformanceBudgetExceededError(
+            site_name=site_name, budget_violations=budget_violations
+        )
+
+    SITE_LOGGER: Final[LoggerAdapter[Logger]] = logging_setup.get_context_logger(site_name)
+    SITE_LOGGER.debug(
+        "All %d page(s) are within the site's performance budget.", len(page_measurements)
+    )
+
+    single_page_measurements: PageMeasurements
+    for single_page_measurements in page_measurements:
+        SITE_LOGGER.debug(
+            "%s: HTML size %s, first-view transfer size %s, render-blocking CSS/JS size %s, "
+            "%d requests, largest image size %s.",
+            single_page_measurements.page_path,
+            f"{single_page_measurements.html_size:,d}",
+            f"{single_page_measurements.first_view_transfer_size:,d}",
+            f"{single_page_measurements.render_blocking_size:,d}",
+            single_page_measurements.request_count,
+            f"{single_page_measurements.image_size:,d}",
+        )
+
+    return page_measurements
@@ -0,0 +1,240 @@
+"""Persistent, content-addressed build cache, with size-bounded LRU garbage collection."""
+
+import contextlib
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from utils import PROJECT_ROOT
+
+if TYPE_CHECKING:
+    from _hashlib import HASH
+    from collections.abc import Iterator, Sequence
+    from logging import Logger
+    from typing import Final
+
+__all__: Sequence[str] = (
+    "CACHE_DIRECTORY",
+    "DEFAULT_MAX_CACHE_SIZE",
+    "CacheEntry",
+    "GarbageCollectionOutcome",
+    "collect_garbage",
+    "get_cache_entries",
+    "get_cache_key",
+    "get_cached_path",
+    "load",
+    "store",
+    "use_cache_directory",
+)
+
+
+logger: Final[Logger] = logging.getLogger("static-websites-builder")
+
+CACHE_DIRECTORY: Final[Path] = PROJECT_ROOT / ".cache/static-websites/objects"
+DEFAULT_MAX_CACHE_SIZE: Final[int] = 512 * 1024**2
+
+_cache_directory: Path = CACHE_DIRECTORY
+
+
+class CacheEntry(NamedTuple):
+    """A single stored cache entry, with the time that it was last used."""
+
+    path: Path
+    size: int
+    last_used_time: float
+
+
+class GarbageCollectionOutcome(NamedTuple):
+    """The number & combined size of the cache entries evicted & kept by a collection."""
+
+    evicted_count: int
+    evicted_size: int
+    remaining_count: int
+    remaining_size: int
+
+
+def get_cache_key(*key_parts: bytes | str) -> str:
+    """
+    Hash the given parts into a single cache key.
+
+    Each part is length-prefixed before hashing,
+    so that moving bytes between adjacent parts always produces a different key.
+    """
+    key_hash: HASH = hashlib.sha256()
+
+    key_part: bytes | str
+    for key_part in key_parts:
+        encoded_key_part: bytes = (
+            key_part.encode("utf-8") if isinstance(key_part, str) else key_part
+        )
+        key_hash.update(len(encoded_key_part).to_bytes(8, "big"))
+        key_hash.update(encoded_key_part)
+
+    return key_hash.hexdigest()
+
+
+@contextlib.contextmanager
+def use_cache_directory(cache_directory: Path) -> Iterator[None]:
+    """
+    Store & load every cache entry within the given directory, until this context exits.
+
+    This keeps throwaway builds (e.g. benchmarks) from evicting or adding to the real cache.
+    """
+    global _cache_directory  # noqa: PLW0603
+
+    original_cache_directory: Final[Path] = _cache_directory
+    _cache_directory = cache_directory
+    try:
+        yield
+    finally:
+        _cache_directory = original_cache_directory
+
+
+def _get_entry_path(namespace: str, key: str) -> Path:
+    if not namespace.isidentifier() or len(key) < 3 or not key.isalnum():
+        INVALID_CACHE_ENTRY_MESSAGE: Final[str] = (
+            f"Invalid cache namespace or key: {namespace!r}, {key!r}."
+        )
+        raise ValueError(INVALID_CACHE_ENTRY_MESSAGE)
+
+    return _cache_directory / namespace / key[:2] / key[2:]
+
+
+def _mark_used(entry_path: Path) -> None:
+    """Record that the given entry has just been used, so that it is evicted last."""
+    # NOTE: The modification time is used (rather than the access time),
+    # because `noatime` mounts & restoring the cache in CI would otherwise lose it.
+    # `os.utime()` is used (rather than `Path.touch()`) so that missing entries are not created
+    os.utime(entry_path)
+
+
+def get_cached_path(namespace: str, key: str) -> Path | None:
+    """
+    Get the path of the stored entry with the given key, marking it as recently used.
+
+    `None` is returned if no entry with the given key has been stored.
+    The returned file must not be modified, because it may be shared between builds.
+    """
+    entry_path: Final[Path] = _get_entry_path(namespace, key)
+
+    try:
+        _mark_used(entry_path)
+    except FileNotFoundError:
+        return None
+
+    return entry_path
+
+
+def load(namespace: str, key: str) -> bytes | None:
+    """Load the content of the entry with the given key, or `None` if it was not stored."""
+    entry_path: Final[Path | None] = get_cached_path(namespace, key)
+    if entry_path is None:
+        return None
+
+    try:
+        return entry_path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def store(namespace: str, key: str, content: bytes) -> Path:
+    """
+    Atomically save the given content as the entry with the given key.
+
+    The content is first written to a temporary file alongside the entry,
+    so that concurrent builds never see a partially written entry.
+    """
+    entry_path: Final[Path] = _get_entry_path(namespace, key)
+    entry_path.parent.mkdir(parents=True, exist_ok=True)
+
+    temporary_entry_path: Path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+    temporary_entry_path.write_bytes(content)
+    temporary_entry_path.replace(entry_path)
+
+    return entry_path
+
+
+def get_cache_entries() -> Sequence[CacheEntry]:
+    """Get every stored cache entry, from the least to the most recently used."""
+    if not _cache_directory.is_dir():
+        return []
+
+    cache_entries: list[CacheEntry] = []
+
+    directory_path: str
+    file_names: list[str]
+    for directory_path, _, file_names in os.walk(_cache_directory):
+        file_name: str
+        for file_name in file_names:
+            entry_path: Path = Path(directory_path) / file_name
+
+            try:
+                entry_stat: os.stat_result = entry_path.stat()
+            except FileNotFoundError:
+                continue
+
+            cache_entries.append(
+                CacheEntry(
+                    path=entry_path,
+                    size=entry_stat.st_size,
+                    last_used_time=entry_stat.st_mtime,
+                )
+            )
+
+    cache_entries.sort(key=lambda cache_entry: cache_entry.last_used_time)
+
+    return cache_entries
+
+
+def collect_garbage(
+    *, max_size: int | None = DEFAULT_MAX_CACHE_SIZE, max_age: float | None = None
+) -> GarbageCollectionOutcome:
+    """
+    Evict cache entries until the cache satisfies the given limits.
+
+    Every entry that has not been used within the last `max_age` seconds is evicted first,
+    then the least recently used entries are evicted
+    until the combined size of the cache is no larger than `max_size` bytes.
+    Either limit can be disabled by passing `None`.
+    """
+    cache_entries: Final[Sequence[CacheEntry]] = get_cache_entries()
+    remaining_size: int = sum(cache_entry.size for cache_entry in cache_entries)
+    oldest_allowed_time: Final[float | None] = (
+        time.time() - max_age if max_age is not None else None
+    )
+
+    evicted_count: int = 0
+    evicted_size: int = 0
+
+    cache_entry: CacheEntry
+    for cache_entry in cache_entries:
+        is_expired: bool = (
+            oldest_allowed_time is not None
+            and cache_entry.last_used_time < oldest_allowed_time
+        )
+        is_oversized: bool = max_size is not None and remaining_size > max_size
+        if not is_expired and not is_oversized:
+            break
+
+        cache_entry.path.unlink(missing_ok=True)
+
+        remaining_size -= cache_entry.size
+        evicted_count += 1
+        evicted_size += cache_entry.size
+
+    garbage_collection_outcome: Final[GarbageCollectionOutcome] = GarbageCollectionOutcome(
+        evicted_count=evicted_count,
+        evicted_size=evicted_size,
+        remaining_count=len(cache_entries) - evicted_count,
+        remaining_size=remaining_size,
+    )
+
+    logger.debug(
+        "Evicted %d cache entries (%d bytes), keeping %d entries (%d bytes).",
+        *garbage_collection_outcome,
+    )
+
+    return garbage_collection_outcome
@@ -0,0 +1,183 @@
+"""Detect which sites are affected by changes since each site was last deployed."""
+
+import json
+import logging
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING
+
+from sites import SITE_MODULE_NAMES
+from utils import PROJECT_ROOT
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+    from collections.abc import Set as AbstractSet
+    from logging import Logger
+    from pathlib import Path
+    from typing import Final
+
+    from git import Commit, Repo
+
+__all__: Sequence[str] = (
+    "DEPLOY_STATE_FILE_PATH",
+    "get_affected_site_names",
+    "get_changed_site_names",
+    "get_head_commit_timestamp",
+    "record_deployed_site_names",
+)
+
+
+logger: Final[Logger] = logging.getLogger("static-websites-builder")
+
+DEPLOY_STATE_FILE_PATH: Final[Path] = PROJECT_ROOT / ".cache/static-websites/deploy-state.json"
+
+ALL_SITES_PATH_PREFIXES: Final[AbstractSet[PurePosixPath]] = {
+    PurePosixPath("build.py"),
+    PurePosixPath("components"),
+    PurePosixPath("pyproject.toml"),
+    PurePosixPath("sites/__init__.py"),
+    PurePosixPath("utils"),
+    PurePosixPath("uv.lock"),
+}
+
+
+def get_affected_site_names(changed_paths: Iterable[PurePosixPath]) -> AbstractSet[str]:
+    """
+    Map the given changed paths (relative to the project root) to the sites they affect.
+
+    A changed site module or file within a site's static directory only affects that site,
+    whereas a change to any shared build code affects every site.
+    """
+    SITE_NAMES_BY_MODULE_NAME: Final[Mapping[str, str]] = {
+        module_name: site_name for site_name, module_name in SITE_MODULE_NAMES.items()
+    }
+
+    affected_site_names: set[str] = set()
+
+    changed_path: PurePosixPath
+    for changed_path in changed_paths:
+        if any(
+            changed_path == path_prefix or changed_path.is_relative_to(path_prefix)
+            for path_prefix in ALL_SITES_PATH_PREFIXES
+        ):
+            return frozenset(SITE_MODULE_NAMES)
+
+        match changed_path.parts:
+            case ("sites", module_file_name) if module_file_name.endswith(".py"):
+                site_name: str | None = SITE_NAMES_BY_MODULE_NAME.get(
+                    module_file_name.removesuffix(".py")
+                )
+                if site_name is not None:
+                    affected_site_names.add(site_name)
+
+            case ("static", static_site_name, *_) if static_site_name in SITE_MODULE_NAMES:
+                affected_site_names.add(static_site_name)
+
+            case _:
+                pass
+
+    return affected_site_names
+
+
+def _load_deploy_state() -> Mapping[str, str]:
+    if not DEPLOY_STATE_FILE_PATH.is_file():
+        return {}
+
+    raw_deploy_state: object = json.loads(DEPLOY_STATE_FILE_PATH.read_text(encoding="utf-8"))
+    if not isinstance(raw_deploy_state, dict):
+        INVALID_DEPLOY_STATE_MESSAGE: Final[str] = (
+            f"Invalid deploy state file: {DEPLOY_STATE_FILE_PATH}"
+        )
+        raise TypeError(INVALID_DEPLOY_STATE_MESSAGE)
+
+    return {
+        str(site_name): str(commit_hash) for site_name, commit_hash in raw_deploy_state.items()
+    }
+
+
+def _get_changed_paths(repo: Repo, commit: Commit) -> AbstractSet[PurePosixPath]:
+    changed_paths: set[PurePosixPath] = {
+        PurePosixPath(untracked_file) for untracked_file in repo.untracked_files
+    }
+
+    for diff in commit.diff(None):
+        if diff.a_path:
+            changed_paths.add(PurePosixPath(diff.a_path))
+        if diff.b_path:
+            changed_paths.add(PurePosixPath(diff.b_path))
+
+    return changed_paths
+
+
+def get_changed_site_names(site_names: AbstractSet[str]) -> AbstractSet[str]:
+    """
+    Get the names of the given sites that have changed since they were last deployed.
+
+    The working tree is compared against the commit that each site was last deployed from.
+    Any site without a recorded (or a still resolvable) last-deployed commit
+    is always considered to have changed.
+    """
+    # NOTE: GitPython is imported lazily, as it is slow to import & only needed for this mode
+    from git import Repo  # noqa: PLC0415
+    from git.exc import BadName, BadObject  # noqa: PLC0415
+
+    deploy_state: Final[Mapping[str, str]] = _load_deploy_state()
+    repo: Final[Repo] = Repo(PROJECT_ROOT)
+
+    changed_site_names: set[str] = set()
+    site_names_by_commit_hash: dict[str, set[str]] = {}
+
+    site_name: str
+    for site_name in site_names:
+        last_deployed_commit_hash: str | None = deploy_state.get(site_name)
+        if last_deployed_commit_hash is None:
+            changed_site_names.add(site_name)
+            continue
+
+        site_names_by_commit_hash.setdefault(last_deployed_commit_hash, set()).add(site_name)
+
+    commit_hash: str
+    commit_site_names: AbstractSet[str]
+    for commit_hash, commit_site_names in site_names_by_commit_hash.items():
+        try:
+            commit: Commit = repo.commit(commit_hash)
+        except BadName, BadObject, ValueError:
+            logger.debug(
+                "Last-deployed commit %s could not be found, so assuming sites changed: %s",
+                commit_hash,
+                ", ".join(sorted(commit_site_names)),
+            )
+            changed_site_names.update(commit_site_names)
+            continue
+
+        changed_site_names.update(
+            commit_site_names & get_affected_site_names(_get_changed_paths(repo, commit))
+        )
+
+    return changed_site_names
+
+
+def get_head_commit_timestamp() -> int:
+    """Get the Unix timestamp at which the current `HEAD` commit was committed."""
+    from git import Repo  # noqa: PLC0415
+
+    return Repo(PROJECT_ROOT).head.commit.committed_date
+
+
+def record_deployed_site_names(site_names: AbstractSet[str]) -> None:
+    """Record the current `HEAD` commit as the last-deployed commit of each given site."""
+    if not site_names:
+        return
+
+    from git import Repo  # noqa: PLC0415
+
+    head_commit_hash: Final[str] = Repo(PROJECT_ROOT).head.commit.hexsha
+
+    deploy_state: dict[str, str] = dict(_load_deploy_state())
+    deploy_state.update(dict.fromkeys(site_names, head_commit_hash))
+
+    DEPLOY_STATE_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    temporary_deploy_state_file_path: Path = DEPLOY_STATE_FILE_PATH.with_suffix(".json.tmp")
+    temporary_deploy_state_file_path.write_text(
+        f"{json.dumps(deploy_state, indent=4, sort_keys=True)}\n", encoding="utf-8"
+    )
+    temporary_deploy_state_file_path.replace(DEPLOY_STATE_FILE_PATH)
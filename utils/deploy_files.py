@@ -0,0 +1,62 @@
+"""Find & modify the files of a site's `deploy/` directory, without modifying originals."""
+
+import os
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Final
+
+__all__: Sequence[str] = ("detach_deploy_file", "get_site_file_paths")
+
+
+def get_site_file_paths(site_deploy_directory: Path) -> Sequence[PurePosixPath]:
+    """Get the path of every file within the given site (following links), in sorted order."""
+    site_file_paths: list[PurePosixPath] = []
+
+    directory_path: str
+    file_names: list[str]
+    for directory_path, _, file_names in os.walk(site_deploy_directory, followlinks=True):
+        relative_directory_path: PurePosixPath = PurePosixPath(
+            Path(directory_path).relative_to(site_deploy_directory).as_posix()
+        )
+        site_file_paths.extend(relative_directory_path / file_name for file_name in file_names)
+
+    return sorted(site_file_paths)
+
+
+def detach_deploy_file(site_deploy_directory: Path, file_path: PurePosixPath) -> Path:
+    """
+    Ensure the given file can be written without modifying the original that it links to.
+
+    Every linked directory containing the file is replaced by a real directory,
+    containing links to each of the original directory's entries
+    (so only the directories leading to the file are ever copied).
+    The file itself is then unlinked (if it was a link), so it must be rewritten by the caller.
+    """
+    directory_path: Path = site_deploy_directory
+
+    directory_name: str
+    for directory_name in file_path.parent.parts:
+        directory_path /= directory_name
+        if not directory_path.is_symlink():
+            continue
+
+        linked_directory_path: Path = directory_path.resolve()
+        directory_path.unlink()
+        directory_path.mkdir()
+
+        linked_entry_path: Path
+        for linked_entry_path in linked_directory_path.iterdir():
+            (directory_path / linked_entry_path.name).symlink_to(
+                linked_entry_path, target_is_directory=linked_entry_path.is_dir()
+            )
+
+    deploy_file_path: Final[Path] = site_deploy_directory / file_path
+    if deploy_file_path.is_symlink():
+        deploy_file_path.unlink()
+
+    deploy_file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    return deploy_file_path
@@ -0,0 +1,269 @@
+"""Find the tags of rendered HTML pages, and the same-site assets that they reference."""
+
+import html
+import html.parser
+import posixpath
+import urllib.parse
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING, NamedTuple, override
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+    from collections.abc import Set as AbstractSet
+    from typing import Final
+
+__all__: Sequence[str] = (
+    "AssetReference",
+    "HTMLTag",
+    "format_start_tag",
+    "get_asset_references",
+    "get_page_view_asset_references",
+    "parse_tags",
+    "replace_tags",
+    "resolve_asset_path",
+)
+
+
+ICON_LINK_RELS: Final[AbstractSet[str]] = {"icon", "shortcut"}
+PRELOAD_LINK_RELS: Final[AbstractSet[str]] = {"modulepreload", "preload"}
+PAGE_VIEW_ASSET_KINDS: Final[AbstractSet[str]] = {
+    "icon",
+    "image",
+    "manifest",
+    "preload",
+    "script",
+    "stylesheet",
+}
+
+
+class HTMLTag(NamedTuple):
+    """
+    A single start tag of an HTML page, with the position of its source text.
+
+    Tags within a `<noscript>` element are marked,
+    because browsers with scripting enabled ignore them.
+    """
+
+    name: str
+    attributes: Mapping[str, str | None]
+    start_offset: int
+    end_offset: int
+    is_in_noscript: bool = False
+
+    def get_attribute(self, attribute_name: str) -> str | None:
+        """Get the value of the given attribute, or `None` if it is missing or has no value."""
+        return self.attributes.get(attribute_name)
+
+
+class AssetReference(NamedTuple):
+    """
+    A URL of an asset referenced by a tag, with the kind of asset it refers to.
+
+    The kind is one of `"stylesheet"`, `"script"`, `"image"`, `"icon"`, `"manifest"`,
+    `"preload"` or `"other"` (for assets that browsers do not fetch when loading the page,
+    e.g. `apple-touch-icon` links).
+    """
+
+    url: str
+    kind: str
+    tag: HTMLTag
+
+
+class _TagParser(html.parser.HTMLParser):
+    def __init__(self, source: str, *, tag_names: AbstractSet[str] | None) -> None:
+        super().__init__(convert_charrefs=True)
+
+        self.tags: list[HTMLTag] = []
+        self._tag_names: AbstractSet[str] | None = tag_names
+        self._noscript_depth: int = 0
+        self._line_offsets: list[int] = [0]
+
+        # NOTE: Only `\n` ends a line, because that is all `getpos()` counts
+        # (whereas `str.splitlines()` would also split on `\r`, `\x0c`, `\u2028`, etc.)
+        line: str
+        for line in source.split("\n"):
+            self._line_offsets.append(self._line_offsets[-1] + len(line) + 1)
+
+    def _record_tag(self, tag_name: str, attributes: list[tuple[str, str | None]]) -> None:
+        if tag_name == "noscript":
+            self._noscript_depth += 1
+
+        if self._tag_names is not None and tag_name not in self._tag_names:
+            return
+
+        line_number: int
+        column_number: int
+        line_number, column_number = self.getpos()
+        start_offset: int = self._line_offsets[line_number - 1] + column_number
+
+        self.tags.append(
+            HTMLTag(
+                name=tag_name,
+                attributes=dict(attributes),
+                start_offset=start_offset,
+                end_offset=start_offset + len(self.get_starttag_text() or ""),
+                is_in_noscript=self._noscript_depth > 0,
+            )
+        )
+
+    @override
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._record_tag(tag, attrs)
+
+    @override
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._record_tag(tag, attrs)
+
+        if tag == "noscript":
+            self._noscript_depth -= 1
+
+    @override
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "noscript" and self._noscript_depth > 0:
+            self._noscript_depth -= 1
+
+
+def parse_tags(source: str, *, tag_names: AbstractSet[str] | None = None) -> Sequence[HTMLTag]:
+    """
+    Get every start tag of the given HTML (or only those with the given names), in order.
+
+    Each tag's offsets locate its source text within the given HTML,
+    so that it can be replaced without reformatting the rest of the page.
+    """
+    tag_parser: Final[_TagParser] = _TagParser(source, tag_names=tag_names)
+    tag_parser.feed(source)
+    tag_parser.close()
+
+    return tag_parser.tags
+
+
+def format_start_tag(tag_name: str, attributes: Mapping[str, str | None]) -> str:
+    """Format a start tag with the given attributes (any set to `None` have no value)."""
+    formatted_attributes: Final[str] = "".join(
+        f" {attribute_name}"
+        if attribute_value is None
+        else f' {attribute_name}="{html.escape(attribute_value, quote=True)}"'
+        for attribute_name, attribute_value in attributes.items()
+    )
+
+    return f"<{tag_name}{formatted_attributes}>"
+
+
+def replace_tags(source: str, replacements: Iterable[tuple[HTMLTag, str]]) -> str:
+    """Replace the source text of each of the given tags (parsed from the given HTML)."""
+    replaced_source: str = source
+
+    tag: HTMLTag
+    replacement: str
+    for tag, replacement in sorted(
+        replacements, key=lambda tag_replacement: tag_replacement[0].start_offset, reverse=True
+    ):
+        replaced_source = (
+            f"{replaced_source[: tag.start_offset]}{replacement}"
+            f"{replaced_source[tag.end_offset :]}"
+        )
+
+    return replaced_source
+
+
+def _get_link_kind(rel: str) -> str:
+    RELS: Final[AbstractSet[str]] = frozenset(rel.lower().split())
+
+    if "stylesheet" in RELS:
+        return "stylesheet"
+
+    if "manifest" in RELS:
+        return "manifest"
+
+    if RELS & PRELOAD_LINK_RELS:
+        return "preload"
+
+    if RELS and RELS <= ICON_LINK_RELS:
+        return "icon"
+
+    return "other"
+
+
+def get_asset_references(source: str) -> Sequence[AssetReference]:
+    """Get every asset URL referenced by the given HTML, in the order they appear."""
+    asset_references: list[AssetReference] = []
+
+    tag: HTMLTag
+    for tag in parse_tags(source, tag_names={"img", "link", "script", "video"}):
+        url: str | None
+        kind: str
+        match tag.name:
+            case "link":
+                url = tag.get_attribute("href")
+                kind = _get_link_kind(tag.get_attribute("rel") or "")
+            case "script":
+                url = tag.get_attribute("src")
+                kind = "script"
+            case "img":
+                url = tag.get_attribute("src")
+                kind = "image"
+            case "video":
+                url = tag.get_attribute("poster")
+                kind = "image"
+            case _:
+                continue
+
+        if url:
+            asset_references.append(AssetReference(url=url, kind=kind, tag=tag))
+
+    return asset_references
+
+
+def resolve_asset_path(page_path: PurePosixPath, url: str) -> PurePosixPath | None:
+    """
+    Resolve the given URL (referenced by the given page) to a path within the page's site.
+
+    `None` is returned for URLs of other sites (or other schemes, e.g. `data:` URLs),
+    and for URLs that would resolve outside of the site.
+    """
+    split_url: Final[urllib.parse.SplitResult] = urllib.parse.urlsplit(url)
+    if split_url.scheme or split_url.netloc or not split_url.path:
+        return None
+
+    unquoted_path: Final[str] = urllib.parse.unquote(split_url.path)
+    resolved_path: Final[str] = posixpath.normpath(
+        unquoted_path.lstrip("/")
+        if unquoted_path.startswith("/")
+        else posixpath.join(page_path.parent.as_posix(), unquoted_path)
+    )
+    if resolved_path in {".", ""} or resolved_path.startswith(("../", "/")):
+        return None
+
+    return PurePosixPath(resolved_path)
+
+
+def get_page_view_asset_references(
+    page_path: PurePosixPath, source: str
+) -> Mapping[PurePosixPath, AssetReference]:
+    """
+    Get every same-site asset that a browser fetches when viewing the given page, in order.
+
+    Assets are keyed by their resolved path within the site, so each is only fetched once.
+    Only the first icon is included, because browsers choose a single favicon from those
+    listed, and the contents of `<noscript>` elements are ignored.
+    """
+    page_view_asset_references: dict[PurePosixPath, AssetReference] = {}
+    has_icon: bool = False
+
+    asset_reference: AssetReference
+    for asset_reference in get_asset_references(source):
+        if (
+            asset_reference.kind not in PAGE_VIEW_ASSET_KINDS
+            or asset_reference.tag.is_in_noscript
+            or (asset_reference.kind == "icon" and has_icon)
+        ):
+            continue
+
+        asset_path: PurePosixPath | None = resolve_asset_path(page_path, asset_reference.url)
+        if asset_path is None or asset_path == page_path:
+            continue
+
+        has_icon = has_icon or asset_reference.kind == "icon"
+        page_view_asset_references.setdefault(asset_path, asset_reference)
+
+    return page_view_asset_references
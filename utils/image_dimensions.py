@@ -0,0 +1,246 @@
+"""Read the intrinsic pixel dimensions of image files, from their headers alone."""
+
+import re
+import struct
+from typing import TYPE_CHECKING, NamedTuple
+
+from utils import cache, html_assets, manifest
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+    from collections.abc import Set as AbstractSet
+    from pathlib import Path
+    from typing import BinaryIO, Final
+
+__all__: Sequence[str] = ("ImageDimensions", "get_image_dimensions")
+
+
+SNIFFED_HEADER_SIZE: Final[int] = 32
+SVG_HEADER_SIZE: Final[int] = 8 * 1024
+PNG_SIGNATURE: Final[bytes] = b"\x89PNG\r\n\x1a\n"
+GIF_SIGNATURES: Final[AbstractSet[bytes]] = {b"GIF87a", b"GIF89a"}
+JPEG_SIGNATURE: Final[bytes] = b"\xff\xd8"
+JPEG_STANDALONE_MARKERS: Final[AbstractSet[int]] = {0x01, *range(0xD0, 0xDA)}
+JPEG_START_OF_FRAME_MARKERS: Final[AbstractSet[int]] = set(range(0xC0, 0xD0)) - {
+    0xC4,
+    0xC8,
+    0xCC,
+}
+
+_SVG_LENGTH_PATTERN: Final[re.Pattern[str]] = re.compile(r"\s*(\d+(?:\.\d+)?)\s*(?:px)?\s*")
+
+
+class ImageDimensions(NamedTuple):
+    """The intrinsic width & height of an image, in pixels."""
+
+    width: int
+    height: int
+
+    @property
+    def aspect_ratio(self) -> float:
+        """The ratio of the image's width to its height."""
+        return self.width / self.height
+
+
+def _read_png_dimensions(image_file: BinaryIO) -> ImageDimensions | None:
+    """Read the dimensions from the `IHDR` chunk, which must be the first chunk of a PNG."""
+    header: Final[bytes] = image_file.read(24)
+    if len(header) < 24 or header[12:16] != b"IHDR":
+        return None
+
+    return ImageDimensions(*struct.unpack(">II", header[16:24]))
+
+
+def _read_gif_dimensions(image_file: BinaryIO) -> ImageDimensions | None:
+    header: Final[bytes] = image_file.read(10)
+    if len(header) < 10:
+        return None
+
+    return ImageDimensions(*struct.unpack("<HH", header[6:10]))
+
+
+def _read_webp_dimensions(image_file: BinaryIO) -> ImageDimensions | None:
+    """Read the dimensions from the first chunk of a lossy, lossless or extended WebP."""
+    header: Final[bytes] = image_file.read(30)
+    if len(header) < 30 or header[8:12] != b"WEBP":
+        return None
+
+    match header[12:16]:
+        case b"VP8 ":
+            width: int
+            height: int
+            width, height = struct.unpack("<HH", header[26:30])
+            return ImageDimensions(width & 0x3FFF, height & 0x3FFF)
+
+        case b"VP8L":
+            PACKED_DIMENSIONS: Final[int] = int.from_bytes(header[21:25], "little")
+            return ImageDimensions(
+                (PACKED_DIMENSIONS & 0x3FFF) + 1, ((PACKED_DIMENSIONS >> 14) & 0x3FFF) + 1
+            )
+
+        case b"VP8X":
+            return ImageDimensions(
+                int.from_bytes(header[24:27], "little") + 1,
+                int.from_bytes(header[27:30], "little") + 1,
+            )
+
+        case _:
+            return None
+
+
+def _read_jpeg_dimensions(image_file: BinaryIO) -> ImageDimensions | None:
+    """
+    Read the dimensions from the first start-of-frame segment of a JPEG.
+
+    Every preceding segment (e.g. EXIF metadata) is skipped over without being read.
+    EXIF orientation is not applied, so rotated photos report their stored dimensions.
+    """
+    image_file.seek(len(JPEG_SIGNATURE))
+
+    while True:
+        marker_prefix: bytes = image_file.read(1)
+        if marker_prefix != b"\xff":
+            return None
+
+        marker: bytes = image_file.read(1)
+        while marker == b"\xff":
+            marker = image_file.read(1)
+        if not marker:
+            return None
+
+        if marker[0] in JPEG_STANDALONE_MARKERS:
+            continue
+
+        raw_segment_length: bytes = image_file.read(2)
+        if len(raw_segment_length) < 2:
+            return None
+        segment_length: int = int.from_bytes(raw_segment_length, "big")
+
+        if marker[0] in JPEG_START_OF_FRAME_MARKERS:
+            frame_header: bytes = image_file.read(5)
+            if len(frame_header) < 5:
+                return None
+
+            height: int
+            width: int
+            height, width = struct.unpack(">HH", frame_header[1:5])
+            return ImageDimensions(width, height)
+
+        image_file.seek(segment_length - 2, 1)
+
+
+def _parse_svg_length(raw_length: str | None) -> float | None:
+    """Parse an absolute SVG length (in pixels), ignoring relative lengths (e.g. `100%`)."""
+    length_match: Final[re.Match[str] | None] = (
+        _SVG_LENGTH_PATTERN.fullmatch(raw_length) if raw_length is not None else None
+    )
+
+    return float(length_match.group(1)) if length_match is not None else None
+
+
+def _read_svg_dimensions(image_file: BinaryIO) -> ImageDimensions | None:
+    """
+    Read the dimensions from the root `<svg>` element's `width` & `height` attributes.
+
+    Any dimension that is missing (or relative) is calculated from the `viewBox`.
+    """
+    svg_tags: Final[Sequence[html_assets.HTMLTag]] = html_assets.parse_tags(
+        image_file.read(SVG_HEADER_SIZE).decode("utf-8", errors="replace"),
+        tag_names={"svg"},
+    )
+    if not svg_tags:
+        return None
+
+    width: float | None = _parse_svg_length(svg_tags[0].get_attribute("width"))
+    height: float | None = _parse_svg_length(svg_tags[0].get_attribute("height"))
+
+    raw_view_box: Final[Sequence[str]] = (
+        (svg_tags[0].get_attribute("viewbox") or "").replace(",", " ").split()
+    )
+    if (width is None or height is None) and len(raw_view_box) == 4:
+        try:
+            view_box_width: float = float(raw_view_box[2])
+            view_box_height: float = float(raw_view_box[3])
+        except ValueError:
+            return None
+
+        if view_box_width <= 0 or view_box_height <= 0:
+            return None
+
+        if width is None and height is None:
+            width, height = view_box_width, view_box_height
+        elif width is None and height is not None:
+            width = height * view_box_width / view_box_height
+        elif height is None and width is not None:
+            height = width * view_box_height / view_box_width
+
+    if width is None or height is None:
+        return None
+
+    return ImageDimensions(round(width), round(height))
+
+
+def _sniff_dimensions_reader(
+    header: bytes,
+) -> Callable[[BinaryIO], ImageDimensions | None] | None:
+    if header.startswith(PNG_SIGNATURE):
+        return _read_png_dimensions
+
+    if header[:6] in GIF_SIGNATURES:
+        return _read_gif_dimensions
+
+    if header.startswith(b"RIFF") and header[8:12] == b"WEBP":
+        return _read_webp_dimensions
+
+    if header.startswith(JPEG_SIGNATURE):
+        return _read_jpeg_dimensions
+
+    if b"<svg" in header or header.lstrip().startswith(b"<?xml"):
+        return _read_svg_dimensions
+
+    return None
+
+
+def _read_image_dimensions(file_path: Path) -> ImageDimensions | None:
+    with file_path.open("rb") as image_file:
+        dimensions_reader: Callable[[BinaryIO], ImageDimensions | None] | None = (
+            _sniff_dimensions_reader(image_file.read(SNIFFED_HEADER_SIZE))
+        )
+        if dimensions_reader is None:
+            return None
+
+        image_file.seek(0)
+        image_dimensions: ImageDimensions | None = dimensions_reader(image_file)
+
+    if image_dimensions is None or image_dimensions.width <= 0 or image_dimensions.height <= 0:
+        return None
+
+    return image_dimensions
+
+
+def get_image_dimensions(file_path: Path) -> ImageDimensions | None:
+    """
+    Get the intrinsic dimensions of the given PNG, GIF, WebP, JPEG or SVG image.
+
+    Only each image's header is read, and the dimensions are cached by content hash.
+    `None` is returned for files of any other format, and for malformed images.
+    """
+    cache_key: Final[str] = cache.get_cache_key(
+        "image-dimensions", manifest.hash_linked_file(file_path)
+    )
+    cached_image_dimensions: bytes | None = cache.load("image_dimensions", cache_key)
+    if cached_image_dimensions is not None:
+        raw_width: bytes
+        raw_height: bytes
+        raw_width, _, raw_height = cached_image_dimensions.partition(b"x")
+        return ImageDimensions(int(raw_width), int(raw_height))
+
+    image_dimensions: ImageDimensions | None = _read_image_dimensions(file_path)
+    if image_dimensions is not None:
+        cache.store(
+            "image_dimensions",
+            cache_key,
+            f"{image_dimensions.width:d}x{image_dimensions.height:d}".encode("ascii"),
+        )
+
+    return image_dimensions
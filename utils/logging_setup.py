@@ -1,14 +1,20 @@
 """Set up logging."""
 
+import atexit
+import functools
 import logging
+import logging.handlers
+import multiprocessing
+from logging import LoggerAdapter
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from collections.abc import Mapping, Sequence
     from logging import Logger
+    from multiprocessing import Queue
     from typing import Final, Literal, TextIO
 
-__all__: Sequence[str] = ("setup",)
+__all__: Sequence[str] = ("get_context_logger", "get_log_queue", "setup", "setup_worker")
 
 
 logger: Final[Logger] = logging.getLogger("static-websites-builder")
@@ -24,12 +30,46 @@ LOG_LEVEL_MAPS: Final[
     3: "DEBUG",
 }
 
+CONTEXT_LOGGER_CACHE_SIZE: Final[int] = 1024
 
-def setup(*, verbosity: Literal[0, 1, 2, 3] = 1) -> None:
-    """Set up a console logger with the output level according to the given verbosity."""
-    logger.setLevel(1)
+_log_queue: Queue[logging.LogRecord] | None = None
+_queue_listener: logging.handlers.QueueListener | None = None
+
+
+def _get_minimum_level(verbosity: Literal[0, 1, 2, 3]) -> int | str:
+    """
+    Get the minimum level that the loggers should be set to for the given verbosity.
+
+    Setting this on the loggers themselves (rather than only on their handlers)
+    allows every disabled logging call to return before any message formatting happens.
+    With a verbosity of 0 there are no handlers,
+    so only warnings (which are printed by Python's last-resort handler) remain enabled.
+    """
+    return LOG_LEVEL_MAPS[verbosity] if verbosity != 0 else logging.WARNING
+
+
+def _stop_queue_listener() -> None:
+    global _queue_listener  # noqa: PLW0603
+
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+def setup(*, verbosity: Literal[0, 1, 2, 3] = 1, queued: bool = False) -> None:
+    """
+    Set up a console logger with the output level according to the given verbosity.
+
+    If `queued` is set, log records are only put onto a multiprocessing-safe queue
+    by the logging calls, and are formatted & written out by a single background listener.
+    This prevents parallel workers (threads or processes) from being serialised
+    by contention over the console handlers' locks.
+    """
+    global _log_queue, _queue_listener  # noqa: PLW0603
+
+    logger.setLevel(_get_minimum_level(verbosity))
     logger.propagate = False
-    extra_context_logger.setLevel(1)
+    extra_context_logger.setLevel(_get_minimum_level(verbosity))
     extra_context_logger.propagate = False
 
     if verbosity != 0:
@@ -40,19 +80,78 @@ def setup(*, verbosity: Literal[0, 1, 2, 3] = 1) -> None:
             logging.Formatter(f"{info_format_string}{{message}}", style="{"),
         )
         console_logging_handler.setLevel(LOG_LEVEL_MAPS[verbosity])
-        logger.addHandler(console_logging_handler)
 
-        console_logging_handler = logging.StreamHandler()
-        console_logging_handler.setFormatter(
+        extra_context_console_logging_handler: logging.StreamHandler[TextIO] = (
+            logging.StreamHandler()
+        )
+        extra_context_console_logging_handler.setFormatter(
             logging.Formatter(
                 f"{info_format_string}({{extra_context}}) {{message}}",
                 style="{",
             ),
         )
-        console_logging_handler.setLevel(LOG_LEVEL_MAPS[verbosity])
-        extra_context_logger.addHandler(console_logging_handler)
+        extra_context_console_logging_handler.setLevel(LOG_LEVEL_MAPS[verbosity])
+
+        if not queued:
+            logger.addHandler(console_logging_handler)
+            extra_context_logger.addHandler(extra_context_console_logging_handler)
+
+        else:
+            # NOTE: The listener passes every record to every handler,
+            # so each handler only accepts records from its own logger
+            console_logging_handler.addFilter(logging.Filter(logger.name))
+            extra_context_console_logging_handler.addFilter(
+                logging.Filter(extra_context_logger.name)
+            )
+
+            _stop_queue_listener()
+
+            _log_queue = multiprocessing.Queue()
+            _queue_listener = logging.handlers.QueueListener(
+                _log_queue,
+                console_logging_handler,
+                extra_context_console_logging_handler,
+                respect_handler_level=True,
+            )
+            _queue_listener.start()
+            atexit.register(_stop_queue_listener)
+
+            logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+            extra_context_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
 
         logger.debug(
-            "Logger set up with minimum output level: %s",
+            "Logger set up with minimum output level: %s%s",
             LOG_LEVEL_MAPS[verbosity],
+            " (queued)" if queued else "",
         )
+
+
+def get_log_queue() -> Queue[logging.LogRecord] | None:
+    """Get the queue that log records are sent through, if queued logging has been set up."""
+    return _log_queue
+
+
+def setup_worker(
+    log_queue: Queue[logging.LogRecord], *, verbosity: Literal[0, 1, 2, 3] = 1
+) -> None:
+    """
+    Set up logging within a worker process, to send every record to the given queue.
+
+    The queue should be the one returned by `get_log_queue()` in the parent process,
+    whose listener will then write out the worker's log records.
+    """
+    for worker_logger in (logger, extra_context_logger):
+        worker_logger.setLevel(_get_minimum_level(verbosity))
+        worker_logger.propagate = False
+        worker_logger.handlers.clear()
+        worker_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
+@functools.lru_cache(maxsize=CONTEXT_LOGGER_CACHE_SIZE)
+def get_context_logger(extra_context: str) -> LoggerAdapter[Logger]:
+    """
+    Get the logger that prefixes every message with the given extra context.
+
+    Adapters are cached, rather than being created anew for every site & page.
+    """
+    return LoggerAdapter(extra_context_logger, {"extra_context": extra_context})
@@ -0,0 +1,187 @@
+"""Build manifests, listing the size & content hash of every file in a built site."""
+
+import hashlib
+import json
+import os
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, NamedTuple
+
+from utils import cache
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping, Sequence
+    from typing import Final
+
+__all__: Sequence[str] = (
+    "Manifest",
+    "ManifestEntry",
+    "create_site_manifest",
+    "get_site_manifest_path",
+    "hash_linked_file",
+    "load_site_manifest",
+)
+
+
+class ManifestEntry(NamedTuple):
+    """The size & content hash of a single file within a built site."""
+
+    size: int
+    sha256: str
+
+
+class Manifest(NamedTuple):
+    """All files within a built site, keyed by their path relative to the site's root."""
+
+    site_name: str
+    files: Mapping[PurePosixPath, ManifestEntry]
+
+    @property
+    def total_size(self) -> int:
+        """The combined size of every file in the built site, in bytes."""
+        return sum(manifest_entry.size for manifest_entry in self.files.values())
+
+    @property
+    def html_size(self) -> int:
+        """The combined size of every HTML page in the built site, in bytes."""
+        return sum(
+            manifest_entry.size
+            for file_path, manifest_entry in self.files.items()
+            if file_path.suffix == ".html"
+        )
+
+    def to_json(self) -> str:
+        """Serialise this manifest into a stable JSON string."""
+        return json.dumps(
+            {
+                "site_name": self.site_name,
+                "total_size": self.total_size,
+                "files": {
+                    file_path.as_posix(): {
+                        "size": manifest_entry.size,
+                        "sha256": manifest_entry.sha256,
+                    }
+                    for file_path, manifest_entry in sorted(self.files.items())
+                },
+            },
+            indent=4,
+        )
+
+    @classmethod
+    def from_json(cls, raw_manifest: str) -> Manifest:
+        """Deserialise a manifest from a JSON string created by `Manifest.to_json()`."""
+        parsed_manifest: Mapping[str, object] = json.loads(raw_manifest)
+
+        raw_files: object = parsed_manifest["files"]
+        if not isinstance(raw_files, dict):
+            INVALID_MANIFEST_MESSAGE: Final[str] = "Manifest files must be a JSON object."
+            raise TypeError(INVALID_MANIFEST_MESSAGE)
+
+        return cls(
+            site_name=str(parsed_manifest["site_name"]),
+            files={
+                PurePosixPath(file_path): ManifestEntry(
+                    size=int(raw_manifest_entry["size"]),
+                    sha256=str(raw_manifest_entry["sha256"]),
+                )
+                for file_path, raw_manifest_entry in raw_files.items()
+            },
+        )
+
+
+def get_site_manifest_path(site_deploy_directory: Path) -> Path:
+    """
+    Get the path of the manifest file for the given site's deploy directory.
+
+    Manifests are stored alongside (rather than inside) the site's deploy directory,
+    so that they are never uploaded to the remote server.
+    """
+    return site_deploy_directory.with_name(f"{site_deploy_directory.name}.manifest.json")
+
+
+def _hash_file(file_path: Path) -> str:
+    with file_path.open("rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def hash_linked_file(file_path: Path) -> str:
+    """
+    Hash a file that lives outside of the deploy directory, reusing any cached hash.
+
+    Linked (static) files are rarely modified between builds,
+    so their hashes are cached, keyed by each file's path, inode, size & modification time.
+    """
+    file_stat: Final[os.stat_result] = file_path.stat()
+    cache_key: Final[str] = cache.get_cache_key(
+        str(file_path),
+        str(file_stat.st_ino),
+        str(file_stat.st_size),
+        str(file_stat.st_mtime_ns),
+    )
+
+    cached_file_hash: bytes | None = cache.load("file_hashes", cache_key)
+    if cached_file_hash is not None:
+        return cached_file_hash.decode("ascii")
+
+    file_hash: str = _hash_file(file_path)
+    cache.store("file_hashes", cache_key, file_hash.encode("ascii"))
+    return file_hash
+
+
+def create_site_manifest(site_deploy_directory: Path) -> Manifest:
+    """
+    Create & save the manifest of every file within the given site's deploy directory.
+
+    Symlinks are followed, so that files within linked static directories are included.
+    """
+    RESOLVED_SITE_DEPLOY_DIRECTORY: Final[Path] = site_deploy_directory.resolve()
+
+    files: dict[PurePosixPath, ManifestEntry] = {}
+
+    directory_path: str
+    file_names: list[str]
+    for directory_path, _, file_names in os.walk(site_deploy_directory, followlinks=True):
+        # NOTE: Paths are only resolved once per directory (rather than for every file),
+        # because resolving is far slower than hashing the small files of most sites
+        resolved_directory_path: Path = Path(directory_path).resolve()
+        is_linked_directory: bool = not resolved_directory_path.is_relative_to(
+            RESOLVED_SITE_DEPLOY_DIRECTORY
+        )
+        relative_directory_path: PurePosixPath = PurePosixPath(
+            Path(directory_path).relative_to(site_deploy_directory).as_posix()
+        )
+
+        file_name: str
+        for file_name in file_names:
+            file_path: Path = resolved_directory_path / file_name
+            is_linked_file: bool = is_linked_directory or file_path.is_symlink()
+            if is_linked_file:
+                file_path = file_path.resolve()
+
+            files[relative_directory_path / file_name] = ManifestEntry(
+                size=file_path.stat().st_size,
+                sha256=hash_linked_file(file_path)
+                if is_linked_file
+                else _hash_file(file_path),
+            )
+
+    site_manifest: Manifest = Manifest(site_name=site_deploy_directory.name, files=files)
+
+    get_site_manifest_path(site_deploy_directory).write_text(
+        f"{site_manifest.to_json()}\n", encoding="utf-8"
+    )
+
+    return site_manifest
+
+
+def load_site_manifest(site_deploy_directory: Path) -> Manifest:
+    """
+    Load the saved manifest of the given site's deploy directory.
+
+    If no manifest has been saved yet, a new one will be created.
+    """
+    site_manifest_path: Path = get_site_manifest_path(site_deploy_directory)
+
+    if not site_manifest_path.is_file():
+        return create_site_manifest(site_deploy_directory)
+
+    return Manifest.from_json(site_manifest_path.read_text(encoding="utf-8"))
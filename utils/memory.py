@@ -0,0 +1,270 @@
+"""Opt-in per-phase & per-site memory usage reports of builds, using `tracemalloc`."""
+
+import contextlib
+import logging
+import resource
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from typing import TYPE_CHECKING, NamedTuple
+
+from exceptions import SiteMemoryLimitExceededError
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+    from contextlib import AbstractContextManager
+    from logging import Logger
+    from typing import Final
+
+__all__: Sequence[str] = (
+    "DEFAULT_TOP_ALLOCATIONS_COUNT",
+    "PhaseMemoryUsage",
+    "enable",
+    "get_peak_rss",
+    "is_enabled",
+    "measure_phase",
+    "write_report",
+)
+
+
+logger: Final[Logger] = logging.getLogger("static-websites-builder")
+
+DEFAULT_TOP_ALLOCATIONS_COUNT: Final[int] = 10
+
+_NO_MEASUREMENT_CONTEXT: Final[AbstractContextManager[None]] = contextlib.nullcontext()
+
+# NOTE: Snapshots would otherwise include the allocations made by tracemalloc itself
+_SNAPSHOT_FILTERS: Final[Sequence[tracemalloc.Filter]] = (
+    tracemalloc.Filter(inclusive=False, filename_pattern=tracemalloc.__file__),
+    tracemalloc.Filter(inclusive=False, filename_pattern="<unknown>"),
+)
+
+
+class PhaseMemoryUsage(NamedTuple):
+    """The memory used by every run of a single phase of the build of a single site."""
+
+    phase_name: str
+    site_name: str | None
+    measurement_count: int
+    allocated_size: int
+    peak_size: int
+    peak_rss: int
+    top_allocations: Sequence[tuple[str, int]]
+
+
+class _PhaseMeasurements:
+    def __init__(self) -> None:
+        self.measurement_count: int = 0
+        self.allocated_size: int = 0
+        self.peak_size: int = 0
+        self.peak_rss: int = 0
+        self.allocation_size_differences: Counter[tracemalloc.Traceback] = Counter()
+
+
+_is_enabled: bool = False
+_site_size_limit: int | None = None
+_site_baseline_sizes: Final[dict[str | None, int]] = {}
+_phase_measurements: Final[dict[tuple[str, str | None], _PhaseMeasurements]] = {}
+_measurement_lock: Final[threading.Lock] = threading.Lock()
+
+
+def enable(*, site_size_limit: int | None = None) -> None:
+    """
+    Start tracing the memory allocated by every subsequently run phase.
+
+    If `site_size_limit` is given (in bytes), a `SiteMemoryLimitExceededError` is raised
+    at the end of any phase that takes a site's traced memory further above
+    what was allocated before the site's first phase began.
+    """
+    global _is_enabled, _site_size_limit  # noqa: PLW0603
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    _is_enabled = True
+    _site_size_limit = site_size_limit
+
+
+def is_enabled() -> bool:
+    """Whether memory usage is currently being traced."""
+    return _is_enabled
+
+
+def get_peak_rss() -> int:
+    """Get the highest resident set size (in bytes) reached by this process so far."""
+    max_rss: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # NOTE: Linux reports the maximum resident set size in kibibytes, but macOS uses bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def _record_measurement(
+    phase_name: str,
+    *,
+    site_name: str | None,
+    before_snapshot: tracemalloc.Snapshot,
+    before_size: int,
+) -> int:
+    """Store the allocations made since the given snapshot, then return the site's peak."""
+    after_size: int
+    peak_size: int
+    after_size, peak_size = tracemalloc.get_traced_memory()
+    after_snapshot: tracemalloc.Snapshot = _take_snapshot()
+
+    site_peak_size: int = peak_size - _site_baseline_sizes[site_name]
+
+    phase_measurements: _PhaseMeasurements = _phase_measurements.setdefault(
+        (phase_name, site_name), _PhaseMeasurements()
+    )
+    phase_measurements.measurement_count += 1
+    phase_measurements.allocated_size += after_size - before_size
+    phase_measurements.peak_size = max(phase_measurements.peak_size, site_peak_size)
+    phase_measurements.peak_rss = max(phase_measurements.peak_rss, get_peak_rss())
+    phase_measurements.allocation_size_differences.update(
+        {
+            statistic_difference.traceback: statistic_difference.size_diff
+            for statistic_difference in after_snapshot.compare_to(before_snapshot, "lineno")
+            if statistic_difference.size_diff
+        }
+    )
+
+    return site_peak_size
+
+
+@contextlib.contextmanager
+def _measure_enabled_phase(phase_name: str, *, site_name: str | None) -> Iterator[None]:
+    # NOTE: The traced peak is shared across all threads,
+    # so any phase that overlaps another (e.g. when pipelining) is run without being measured
+    if not _measurement_lock.acquire(blocking=False):
+        logger.debug(
+            "Skipping memory measurement of overlapping phase %r%s.",
+            phase_name,
+            f" of {site_name}" if site_name is not None else "",
+        )
+        yield
+        return
+
+    try:
+        before_snapshot: tracemalloc.Snapshot = _take_snapshot()
+        before_size: int = tracemalloc.get_traced_memory()[0]
+        _site_baseline_sizes.setdefault(site_name, before_size)
+        tracemalloc.reset_peak()
+
+        try:
+            yield
+        finally:
+            site_peak_size: int = _record_measurement(
+                phase_name,
+                site_name=site_name,
+                before_snapshot=before_snapshot,
+                before_size=before_size,
+            )
+    finally:
+        _measurement_lock.release()
+
+    if _site_size_limit is not None and site_peak_size > _site_size_limit:
+        raise SiteMemoryLimitExceededError(
+            site_name=site_name or "",
+            peak_size=site_peak_size,
+            size_limit=_site_size_limit,
+        )
+
+
+def measure_phase(
+    phase_name: str, *, site_name: str | None = None
+) -> AbstractContextManager[None]:
+    """
+    Trace the memory allocated by the code run within this context.
+
+    Repeated uses of the same phase of the same site (e.g. rendering each page)
+    are accumulated into a single measurement.
+    If memory tracing has not been enabled, a shared no-op context is returned instead,
+    so that phases can be marked throughout the build code without any overhead.
+    """
+    if not _is_enabled:
+        return _NO_MEASUREMENT_CONTEXT
+
+    return _measure_enabled_phase(phase_name, site_name=site_name)
+
+
+def _format_size(size: int) -> str:
+    scaled_size: float = size
+
+    unit: str
+    for unit in ("B", "KiB", "MiB"):
+        if abs(scaled_size) < 1024:
+            return f"{scaled_size:.1f} {unit}"
+
+        scaled_size /= 1024
+
+    return f"{scaled_size:.1f} GiB"
+
+
+def write_report(
+    *, top_allocations_count: int = DEFAULT_TOP_ALLOCATIONS_COUNT
+) -> Sequence[PhaseMemoryUsage]:
+    """
+    Print the memory used by each measured phase & site, then stop tracing memory.
+
+    Alongside the net allocations, traced peak & peak RSS of each phase,
+    the `top_allocations_count` source lines that allocated the most memory are listed.
+    The report is printed to stderr, leaving stdout for the script's output.
+    """
+    global _is_enabled  # noqa: PLW0603
+
+    if not _is_enabled:
+        return []
+
+    with _measurement_lock:
+        phase_usages: Final[Sequence[PhaseMemoryUsage]] = [
+            PhaseMemoryUsage(
+                phase_name=phase_name,
+                site_name=site_name,
+                measurement_count=phase_measurements.measurement_count,
+                allocated_size=phase_measurements.allocated_size,
+                peak_size=phase_measurements.peak_size,
+                peak_rss=phase_measurements.peak_rss,
+                top_allocations=[
+                    (str(allocation_traceback[0]), size_difference)
+                    for allocation_traceback, size_difference in (
+                        phase_measurements.allocation_size_differences.most_common(
+                            top_allocations_count
+                        )
+                    )
+                    if size_difference > 0
+                ],
+            )
+            for (phase_name, site_name), phase_measurements in _phase_measurements.items()
+        ]
+        _phase_measurements.clear()
+        _site_baseline_sizes.clear()
+
+        tracemalloc.stop()
+        _is_enabled = False
+
+    report_lines: list[str] = [
+        f"Memory usage per phase (peak RSS of whole run: {_format_size(get_peak_rss())}):"
+    ]
+
+    phase_usage: PhaseMemoryUsage
+    for phase_usage in phase_usages:
+        report_lines.append(
+            f"{phase_usage.site_name or '-'} {phase_usage.phase_name} "
+            f"({phase_usage.measurement_count} run(s)): "
+            f"allocated {_format_size(phase_usage.allocated_size)}, "
+            f"site peak {_format_size(phase_usage.peak_size)}, "
+            f"peak RSS {_format_size(phase_usage.peak_rss)}"
+        )
+        report_lines.extend(
+            f"    {_format_size(size_difference):>12}  {allocation_location}"
+            for allocation_location, size_difference in phase_usage.top_allocations
+        )
+
+    sys.stderr.write("\n".join(report_lines) + "\n")
+
+    return phase_usages
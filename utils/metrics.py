@@ -0,0 +1,299 @@
+"""Prometheus textfile-collector metrics, derived from the timing spans of a run."""
+
+import time
+from typing import TYPE_CHECKING
+
+from utils import tracing
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Mapping, Sequence
+    from collections.abc import Set as AbstractSet
+    from pathlib import Path
+    from typing import Final
+
+    from utils.tracing import Span
+
+__all__: Sequence[str] = ("PAGE_BUILD_DURATION_BUCKETS", "format_metrics", "write_textfile")
+
+
+METRIC_NAME_PREFIX: Final[str] = "static_websites"
+
+PAGE_BUILD_DURATION_BUCKETS: Final[Sequence[float]] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+def _escape_label_value(label_value: str) -> str:
+    return label_value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Mapping[str, str]) -> str:
+    if not labels:
+        return ""
+
+    formatted_labels: str = ",".join(
+        f'{label_name}="{_escape_label_value(label_value)}"'
+        for label_name, label_value in labels.items()
+    )
+    return f"{{{formatted_labels}}}"
+
+
+def _format_metric_family(
+    metric_name: str,
+    *,
+    metric_type: str,
+    help_text: str,
+    samples: Iterable[tuple[str, Mapping[str, str], float]],
+) -> Sequence[str]:
+    """Format a single metric family, from its `(suffix, labels, value)` samples."""
+    return [
+        f"# HELP {METRIC_NAME_PREFIX}_{metric_name} {help_text}",
+        f"# TYPE {METRIC_NAME_PREFIX}_{metric_name} {metric_type}",
+        *(
+            f"{METRIC_NAME_PREFIX}_{metric_name}{suffix}{_format_labels(labels)} {value}"
+            for suffix, labels, value in samples
+        ),
+    ]
+
+
+def _get_page_build_duration_samples(
+    page_spans: Iterable[Span],
+) -> Sequence[tuple[str, Mapping[str, str], float]]:
+    durations_by_site_name: dict[str, list[float]] = {}
+
+    page_span: Span
+    for page_span in page_spans:
+        if page_span.site_name is not None:
+            durations_by_site_name.setdefault(page_span.site_name, []).append(
+                page_span.duration
+            )
+
+    samples: list[tuple[str, Mapping[str, str], float]] = []
+
+    site_name: str
+    durations: Sequence[float]
+    for site_name, durations in sorted(durations_by_site_name.items()):
+        samples.extend(
+            (
+                "_bucket",
+                {"site": site_name, "le": f"{bucket:g}"},
+                sum(duration <= bucket for duration in durations),
+            )
+            for bucket in PAGE_BUILD_DURATION_BUCKETS
+        )
+        samples.extend(
+            (
+                ("_bucket", {"site": site_name, "le": "+Inf"}, len(durations)),
+                ("_sum", {"site": site_name}, sum(durations)),
+                ("_count", {"site": site_name}, len(durations)),
+            )
+        )
+
+    return samples
+
+
+def _get_deploy_samples(
+    deploy_spans: Iterable[Span],
+    *,
+    get_value: Callable[[Span], float | None],
+    aggregate: Callable[[Sequence[float]], float],
+) -> Sequence[tuple[str, Mapping[str, str], float]]:
+    """
+    Get a single sample for each site & remote server, from the given deploy spans.
+
+    Remote targets that share a hostname (e.g. with different usernames or directories)
+    record spans with identical labels, so their values are combined using `aggregate`,
+    rather than being emitted as duplicate series.
+    """
+    values_by_labels: dict[tuple[str, str], list[float]] = {}
+
+    deploy_span: Span
+    for deploy_span in deploy_spans:
+        value: float | None = get_value(deploy_span)
+        if (
+            deploy_span.site_name is None
+            or "target" not in deploy_span.attributes
+            or value is None
+        ):
+            continue
+
+        values_by_labels.setdefault(
+            (deploy_span.site_name, str(deploy_span.attributes["target"])), []
+        ).append(value)
+
+    return [
+        ("", {"site": site_name, "target": target}, aggregate(values))
+        for (site_name, target), values in sorted(values_by_labels.items())
+    ]
+
+
+def format_metrics(
+    spans: Iterable[Span],
+    *,
+    deployed_site_names: AbstractSet[str],
+    succeeded: bool,
+) -> str:
+    """
+    Format the metrics of a single run in the Prometheus text exposition format.
+
+    Per-site build & deploy metrics are derived from the given timing spans.
+    """
+    METRIC_SPANS: Final[Sequence[Span]] = tuple(spans)
+    SITE_SPANS: Final[Sequence[Span]] = [
+        metric_span for metric_span in METRIC_SPANS if metric_span.phase == "build"
+    ]
+    PAGE_SPANS: Final[Sequence[Span]] = [
+        metric_span for metric_span in METRIC_SPANS if metric_span.phase == "build-page"
+    ]
+    DEPLOY_SPANS: Final[Sequence[Span]] = [
+        metric_span for metric_span in METRIC_SPANS if metric_span.phase == "deploy"
+    ]
+
+    # NOTE: HTML sizes are read from the site spans (rather than summed from the page spans),
+    # because sites restored from the build cache have no page spans
+    html_bytes_by_site_name: Final[Mapping[str, int]] = {
+        site_span.site_name: int(site_span.attributes["html_bytes"])
+        for site_span in SITE_SPANS
+        if site_span.site_name is not None and "html_bytes" in site_span.attributes
+    }
+
+    metric_lines: list[str] = [
+        *_format_metric_family(
+            "build_duration_seconds",
+            metric_type="gauge",
+            help_text="Time taken to build each site.",
+            samples=(
+                ("", {"site": site_span.site_name}, site_span.duration)
+                for site_span in SITE_SPANS
+                if site_span.site_name is not None
+            ),
+        ),
+        *_format_metric_family(
+            "page_build_duration_seconds",
+            metric_type="histogram",
+            help_text="Time taken to render & save each page of each site.",
+            samples=_get_page_build_duration_samples(PAGE_SPANS),
+        ),
+        *_format_metric_family(
+            "rendered_html_bytes",
+            metric_type="gauge",
+            help_text="Total size of the rendered HTML pages of each site.",
+            samples=(
+                ("", {"site": site_name}, html_byte_count)
+                for site_name, html_byte_count in sorted(html_bytes_by_site_name.items())
+            ),
+        ),
+        *_format_metric_family(
+            "static_bytes",
+            metric_type="gauge",
+            help_text="Total size of the static files shipped with each site.",
+            samples=(
+                (
+                    "",
+                    {"site": site_span.site_name},
+                    int(site_span.attributes["bytes"])
+                    - html_bytes_by_site_name.get(site_span.site_name, 0),
+                )
+                for site_span in SITE_SPANS
+                if site_span.site_name is not None and "bytes" in site_span.attributes
+            ),
+        ),
+        *_format_metric_family(
+            "deploy_duration_seconds",
+            metric_type="gauge",
+            help_text="Time taken to upload each site to each remote server.",
+            samples=_get_deploy_samples(
+                DEPLOY_SPANS, get_value=lambda deploy_span: deploy_span.duration, aggregate=max
+            ),
+        ),
+        *_format_metric_family(
+            "rsync_transferred_bytes",
+            metric_type="gauge",
+            help_text="Bytes sent by rsync when uploading each site to each remote server.",
+            samples=_get_deploy_samples(
+                DEPLOY_SPANS,
+                get_value=lambda deploy_span: (
+                    int(deploy_span.attributes["transferred_bytes"])
+                    if "transferred_bytes" in deploy_span.attributes
+                    else None
+                ),
+                aggregate=sum,
+            ),
+        ),
+        *_format_metric_family(
+            "deploy_success",
+            metric_type="gauge",
+            help_text="Whether each site was uploaded to each remote server (1 or 0).",
+            samples=_get_deploy_samples(
+                DEPLOY_SPANS,
+                get_value=lambda deploy_span: int("error" not in deploy_span.attributes),
+                aggregate=min,
+            ),
+        ),
+        *_format_metric_family(
+            "site_deploy_success",
+            metric_type="gauge",
+            help_text="Whether each built site was deployed to every remote server (1 or 0).",
+            samples=(
+                (
+                    "",
+                    {"site": site_span.site_name},
+                    int(site_span.site_name in deployed_site_names),
+                )
+                for site_span in SITE_SPANS
+                if site_span.site_name is not None
+            ),
+        ),
+        *_format_metric_family(
+            "run_success",
+            metric_type="gauge",
+            help_text="Whether the last build & deploy run succeeded (1 or 0).",
+            samples=(("", {}, int(succeeded)),),
+        ),
+        *_format_metric_family(
+            "last_run_timestamp_seconds",
+            metric_type="gauge",
+            help_text="Unix time at which the last build & deploy run finished.",
+            samples=(("", {}, time.time()),),
+        ),
+    ]
+
+    return "\n".join(metric_lines) + "\n"
+
+
+def write_textfile(
+    metrics_file_path: Path,
+    *,
+    deployed_site_names: AbstractSet[str],
+    succeeded: bool,
+    spans: Iterable[Span] | None = None,
+) -> None:
+    """
+    Atomically save the metrics of this run, for node_exporter's textfile collector.
+
+    The metrics are written to a temporary file alongside the target (without a `.prom`
+    suffix, so that it is never collected), which then replaces the target in one rename.
+    """
+    metrics_file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    temporary_metrics_file_path: Path = metrics_file_path.with_name(
+        f"{metrics_file_path.name}.tmp"
+    )
+    temporary_metrics_file_path.write_text(
+        format_metrics(
+            tracing.get_spans() if spans is None else spans,
+            deployed_site_names=deployed_site_names,
+            succeeded=succeeded,
+        ),
+        encoding="utf-8",
+    )
+    temporary_metrics_file_path.replace(metrics_file_path)
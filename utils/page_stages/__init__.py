@@ -0,0 +1,30 @@
+"""Stages that optimise each rendered page, after it is rendered & before it is saved."""
+
+from typing import TYPE_CHECKING
+
+from . import intrinsic_sizes, resource_hints
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from pathlib import Path, PurePosixPath
+
+__all__: Sequence[str] = ("apply_page_stages", "intrinsic_sizes", "resource_hints")
+
+
+def apply_page_stages(
+    rendered_page: str, *, page_path: PurePosixPath, site_deploy_directory: Path
+) -> str:
+    """
+    Apply every page stage to the given rendered page, in order.
+
+    Stages may read the site's other files (e.g. its static files),
+    so must only be applied once the site's `deploy/` directory has been prepared.
+    Intrinsic sizes are filled in first, so that resource hints can rely on them.
+    """
+    rendered_page = intrinsic_sizes.add_intrinsic_sizes(
+        rendered_page, page_path=page_path, site_deploy_directory=site_deploy_directory
+    )
+
+    return resource_hints.add_resource_hints(
+        rendered_page, page_path=page_path, site_deploy_directory=site_deploy_directory
+    )
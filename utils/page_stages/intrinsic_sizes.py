@@ -0,0 +1,233 @@
+"""Page stage filling in each image's `width` & `height` from its intrinsic dimensions."""
+
+import re
+from typing import TYPE_CHECKING, NamedTuple
+
+from utils import html_assets, image_dimensions, logging_setup
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping, MutableSequence, Sequence
+    from logging import Logger, LoggerAdapter
+    from pathlib import Path, PurePosixPath
+    from typing import Final
+
+__all__: Sequence[str] = ("add_intrinsic_sizes",)
+
+
+ASPECT_RATIO_TOLERANCE: Final[float] = 0.01
+
+_DIMENSION_VALUE_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"\s*(\d+(?:\.\d+)?)\s*(%?)\s*(\S*)"
+)
+
+
+class _DimensionValue(NamedTuple):
+    """A `width` or `height` attribute value, as parsed for presentational hints."""
+
+    length: float
+    is_percentage: bool
+    ignored_unit: str
+
+
+def _parse_dimension_value(raw_dimension_value: str | None) -> _DimensionValue | None:
+    """
+    Parse a `width` or `height` attribute value, following the HTML rules for dimension values.
+
+    A leading number is used (e.g. `100vh` is 100 pixels), and a trailing `%` is a percentage.
+    Any other unit is ignored by browsers, so it is returned separately (to be warned about).
+    Values with no leading number (e.g. `auto`) are ignored by browsers, so `None` is returned.
+    """
+    dimension_match: Final[re.Match[str] | None] = (
+        _DIMENSION_VALUE_PATTERN.match(raw_dimension_value)
+        if raw_dimension_value is not None
+        else None
+    )
+    if dimension_match is None:
+        return None
+
+    return _DimensionValue(
+        length=float(dimension_match.group(1)),
+        is_percentage=bool(dimension_match.group(2)),
+        ignored_unit=(
+            ""
+            if dimension_match.group(2) or dimension_match.group(3).lower() == "px"
+            else dimension_match.group(3)
+        ),
+    )
+
+
+def _get_aspect_ratio_style(
+    image_tag: html_assets.HTMLTag, intrinsic_dimensions: image_dimensions.ImageDimensions
+) -> str | None:
+    """Get the given image's `style` attribute, with its `aspect-ratio` added (if missing)."""
+    existing_style: Final[str] = (image_tag.get_attribute("style") or "").strip()
+    if "aspect-ratio" in existing_style:
+        return image_tag.get_attribute("style")
+
+    ASPECT_RATIO_STYLE: Final[str] = (
+        f"aspect-ratio: {intrinsic_dimensions.width:d} / {intrinsic_dimensions.height:d}"
+    )
+    return (
+        f"{existing_style.removesuffix(';')}; {ASPECT_RATIO_STYLE}"
+        if existing_style
+        else ASPECT_RATIO_STYLE
+    )
+
+
+def _get_sized_attributes(
+    image_tag: html_assets.HTMLTag,
+    intrinsic_dimensions: image_dimensions.ImageDimensions,
+    *,
+    page_logger: LoggerAdapter[Logger],
+) -> Mapping[str, str | None]:
+    """
+    Get the given image's attributes, with its `width` & `height` set to pixel lengths.
+
+    Any pixel length already given is kept, with the other calculated from the aspect ratio
+    (unless both are given & their aspect ratio mismatches the image's, which is corrected).
+    Percentage lengths are kept, because replacing them would change the rendered size,
+    so the image's aspect ratio is instead given by its `style` attribute.
+    A pixel length given alongside a percentage one is removed,
+    because `aspect-ratio` only takes effect when the other dimension is automatic.
+    """
+    width: Final[_DimensionValue | None] = _parse_dimension_value(
+        image_tag.get_attribute("width")
+    )
+    height: Final[_DimensionValue | None] = _parse_dimension_value(
+        image_tag.get_attribute("height")
+    )
+
+    attribute_name: str
+    dimension_value: _DimensionValue | None
+    for attribute_name, dimension_value in (("width", width), ("height", height)):
+        if dimension_value is not None and dimension_value.ignored_unit:
+            page_logger.warning(
+                "Image %r has a %s of %r, but browsers ignore its unit (%r) "
+                "& read it as %g pixels instead.",
+                image_tag.get_attribute("src"),
+                attribute_name,
+                image_tag.get_attribute(attribute_name),
+                dimension_value.ignored_unit,
+                dimension_value.length,
+            )
+
+    if (
+        width is not None
+        and height is not None
+        and width.is_percentage
+        and height.is_percentage
+    ):
+        return image_tag.attributes
+
+    if (width is not None and width.is_percentage) or (
+        height is not None and height.is_percentage
+    ):
+        pixel_attribute_name: str | None = None
+        if width is not None and width.is_percentage and height is not None:
+            pixel_attribute_name = "height"
+        elif height is not None and height.is_percentage and width is not None:
+            pixel_attribute_name = "width"
+
+        if pixel_attribute_name is not None:
+            page_logger.warning(
+                "Image %r has mismatched dimensions of %sx%s "
+                "(so its %s has been removed, to keep its %dx%d aspect ratio).",
+                image_tag.get_attribute("src"),
+                image_tag.get_attribute("width"),
+                image_tag.get_attribute("height"),
+                pixel_attribute_name,
+                intrinsic_dimensions.width,
+                intrinsic_dimensions.height,
+            )
+
+        return {
+            **{
+                existing_attribute_name: attribute_value
+                for existing_attribute_name, attribute_value in image_tag.attributes.items()
+                if existing_attribute_name != pixel_attribute_name
+            },
+            "style": _get_aspect_ratio_style(image_tag, intrinsic_dimensions),
+        }
+
+    sized_width: float
+    sized_height: float
+    if width is not None and height is not None:
+        sized_width, sized_height = width.length, height.length
+
+        if (
+            height.length == 0
+            or abs(width.length / height.length - intrinsic_dimensions.aspect_ratio)
+            > ASPECT_RATIO_TOLERANCE * intrinsic_dimensions.aspect_ratio
+        ):
+            sized_height = width.length / intrinsic_dimensions.aspect_ratio
+            page_logger.warning(
+                "Image %r is %dx%d, but has mismatched dimensions of %sx%s "
+                "(so its height has been corrected to %d).",
+                image_tag.get_attribute("src"),
+                intrinsic_dimensions.width,
+                intrinsic_dimensions.height,
+                image_tag.get_attribute("width"),
+                image_tag.get_attribute("height"),
+                round(sized_height),
+            )
+
+    elif width is not None:
+        sized_width = width.length
+        sized_height = width.length / intrinsic_dimensions.aspect_ratio
+
+    elif height is not None:
+        sized_width = height.length * intrinsic_dimensions.aspect_ratio
+        sized_height = height.length
+
+    else:
+        sized_width = intrinsic_dimensions.width
+        sized_height = intrinsic_dimensions.height
+
+    return {
+        **image_tag.attributes,
+        "width": f"{round(sized_width):d}",
+        "height": f"{round(sized_height):d}",
+    }
+
+
+def add_intrinsic_sizes(
+    rendered_page: str, *, page_path: PurePosixPath, site_deploy_directory: Path
+) -> str:
+    """
+    Set the `width` & `height` of every local image in the given page to pixel lengths.
+
+    This lets browsers reserve space for each image before it has been fetched,
+    so the page's layout does not shift as images load.
+    Images that cannot be found (or whose format is unknown) are left unchanged.
+    """
+    PAGE_LOGGER: Final[LoggerAdapter[Logger]] = logging_setup.get_context_logger(
+        f"{site_deploy_directory.name}/{page_path.as_posix()}"
+    )
+
+    replacements: MutableSequence[tuple[html_assets.HTMLTag, str]] = []
+
+    image_tag: html_assets.HTMLTag
+    for image_tag in html_assets.parse_tags(rendered_page, tag_names={"img"}):
+        image_path: PurePosixPath | None = html_assets.resolve_asset_path(
+            page_path, image_tag.get_attribute("src") or ""
+        )
+        if image_path is None or not (site_deploy_directory / image_path).is_file():
+            continue
+
+        intrinsic_dimensions: image_dimensions.ImageDimensions | None = (
+            image_dimensions.get_image_dimensions(site_deploy_directory / image_path)
+        )
+        if intrinsic_dimensions is None:
+            continue
+
+        sized_attributes: Mapping[str, str | None] = _get_sized_attributes(
+            image_tag, intrinsic_dimensions, page_logger=PAGE_LOGGER
+        )
+        if sized_attributes != image_tag.attributes:
+            replacements.append(
+                (image_tag, html_assets.format_start_tag(image_tag.name, sized_attributes))
+            )
+
+    PAGE_LOGGER.debug("Filled in intrinsic sizes of %d image(s).", len(replacements))
+
+    return html_assets.replace_tags(rendered_page, replacements)
@@ -0,0 +1,297 @@
+"""Page stage adding preload hints for each page's fonts, and prioritising its LCP image."""
+
+import re
+from typing import TYPE_CHECKING, NamedTuple
+
+from utils import html_assets
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+    from pathlib import Path, PurePosixPath
+    from typing import Final
+
+__all__: Sequence[str] = (
+    "RESOURCE_HINTS_COMMENT",
+    "RESOURCE_HINTS_MARKER",
+    "add_resource_hints",
+)
+
+
+RESOURCE_HINTS_COMMENT: Final[str] = "resource-hints"
+RESOURCE_HINTS_MARKER: Final[str] = f"<!-- {RESOURCE_HINTS_COMMENT} -->"
+
+DEFAULT_FONT_WEIGHT: Final[int] = 400
+FONT_WEIGHT_KEYWORDS: Final[Mapping[str, int]] = {"bold": 700, "normal": 400}
+FONT_MEDIA_TYPES: Final[Mapping[str, str]] = {
+    "woff2": "font/woff2",
+    "woff": "font/woff",
+    "truetype": "font/ttf",
+    "opentype": "font/otf",
+}
+LCP_MINIMUM_IMAGE_AREA: Final[int] = 200 * 200
+LCP_MINIMUM_IMAGE_SIZE: Final[int] = 16 * 1024
+
+_CSS_COMMENT_PATTERN: Final[re.Pattern[str]] = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_FONT_FACE_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"@font-face\s*\{([^{}]*)\}", re.IGNORECASE
+)
+_CSS_RULE_PATTERN: Final[re.Pattern[str]] = re.compile(r"[^{}]*\{([^{}]*)\}")
+_CSS_FONT_SOURCE_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"""url\(\s*(['"]?)(?P<url>.*?)\1\s*\)\s*"""
+    r"""(?:format\(\s*['"]?(?P<format>[\w-]+)['"]?\s*\))?""",
+    re.IGNORECASE,
+)
+
+
+class _FontFace(NamedTuple):
+    family: str
+    style: str
+    minimum_weight: int
+    maximum_weight: int
+    font_path: PurePosixPath
+    media_type: str
+
+
+def _parse_declarations(declarations_block: str) -> Mapping[str, str]:
+    declarations: dict[str, str] = {}
+
+    raw_declaration: str
+    for raw_declaration in declarations_block.split(";"):
+        property_name: str
+        separator: str
+        property_value: str
+        property_name, separator, property_value = raw_declaration.partition(":")
+        if separator:
+            declarations[property_name.strip().lower()] = property_value.strip()
+
+    return declarations
+
+
+def _parse_font_family(raw_font_family: str) -> str:
+    """Get the first (i.e. preferred) family of the given `font-family` value."""
+    return raw_font_family.split(",", 1)[0].strip().strip("'\"").casefold()
+
+
+def _parse_font_weights(raw_font_weight: str) -> tuple[int, int]:
+    """Get the range of weights of the given `font-weight` value (e.g. `100 900`)."""
+    font_weights: Final[Sequence[int]] = [
+        FONT_WEIGHT_KEYWORDS[raw_weight]
+        if raw_weight in FONT_WEIGHT_KEYWORDS
+        else int(raw_weight)
+        for raw_weight in raw_font_weight.lower().split()
+        if raw_weight in FONT_WEIGHT_KEYWORDS or raw_weight.isdecimal()
+    ] or [DEFAULT_FONT_WEIGHT]
+
+    return min(font_weights), max(font_weights)
+
+
+def _parse_font_face(
+    declarations: Mapping[str, str], *, stylesheet_path: PurePosixPath
+) -> _FontFace | None:
+    """Parse a single `@font-face` rule, choosing its first source that can be preloaded."""
+    if "font-family" not in declarations or "src" not in declarations:
+        return None
+
+    font_source: re.Match[str]
+    for font_source in _CSS_FONT_SOURCE_PATTERN.finditer(declarations["src"]):
+        media_type: str | None = FONT_MEDIA_TYPES.get(
+            (font_source.group("format") or "").lower()
+        )
+        font_path: PurePosixPath | None = html_assets.resolve_asset_path(
+            stylesheet_path, font_source.group("url")
+        )
+        if media_type is None or font_path is None:
+            continue
+
+        minimum_weight: int
+        maximum_weight: int
+        minimum_weight, maximum_weight = _parse_font_weights(
+            declarations.get("font-weight", "normal")
+        )
+
+        return _FontFace(
+            family=_parse_font_family(declarations["font-family"]),
+            style=declarations.get("font-style", "normal").lower(),
+            minimum_weight=minimum_weight,
+            maximum_weight=maximum_weight,
+            font_path=font_path,
+            media_type=media_type,
+        )
+
+    return None
+
+
+def _get_preloaded_fonts(
+    stylesheet_paths: Iterable[PurePosixPath], *, site_deploy_directory: Path
+) -> Sequence[_FontFace]:
+    """
+    Get the font face that renders the body text of each font family the stylesheets use.
+
+    A family is only used if some rule (other than its `@font-face` rules) prefers it.
+    Only the normal-style face matching the weight of the first such rule is preloaded,
+    because preloading every weight & style would compete with more important requests.
+    """
+    font_faces: list[_FontFace] = []
+    used_font_weights: dict[str, int] = {}
+
+    stylesheet_path: PurePosixPath
+    for stylesheet_path in stylesheet_paths:
+        stylesheet_file_path: Path = site_deploy_directory / stylesheet_path
+        if not stylesheet_file_path.is_file():
+            continue
+
+        stylesheet: str = _CSS_COMMENT_PATTERN.sub(
+            "", stylesheet_file_path.read_text(encoding="utf-8")
+        )
+
+        font_face_match: re.Match[str]
+        for font_face_match in _CSS_FONT_FACE_PATTERN.finditer(stylesheet):
+            parsed_font_face: _FontFace | None = _parse_font_face(
+                _parse_declarations(font_face_match.group(1)), stylesheet_path=stylesheet_path
+            )
+            if parsed_font_face is not None:
+                font_faces.append(parsed_font_face)
+
+        rule_match: re.Match[str]
+        for rule_match in _CSS_RULE_PATTERN.finditer(
+            _CSS_FONT_FACE_PATTERN.sub("", stylesheet)
+        ):
+            declarations: Mapping[str, str] = _parse_declarations(rule_match.group(1))
+            if "font-family" in declarations:
+                used_font_weights.setdefault(
+                    _parse_font_family(declarations["font-family"]),
+                    _parse_font_weights(declarations.get("font-weight", "normal"))[0],
+                )
+
+    preloaded_fonts: dict[str, _FontFace] = {}
+
+    font_face: _FontFace
+    for font_face in font_faces:
+        used_font_weight: int | None = used_font_weights.get(font_face.family)
+        if (
+            used_font_weight is not None
+            and font_face.family not in preloaded_fonts
+            and font_face.style == "normal"
+            and font_face.minimum_weight <= used_font_weight <= font_face.maximum_weight
+            and (site_deploy_directory / font_face.font_path).is_file()
+        ):
+            preloaded_fonts[font_face.family] = font_face
+
+    return list(preloaded_fonts.values())
+
+
+def _get_image_area(image_tag: html_assets.HTMLTag) -> int | None:
+    raw_width: Final[str] = image_tag.get_attribute("width") or ""
+    raw_height: Final[str] = image_tag.get_attribute("height") or ""
+    if not raw_width.isdecimal() or not raw_height.isdecimal():
+        return None
+
+    return int(raw_width) * int(raw_height)
+
+
+def _find_lcp_image(
+    page_path: PurePosixPath, source: str, *, site_deploy_directory: Path
+) -> html_assets.HTMLTag | None:
+    """
+    Find the image most likely to be the page's largest contentful paint (LCP).
+
+    Without laying out the page, this is taken to be the first large image in the document,
+    judged by its `width` & `height` attributes (or by its file size, if they are missing).
+    """
+    image_tag: html_assets.HTMLTag
+    for image_tag in html_assets.parse_tags(source, tag_names={"img"}):
+        image_path: PurePosixPath | None = html_assets.resolve_asset_path(
+            page_path, image_tag.get_attribute("src") or ""
+        )
+        if image_tag.is_in_noscript or image_path is None:
+            continue
+
+        image_file_path: Path = site_deploy_directory / image_path
+        if not image_file_path.is_file():
+            continue
+
+        image_area: int | None = _get_image_area(image_tag)
+        if (
+            image_area >= LCP_MINIMUM_IMAGE_AREA
+            if image_area is not None
+            else image_file_path.stat().st_size >= LCP_MINIMUM_IMAGE_SIZE
+        ):
+            return image_tag
+
+    return None
+
+
+def add_resource_hints(
+    rendered_page: str, *, page_path: PurePosixPath, site_deploy_directory: Path
+) -> str:
+    """
+    Add resource hints to the given page, if it contains the resource hints marker.
+
+    The marker is replaced by a `<link rel="preload">` for each font used by the page's
+    stylesheets (unless the page already preloads it),
+    so that fonts are fetched without waiting for the stylesheets to be parsed.
+    The likely LCP image is fetched with high priority, and never lazily,
+    whereas every other image keeps its existing `loading` attribute.
+    """
+    if RESOURCE_HINTS_MARKER not in rendered_page:
+        return rendered_page
+
+    lcp_image_tag: Final[html_assets.HTMLTag | None] = _find_lcp_image(
+        page_path, rendered_page, site_deploy_directory=site_deploy_directory
+    )
+    if lcp_image_tag is not None:
+        rendered_page = html_assets.replace_tags(
+            rendered_page,
+            (
+                (
+                    lcp_image_tag,
+                    html_assets.format_start_tag(
+                        lcp_image_tag.name,
+                        {
+                            **{
+                                attribute_name: attribute_value
+                                for attribute_name, attribute_value in (
+                                    lcp_image_tag.attributes.items()
+                                )
+                                if attribute_name != "loading"
+                            },
+                            "fetchpriority": "high",
+                        },
+                    ),
+                ),
+            ),
+        )
+
+    asset_references: Final[Mapping[PurePosixPath, html_assets.AssetReference]] = (
+        html_assets.get_page_view_asset_references(page_path, rendered_page)
+    )
+    preloaded_fonts: Final[Sequence[_FontFace]] = [
+        preloaded_font
+        for preloaded_font in _get_preloaded_fonts(
+            (
+                asset_path
+                for asset_path, asset_reference in asset_references.items()
+                if asset_reference.kind == "stylesheet"
+            ),
+            site_deploy_directory=site_deploy_directory,
+        )
+        if preloaded_font.font_path not in asset_references
+    ]
+
+    return rendered_page.replace(
+        RESOURCE_HINTS_MARKER,
+        "".join(
+            html_assets.format_start_tag(
+                "link",
+                {
+                    "rel": "preload",
+                    "href": f"/{preloaded_font.font_path}",
+                    "as": "font",
+                    "type": preloaded_font.media_type,
+                    "crossorigin": None,
+                },
+            )
+            for preloaded_font in preloaded_fonts
+        ),
+        1,
+    )
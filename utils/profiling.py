@@ -0,0 +1,149 @@
+"""Opt-in per-phase & per-site profiling of builds and deployments, using `cProfile`."""
+
+import contextlib
+import cProfile
+import logging
+import pstats
+import sys
+import threading
+from typing import TYPE_CHECKING
+
+from utils import PROJECT_ROOT
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+    from contextlib import AbstractContextManager
+    from logging import Logger
+    from pathlib import Path
+    from typing import Final
+
+__all__: Sequence[str] = (
+    "DEFAULT_PROFILE_DIRECTORY",
+    "DEFAULT_SUMMARY_LENGTH",
+    "enable",
+    "is_enabled",
+    "profile_phase",
+    "write_profiles",
+)
+
+
+logger: Final[Logger] = logging.getLogger("static-websites-builder")
+
+DEFAULT_PROFILE_DIRECTORY: Final[Path] = PROJECT_ROOT / ".cache/static-websites/profiles"
+DEFAULT_SUMMARY_LENGTH: Final[int] = 20
+
+_NO_PROFILING_CONTEXT: Final[AbstractContextManager[None]] = contextlib.nullcontext()
+
+_profile_directory: Path | None = None
+_profiles: Final[dict[tuple[str, str | None], cProfile.Profile]] = {}
+_profiles_lock: Final[threading.Lock] = threading.Lock()
+
+
+def enable(profile_directory: Path = DEFAULT_PROFILE_DIRECTORY) -> None:
+    """
+    Start collecting profiles of every subsequently run phase.
+
+    Any `.pstats` files left in the given profile directory by a previous run are deleted.
+    """
+    global _profile_directory  # noqa: PLW0603
+
+    if profile_directory.is_dir():
+        stale_profile_path: Path
+        for stale_profile_path in profile_directory.rglob("*.pstats"):
+            stale_profile_path.unlink()
+
+    _profile_directory = profile_directory
+
+
+def is_enabled() -> bool:
+    """Whether profiles are currently being collected."""
+    return _profile_directory is not None
+
+
+@contextlib.contextmanager
+def _profile_enabled_phase(phase_name: str, *, site_name: str | None) -> Iterator[None]:
+    with _profiles_lock:
+        profile: cProfile.Profile = _profiles.setdefault(
+            (phase_name, site_name), cProfile.Profile()
+        )
+
+    # NOTE: Only one profiler can be active at a time (across all threads),
+    # so any phase that overlaps another (e.g. when pipelining) is run without being profiled
+    profiling_error: ValueError
+    try:
+        profile.enable()
+    except ValueError as profiling_error:
+        logger.debug(
+            "Skipping profiling of overlapping phase %r%s: %s",
+            phase_name,
+            f" of {site_name}" if site_name is not None else "",
+            profiling_error,
+        )
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        profile.disable()
+
+
+def profile_phase(
+    phase_name: str, *, site_name: str | None = None
+) -> AbstractContextManager[None]:
+    """
+    Profile the code run within this context as part of the given phase of the given site.
+
+    Repeated uses of the same phase of the same site are accumulated into a single profile.
+    If profiling has not been enabled, a shared no-op context is returned instead,
+    so that phases can be marked throughout the build & deploy code without any overhead.
+    """
+    if _profile_directory is None:
+        return _NO_PROFILING_CONTEXT
+
+    return _profile_enabled_phase(phase_name, site_name=site_name)
+
+
+def write_profiles(*, summary_length: int = DEFAULT_SUMMARY_LENGTH) -> Sequence[Path]:
+    """
+    Save one `.pstats` file per profiled phase & site, then print the hottest functions.
+
+    Site-specific profiles are saved within a subdirectory for each site.
+    The summary of the `summary_length` functions with the highest total internal time
+    (across every phase) is printed to stderr, leaving stdout for the script's output.
+    """
+    if _profile_directory is None:
+        return []
+
+    with _profiles_lock:
+        profiles: Final[dict[tuple[str, str | None], cProfile.Profile]] = dict(_profiles)
+        _profiles.clear()
+
+    profile_paths: list[Path] = []
+
+    phase_name: str
+    site_name: str | None
+    profile: cProfile.Profile
+    for (phase_name, site_name), profile in sorted(
+        profiles.items(), key=lambda item: (item[0][1] or "", item[0][0])
+    ):
+        profile_path: Path = (
+            _profile_directory / site_name / f"{phase_name}.pstats"
+            if site_name is not None
+            else _profile_directory / f"{phase_name}.pstats"
+        )
+        profile_path.parent.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(profile_path)
+        profile_paths.append(profile_path)
+
+    if not profile_paths:
+        return profile_paths
+
+    logger.info(
+        "Saved %d profile(s) into directory: %s", len(profile_paths), _profile_directory
+    )
+
+    summary_stats: pstats.Stats = pstats.Stats(*map(str, profile_paths), stream=sys.stderr)
+    summary_stats.strip_dirs().sort_stats(pstats.SortKey.TIME).print_stats(summary_length)
+
+    return profile_paths
@@ -0,0 +1,113 @@
+"""Timeout-bounded hostname resolution, with an in-process time-to-live cache."""
+
+import ipaddress
+import socket
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Final
+
+__all__: Sequence[str] = (
+    "DEFAULT_CACHE_TTL",
+    "DEFAULT_RESOLUTION_TIMEOUT",
+    "clear_cache",
+    "resolve_hostname",
+)
+
+
+DEFAULT_RESOLUTION_TIMEOUT: Final[float] = 3.0
+DEFAULT_CACHE_TTL: Final[float] = 300.0
+
+_resolved_addresses_cache: Final[dict[str, tuple[float, str]]] = {}
+_resolved_addresses_cache_lock: Final[threading.Lock] = threading.Lock()
+
+
+def _get_literal_ip_address(hostname: str) -> str | None:
+    try:
+        return str(ipaddress.ip_address(hostname.removeprefix("[").removesuffix("]")))
+    except ValueError:
+        return None
+
+
+def _lookup_address(hostname: str, *, timeout: float) -> str:
+    """
+    Look up the first address of the given hostname, giving up after `timeout` seconds.
+
+    `socket.getaddrinfo()` has no timeout of its own,
+    so the lookup is run in a daemon thread that is abandoned if it does not finish in time.
+    """
+    lookup_results: list[str] = []
+    lookup_errors: list[OSError | UnicodeError] = []
+
+    def _lookup() -> None:
+        # NOTE: Errors are passed back to the calling thread to be raised there,
+        # because an exception escaping this thread would be reported as a timeout
+        lookup_error: OSError | UnicodeError
+        try:
+            lookup_results.append(
+                str(socket.getaddrinfo(hostname, None, type=socket.SOCK_STREAM)[0][4][0])
+            )
+        except (OSError, UnicodeError) as lookup_error:
+            lookup_errors.append(lookup_error)
+
+    lookup_thread: Final[threading.Thread] = threading.Thread(
+        target=_lookup, name=f"resolve-{hostname}", daemon=True
+    )
+    lookup_thread.start()
+    lookup_thread.join(timeout)
+
+    if lookup_errors:
+        raise lookup_errors[0]
+
+    if not lookup_results:
+        RESOLUTION_TIMED_OUT_MESSAGE: Final[str] = (
+            f"Resolving hostname {hostname!r} timed out after {timeout:g} seconds."
+        )
+        raise TimeoutError(RESOLUTION_TIMED_OUT_MESSAGE)
+
+    return lookup_results[0]
+
+
+def resolve_hostname(
+    hostname: str,
+    *,
+    timeout: float = DEFAULT_RESOLUTION_TIMEOUT,
+    ttl: float = DEFAULT_CACHE_TTL,
+) -> str:
+    """
+    Resolve the given hostname to a single IP address string.
+
+    Literal IPv4/IPv6 addresses are returned (normalised) without any lookup.
+    Successful lookups are cached for `ttl` seconds,
+    so repeated resolutions of the same hostname only hit DNS once.
+
+    Raises:
+        socket.gaierror: If the hostname could not be resolved.
+        UnicodeError: If the hostname is not a valid internationalised domain name.
+        TimeoutError: If the lookup did not complete within `timeout` seconds.
+    """
+    literal_ip_address: str | None = _get_literal_ip_address(hostname)
+    if literal_ip_address is not None:
+        return literal_ip_address
+
+    with _resolved_addresses_cache_lock:
+        cached_resolution: tuple[float, str] | None = _resolved_addresses_cache.get(hostname)
+
+    if cached_resolution is not None and cached_resolution[0] > time.monotonic():
+        return cached_resolution[1]
+
+    resolved_address: str = _lookup_address(hostname, timeout=timeout)
+
+    with _resolved_addresses_cache_lock:
+        _resolved_addresses_cache[hostname] = (time.monotonic() + ttl, resolved_address)
+
+    return resolved_address
+
+
+def clear_cache() -> None:
+    """Discard all cached hostname resolutions."""
+    with _resolved_addresses_cache_lock:
+        _resolved_addresses_cache.clear()
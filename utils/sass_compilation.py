@@ -0,0 +1,306 @@
+"""Compile each site's Sass entry points into stylesheets, recompiling only changed ones."""
+
+import functools
+import hashlib
+import logging
+import re
+import shutil
+import subprocess
+import time
+from pathlib import Path, PurePosixPath
+from subprocess import CalledProcessError, TimeoutExpired
+from typing import TYPE_CHECKING
+
+from utils import cache, deploy_files, logging_setup, manifest, tracing
+
+if TYPE_CHECKING:
+    from collections.abc import MutableSet, Sequence
+    from collections.abc import Set as AbstractSet
+    from logging import Logger, LoggerAdapter
+    from subprocess import CompletedProcess
+    from typing import Final
+
+__all__: Sequence[str] = ("compile_site_stylesheets", "get_sass_dependency_paths")
+
+
+logger: Final[Logger] = logging.getLogger("static-websites-builder")
+
+SASS_EXECUTABLE: Final[str] = "sass"
+SASS_OUTPUT_STYLE: Final[str] = "compressed"
+SASS_DIRECTORY: Final[PurePosixPath] = PurePosixPath("static/sass")
+STYLESHEET_DIRECTORY: Final[PurePosixPath] = PurePosixPath("static/css")
+SASS_SUFFIXES: Final[Sequence[str]] = (".scss", ".sass", ".css")
+SASS_VERSION_TIMEOUT: Final[float] = 30.0
+SASS_COMPILE_TIMEOUT: Final[float] = 120.0
+
+_DEPENDENCY_RULE_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"@(?:import|use|forward)\s+([^;\n]+)"
+)
+_QUOTED_URL_PATTERN: Final[re.Pattern[str]] = re.compile(r"""(["'])(.+?)\1""")
+
+
+@functools.cache
+def _get_sass_version() -> str | None:
+    """
+    Get the version of the installed Sass compiler, or `None` if it cannot be found.
+
+    A missing compiler is warned about here, so that it is only reported once per process
+    (rather than on every build of every site with Sass).
+    """
+    if shutil.which(SASS_EXECUTABLE) is None:
+        logger.warning(
+            "Sass compiler (`%s`) could not be found, "
+            "so the stylesheets committed alongside each site's Sass will be used instead.",
+            SASS_EXECUTABLE,
+        )
+        return None
+
+    return subprocess.run(
+        (SASS_EXECUTABLE, "--version"),
+        check=True,
+        capture_output=True,
+        text=True,
+        timeout=SASS_VERSION_TIMEOUT,
+    ).stdout.strip()
+
+
+@functools.cache
+def _get_dependency_urls(file_path: Path, file_hash: str) -> Sequence[str]:  # noqa: ARG001
+    """
+    Get the URLs of every `@import`, `@use` & `@forward` rule of the given Sass file.
+
+    Results are remembered by the file's content hash,
+    so unchanged files are not parsed again (e.g. by watch mode).
+    Plain-CSS imports (e.g. of remote URLs) & built-in modules are ignored,
+    because the compiler never loads them from disk.
+    """
+    return [
+        url
+        for dependency_rule_match in _DEPENDENCY_RULE_PATTERN.finditer(
+            file_path.read_text(encoding="utf-8", errors="replace")
+        )
+        for _, url in _QUOTED_URL_PATTERN.findall(dependency_rule_match.group(1))
+        if not url.startswith(("sass:", "http://", "https://", "//"))
+        and not (url.endswith(".css") and dependency_rule_match.group(0).startswith("@import"))
+    ]
+
+
+def _resolve_dependency_url(
+    url: str, *, importing_file_path: Path, sass_directory: Path
+) -> Path | None:
+    """
+    Find the file loaded by the given URL, following Sass's rules for partials & indices.
+
+    The URL is resolved relative to the importing file, then relative to the load path.
+    """
+    url_path: Final[PurePosixPath] = PurePosixPath(url)
+    candidate_names: Final[Sequence[PurePosixPath]] = (
+        [url_path, url_path.with_name(f"_{url_path.name}")]
+        if url_path.suffix in SASS_SUFFIXES
+        else [
+            candidate_path
+            for suffix in SASS_SUFFIXES
+            for candidate_path in (
+                url_path.with_name(f"{url_path.name}{suffix}"),
+                url_path.with_name(f"_{url_path.name}{suffix}"),
+                url_path / f"index{suffix}",
+                url_path / f"_index{suffix}",
+            )
+        ]
+    )
+
+    base_directory: Path
+    for base_directory in (importing_file_path.parent, sass_directory):
+        candidate_name: PurePosixPath
+        for candidate_name in candidate_names:
+            if (base_directory / candidate_name).is_file():
+                return base_directory / candidate_name
+
+    return None
+
+
+def get_sass_dependency_paths(
+    entry_point_path: Path, *, sass_directory: Path
+) -> Sequence[Path]:
+    """
+    Get every file that the given Sass entry point loads (directly or indirectly).
+
+    The entry point itself is included, and the paths are returned in sorted order.
+    URLs that cannot be resolved are skipped, so that the compiler reports them instead.
+    """
+    dependency_paths: Final[MutableSet[Path]] = set()
+    unvisited_paths: Final[list[Path]] = [entry_point_path]
+
+    while unvisited_paths:
+        file_path: Path = unvisited_paths.pop()
+        if file_path in dependency_paths:
+            continue
+
+        dependency_paths.add(file_path)
+
+        url: str
+        for url in _get_dependency_urls(file_path, manifest.hash_linked_file(file_path)):
+            dependency_path: Path | None = _resolve_dependency_url(
+                url, importing_file_path=file_path, sass_directory=sass_directory
+            )
+            if dependency_path is not None:
+                unvisited_paths.append(dependency_path)
+
+    return sorted(dependency_paths)
+
+
+def _get_compiler_source_hash() -> str:
+    """Get the hash of this module, so that changing how Sass is invoked recompiles it."""
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+def _compile_entry_point(
+    entry_point_path: Path,
+    *,
+    sass_directory: Path,
+    sass_version: str,
+    site_logger: LoggerAdapter[Logger],
+) -> tuple[str, bool]:
+    """
+    Get the compressed stylesheet compiled from the given entry point, & whether it was cached.
+
+    The stylesheet is cached by the hash of every file in the entry point's dependency graph,
+    so it is only recompiled when the entry point (or one of its partials) has changed.
+    """
+    cache_key: Final[str] = cache.get_cache_key(
+        "sass-stylesheet",
+        _get_compiler_source_hash(),
+        sass_version,
+        SASS_OUTPUT_STYLE,
+        entry_point_path.relative_to(sass_directory).as_posix(),
+        *(
+            fingerprint_part
+            for dependency_path in get_sass_dependency_paths(
+                entry_point_path, sass_directory=sass_directory
+            )
+            for fingerprint_part in (
+                dependency_path.relative_to(sass_directory, walk_up=True).as_posix(),
+                manifest.hash_linked_file(dependency_path),
+            )
+        ),
+    )
+    cached_stylesheet: bytes | None = cache.load("sass_stylesheets", cache_key)
+    if cached_stylesheet is not None:
+        return cached_stylesheet.decode("utf-8"), True
+
+    try:
+        completed_process: CompletedProcess[str] = subprocess.run(
+            (
+                SASS_EXECUTABLE,
+                f"--style={SASS_OUTPUT_STYLE}",
+                "--no-source-map",
+                f"--load-path={sass_directory}",
+                str(entry_point_path),
+            ),
+            check=True,
+            capture_output=True,
+            text=True,
+            timeout=SASS_COMPILE_TIMEOUT,
+        )
+    except CalledProcessError as sass_error:
+        site_logger.error(  # noqa: TRY400
+            "Compiling %s failed:\n%s",
+            entry_point_path.name,
+            (sass_error.stderr or "").strip(),
+        )
+        raise
+    except TimeoutExpired:
+        site_logger.error(  # noqa: TRY400
+            "Compiling %s failed: the Sass compiler did not finish within %gs.",
+            entry_point_path.name,
+            SASS_COMPILE_TIMEOUT,
+        )
+        raise
+
+    if completed_process.stderr.strip():
+        site_logger.debug(
+            "Sass warnings when compiling %s:\n%s",
+            entry_point_path.name,
+            completed_process.stderr.strip(),
+        )
+
+    stylesheet: Final[str] = completed_process.stdout
+    cache.store("sass_stylesheets", cache_key, stylesheet.encode("utf-8"))
+
+    return stylesheet, False
+
+
+def compile_site_stylesheets(*, site_deploy_directory: Path) -> AbstractSet[PurePosixPath]:
+    """
+    Compile every Sass entry point of the given built site into its compressed stylesheet.
+
+    Each `static/sass/<name>.scss` entry point (i.e. every file that is not a partial)
+    is compiled to `static/css/<name>.css`, replacing any stylesheet compiled by hand.
+    The compile time of each entry point is reported, as is each reused cached stylesheet.
+    Sites are left unchanged if the Sass compiler is not installed.
+    Returns the paths of the written stylesheets.
+    """
+    SITE_LOGGER: Final[LoggerAdapter[Logger]] = logging_setup.get_context_logger(
+        site_deploy_directory.name
+    )
+    SASS_DIRECTORY_PATH: Final[Path] = site_deploy_directory / SASS_DIRECTORY
+
+    entry_point_paths: Final[Sequence[Path]] = sorted(
+        file_path
+        for file_path in SASS_DIRECTORY_PATH.rglob("*")
+        if file_path.suffix in {".scss", ".sass"}
+        and not file_path.name.startswith("_")
+        and file_path.is_file()
+    )
+    if not entry_point_paths:
+        return set()
+
+    sass_version: Final[str | None] = _get_sass_version()
+    if sass_version is None:
+        SITE_LOGGER.debug("Using the stylesheets committed alongside the site's Sass.")
+        return set()
+
+    stylesheet_paths: Final[MutableSet[PurePosixPath]] = set()
+
+    entry_point_path: Path
+    for entry_point_path in entry_point_paths:
+        ENTRY_POINT_NAME: str = entry_point_path.relative_to(SASS_DIRECTORY_PATH).as_posix()
+        stylesheet_path: PurePosixPath = STYLESHEET_DIRECTORY / PurePosixPath(
+            ENTRY_POINT_NAME
+        ).with_suffix(".css")
+
+        span_attributes: dict[str, int | str]
+        with tracing.span(
+            "compile_sass_entry_point",
+            phase="sass-compilation",
+            site_name=site_deploy_directory.name,
+            entry_point=ENTRY_POINT_NAME,
+        ) as span_attributes:
+            start_time: float = time.perf_counter()
+
+            stylesheet: str
+            is_cached: bool
+            stylesheet, is_cached = _compile_entry_point(
+                entry_point_path,
+                sass_directory=SASS_DIRECTORY_PATH,
+                sass_version=sass_version,
+                site_logger=SITE_LOGGER,
+            )
+            deploy_files.detach_deploy_file(site_deploy_directory, stylesheet_path).write_text(
+                stylesheet, encoding="utf-8"
+            )
+
+            span_attributes["cached"] = int(is_cached)
+            span_attributes["bytes"] = len(stylesheet.encode("utf-8"))
+
+        stylesheet_paths.add(stylesheet_path)
+
+        SITE_LOGGER.debug(
+            "%s %s into %s in %.0fms.",
+            "Restored cached compilation of" if is_cached else "Compiled",
+            ENTRY_POINT_NAME,
+            stylesheet_path,
+            (time.perf_counter() - start_time) * 1000,
+        )
+
+    return stylesheet_paths
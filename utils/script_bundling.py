@@ -0,0 +1,510 @@
+"""Bundle each page's classic scripts into a single minified, fingerprinted script."""
+
+import functools
+import hashlib
+import re
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING
+
+from utils import cache, deploy_files, html_assets, logging_setup, manifest
+
+if TYPE_CHECKING:
+    from collections.abc import MutableMapping, MutableSequence, Sequence
+    from collections.abc import Set as AbstractSet
+    from logging import Logger, LoggerAdapter
+    from typing import Final
+
+__all__: Sequence[str] = ("bundle_site_scripts", "minify_script")
+
+
+BUNDLE_DIRECTORY: Final[PurePosixPath] = PurePosixPath("static/js")
+BUNDLED_SCRIPT_ATTRIBUTES: Final[AbstractSet[str]] = {"charset", "src", "type"}
+CLASSIC_SCRIPT_TYPES: Final[AbstractSet[str]] = {
+    "",
+    "application/javascript",
+    "application/x-javascript",
+    "text/ecmascript",
+    "text/javascript",
+}
+LINE_TERMINATORS: Final[str] = "\n\r\u2028\u2029"
+REGEX_PRECEDING_CHARACTERS: Final[AbstractSet[str]] = set("!%&(*+,-/:;<=>?[^{|}~")
+REGEX_PRECEDING_KEYWORDS: Final[AbstractSet[str]] = {
+    "await",
+    "case",
+    "delete",
+    "do",
+    "else",
+    "in",
+    "instanceof",
+    "new",
+    "of",
+    "return",
+    "throw",
+    "typeof",
+    "void",
+    "yield",
+}
+
+_WORD_PATTERN: Final[re.Pattern[str]] = re.compile(r"[\w$\u0080-\uffff]+")
+_WHITESPACE_PATTERN: Final[re.Pattern[str]] = re.compile(r"\s+")
+_USE_STRICT_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"""(?:\s+|//[^\n]*|/\*.*?\*/)*(['"])use strict\1""", re.DOTALL
+)
+_SCRIPT_END_TAG_PATTERN: Final[re.Pattern[str]] = re.compile(r"\s*</script\s*>", re.IGNORECASE)
+
+
+def _is_word_character(character: str) -> bool:
+    return _WORD_PATTERN.fullmatch(character) is not None
+
+
+def _find_string_end(source: str, start_index: int) -> int:
+    """Find the index just past the end of the string literal starting at the given index."""
+    QUOTE: Final[str] = source[start_index]
+
+    index: int = start_index + 1
+    while index < len(source) and source[index] != QUOTE:
+        index += 2 if source[index] == "\\" else 1
+
+    return index + 1
+
+
+def _find_template_chunk_end(source: str, start_index: int) -> tuple[int, bool]:
+    """
+    Find the end of the template literal text starting at the given index.
+
+    Returns the index just past the closing backtick (or the `${` of a substitution),
+    and whether the text ended with a substitution (rather than the end of the template).
+    """
+    index: int = start_index
+    while index < len(source):
+        if source[index] == "\\":
+            index += 2
+        elif source[index] == "`":
+            return index + 1, False
+        elif source.startswith("${", index):
+            return index + 2, True
+        else:
+            index += 1
+
+    return index, False
+
+
+def _find_regex_end(source: str, start_index: int) -> int | None:
+    """
+    Find the index just past the end of the regex literal starting at the given index.
+
+    `None` is returned if the line ends before the regex does,
+    because the slash must then have been a division operator.
+    """
+    is_in_character_class: bool = False
+
+    index: int = start_index + 1
+    while index < len(source) and source[index] != "\n":
+        match source[index]:
+            case "\\":
+                index += 1
+            case "[":
+                is_in_character_class = True
+            case "]":
+                is_in_character_class = False
+            case "/" if not is_in_character_class:
+                flags_match: re.Match[str] | None = _WORD_PATTERN.match(source, index + 1)
+                return flags_match.end() if flags_match is not None else index + 1
+
+        index += 1
+
+    return None
+
+
+def _is_whitespace_needed(previous_text: str, next_text: str, *, is_newline: bool) -> bool:
+    """
+    Whether whitespace must be kept between the given pieces of minified script.
+
+    Newlines are kept unless they cannot affect automatic semicolon insertion,
+    and spaces are only kept where removing them would join two separate tokens.
+    """
+    PREVIOUS_CHARACTER: Final[str] = previous_text[-1]
+    NEXT_CHARACTER: Final[str] = next_text[0]
+
+    if is_newline:
+        return PREVIOUS_CHARACTER not in "([{,;" and NEXT_CHARACTER not in ")]},;"
+
+    return (
+        (_is_word_character(PREVIOUS_CHARACTER) and _is_word_character(NEXT_CHARACTER))
+        or (_is_word_character(PREVIOUS_CHARACTER) and NEXT_CHARACTER == ".")
+        or (PREVIOUS_CHARACTER in "+-" and NEXT_CHARACTER in "+-")
+        or (PREVIOUS_CHARACTER == "/" and NEXT_CHARACTER in "*/")
+        or (PREVIOUS_CHARACTER == "<" and NEXT_CHARACTER == "!")
+        or (PREVIOUS_CHARACTER == "-" and NEXT_CHARACTER == ">")
+    )
+
+
+class _ScriptMinifier:
+    """Removes the comments & whitespace of a single script, one token at a time."""
+
+    def __init__(self, source: str) -> None:
+        self._source: str = source
+        self._index: int = 0
+        self._minified_parts: list[str] = []
+        self._pending_whitespace: str | None = None
+        self._previous_word: str | None = None
+        self._brace_depth: int = 0
+        self._template_brace_depths: list[int] = []
+
+    def _append(self, text: str, *, is_word: bool = False) -> None:
+        if (
+            self._minified_parts
+            and self._pending_whitespace is not None
+            and _is_whitespace_needed(
+                self._minified_parts[-1], text, is_newline=self._pending_whitespace == "\n"
+            )
+        ):
+            self._minified_parts.append(self._pending_whitespace)
+
+        self._minified_parts.append(text)
+        self._pending_whitespace = None
+        self._previous_word = text if is_word else None
+
+    def _add_whitespace(self, whitespace: str) -> None:
+        if any(line_terminator in whitespace for line_terminator in LINE_TERMINATORS):
+            self._pending_whitespace = "\n"
+        elif self._pending_whitespace is None:
+            self._pending_whitespace = " "
+
+    def _consume_comment(self) -> None:
+        if self._source.startswith("//", self._index):
+            line_end_index: int = self._source.find("\n", self._index)
+            self._index = line_end_index if line_end_index != -1 else len(self._source)
+            return
+
+        comment_end_index: int = self._source.find("*/", self._index + 2)
+        comment_end_index = (
+            comment_end_index + 2 if comment_end_index != -1 else len(self._source)
+        )
+        comment: Final[str] = self._source[self._index : comment_end_index]
+        if comment.startswith("/*!"):
+            self._append(comment)
+        else:
+            self._add_whitespace("\n" if "\n" in comment else " ")
+
+        self._index = comment_end_index
+
+    def _consume_template_chunk(self) -> None:
+        """Consume template literal text, up to its end or its next substitution."""
+        if self._source[self._index] == "}":
+            self._template_brace_depths.pop()
+
+        template_chunk_end_index: int
+        has_substitution: bool
+        template_chunk_end_index, has_substitution = _find_template_chunk_end(
+            self._source, self._index + 1
+        )
+        if has_substitution:
+            self._template_brace_depths.append(self._brace_depth)
+
+        self._append(self._source[self._index : template_chunk_end_index])
+        self._index = template_chunk_end_index
+
+    def _is_regex_allowed(self) -> bool:
+        return (
+            not self._minified_parts
+            or self._minified_parts[-1][-1] in REGEX_PRECEDING_CHARACTERS
+            or self._previous_word in REGEX_PRECEDING_KEYWORDS
+        )
+
+    def _consume_token(self) -> None:
+        character: Final[str] = self._source[self._index]
+
+        if character == "/" and self._is_regex_allowed():
+            regex_end_index: int | None = _find_regex_end(self._source, self._index)
+            if regex_end_index is not None:
+                self._append(self._source[self._index : regex_end_index])
+                self._index = regex_end_index
+                return
+
+        word_match: Final[re.Match[str] | None] = _WORD_PATTERN.match(
+            self._source, self._index
+        )
+        if word_match is not None:
+            self._append(word_match.group(0), is_word=True)
+            self._index = word_match.end()
+            return
+
+        if character == "{":
+            self._brace_depth += 1
+        elif character == "}":
+            self._brace_depth -= 1
+
+        self._append(character)
+        self._index += 1
+
+    def minify(self) -> str:
+        while self._index < len(self._source):
+            character: str = self._source[self._index]
+
+            whitespace_match: re.Match[str] | None = _WHITESPACE_PATTERN.match(
+                self._source, self._index
+            )
+            if whitespace_match is not None:
+                self._add_whitespace(whitespace_match.group(0))
+                self._index = whitespace_match.end()
+
+            elif self._source.startswith(("//", "/*"), self._index):
+                self._consume_comment()
+
+            elif character in {"'", '"'}:
+                string_end_index: int = _find_string_end(self._source, self._index)
+                self._append(self._source[self._index : string_end_index])
+                self._index = string_end_index
+
+            elif character == "`" or (
+                character == "}"
+                and self._template_brace_depths
+                and self._template_brace_depths[-1] == self._brace_depth
+            ):
+                self._consume_template_chunk()
+
+            else:
+                self._consume_token()
+
+        return "".join(self._minified_parts)
+
+
+def minify_script(source: str) -> str:
+    """
+    Conservatively minify the given classic script, by removing comments & whitespace.
+
+    Strings, template literals & regex literals are kept exactly as written,
+    and no code is renamed or rewritten, so the minified script always behaves identically.
+    Line breaks are kept wherever they could affect automatic semicolon insertion,
+    and `/*! ... */` (licence) comments are kept.
+    """
+    return _ScriptMinifier(source).minify()
+
+
+@functools.cache
+def _get_bundler_source_hash() -> str:
+    """Get the hash of this module, so that changing the minifier invalidates any bundles."""
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+def _get_bundle(script_file_paths: Sequence[Path]) -> str:
+    """
+    Get the minified concatenation of the given scripts, cached by the hash of every input.
+
+    Each script is separated by a semicolon,
+    so that a script ending without one never runs into the next.
+    """
+    cache_key: Final[str] = cache.get_cache_key(
+        "script-bundle",
+        _get_bundler_source_hash(),
+        *(
+            manifest.hash_linked_file(script_file_path)
+            for script_file_path in script_file_paths
+        ),
+    )
+    cached_bundle: bytes | None = cache.load("script_bundles", cache_key)
+    if cached_bundle is not None:
+        return cached_bundle.decode("utf-8")
+
+    bundle: str = (
+        ";\n".join(
+            minify_script(script_file_path.read_text(encoding="utf-8")).rstrip(";")
+            for script_file_path in script_file_paths
+        )
+        + ";\n"
+    )
+    cache.store("script_bundles", cache_key, bundle.encode("utf-8"))
+
+    return bundle
+
+
+def _is_classic_script(script_tag: html_assets.HTMLTag) -> bool:
+    return (script_tag.get_attribute("type") or "").strip().lower() in CLASSIC_SCRIPT_TYPES
+
+
+def _is_deferred_script(script_tag: html_assets.HTMLTag) -> bool:
+    """Whether the given script runs after the page has been parsed, in document order."""
+    if "async" in script_tag.attributes or script_tag.get_attribute("src") is None:
+        return False
+
+    return "defer" in script_tag.attributes or script_tag.get_attribute("type") == "module"
+
+
+def _is_synchronous_script(script_tag: html_assets.HTMLTag) -> bool:
+    """Whether the given script runs as soon as it is parsed, blocking the rest of the page."""
+    return not _is_deferred_script(script_tag) and "async" not in script_tag.attributes
+
+
+class _ScriptGroup:
+    """Consecutive bundleable scripts of a page, which always run one after another."""
+
+    def __init__(self) -> None:
+        self.script_tags: list[html_assets.HTMLTag] = []
+        self.script_paths: list[PurePosixPath] = []
+
+
+def _get_script_groups(
+    page_path: PurePosixPath, page: str, *, site_deploy_directory: Path
+) -> Sequence[_ScriptGroup]:
+    """
+    Group the given page's bundleable scripts, split by any script that must run between them.
+
+    Only synchronous, same-site, classic scripts are bundled (without any other attributes).
+    Scripts starting with a `"use strict"` directive are never bundled with others,
+    because bundling would apply the directive to every following script.
+    """
+    script_groups: list[_ScriptGroup] = [_ScriptGroup()]
+
+    script_tag: html_assets.HTMLTag
+    for script_tag in html_assets.parse_tags(page, tag_names={"script"}):
+        if script_tag.is_in_noscript or not _is_classic_script(script_tag):
+            continue
+
+        script_path: PurePosixPath | None = html_assets.resolve_asset_path(
+            page_path, script_tag.get_attribute("src") or ""
+        )
+        is_bundleable: bool = (
+            script_path is not None
+            and script_tag.attributes.keys() <= BUNDLED_SCRIPT_ATTRIBUTES
+            and (site_deploy_directory / script_path).is_file()
+        )
+        if script_path is None or not is_bundleable:
+            if _is_synchronous_script(script_tag):
+                script_groups.append(_ScriptGroup())
+            continue
+
+        is_strict: bool = (
+            _USE_STRICT_PATTERN.match(
+                (site_deploy_directory / script_path).read_text(encoding="utf-8")
+            )
+            is not None
+        )
+        if is_strict and script_groups[-1].script_tags:
+            script_groups.append(_ScriptGroup())
+
+        script_groups[-1].script_tags.append(script_tag)
+        script_groups[-1].script_paths.append(script_path)
+
+        if is_strict:
+            script_groups.append(_ScriptGroup())
+
+    return [script_group for script_group in script_groups if script_group.script_tags]
+
+
+def _get_removed_script_tag(page: str, script_tag: html_assets.HTMLTag) -> html_assets.HTMLTag:
+    """Extend the given (external) script's start tag to include its end tag."""
+    end_tag_match: Final[re.Match[str] | None] = _SCRIPT_END_TAG_PATTERN.match(
+        page, script_tag.end_offset
+    )
+
+    return (
+        script_tag._replace(end_offset=end_tag_match.end())
+        if end_tag_match is not None
+        else script_tag
+    )
+
+
+def _bundle_page_scripts(
+    page_path: PurePosixPath,
+    page: str,
+    *,
+    site_deploy_directory: Path,
+    bundle_paths: MutableMapping[str, PurePosixPath],
+) -> str:
+    """
+    Replace each group of the given page's scripts with a single bundle.
+
+    Each bundle is placed where the last script of its group was.
+    The last bundle is deferred, unless anything could depend on it running during parsing:
+    any following synchronous script (whether inline or external, bundled or not),
+    any other deferred script, or a call to `document.write()`.
+    """
+    script_groups: Final[Sequence[_ScriptGroup]] = _get_script_groups(
+        page_path, page, site_deploy_directory=site_deploy_directory
+    )
+    executed_script_tags: Final[Sequence[html_assets.HTMLTag]] = [
+        script_tag
+        for script_tag in html_assets.parse_tags(page, tag_names={"script"})
+        if not script_tag.is_in_noscript
+    ]
+    has_deferred_scripts: Final[bool] = any(
+        _is_deferred_script(script_tag) for script_tag in executed_script_tags
+    )
+    replacements: MutableSequence[tuple[html_assets.HTMLTag, str]] = []
+
+    script_group: _ScriptGroup
+    for script_group in script_groups:
+        bundle: str = _get_bundle(
+            [site_deploy_directory / script_path for script_path in script_group.script_paths]
+        )
+        bundle_hash: str = hashlib.sha256(bundle.encode("utf-8")).hexdigest()
+
+        if bundle_hash not in bundle_paths:
+            bundle_paths[bundle_hash] = BUNDLE_DIRECTORY / f"bundle-{bundle_hash[:16]}.js"
+            deploy_files.detach_deploy_file(
+                site_deploy_directory, bundle_paths[bundle_hash]
+            ).write_text(bundle, encoding="utf-8")
+
+        is_deferrable: bool = (
+            script_group is script_groups[-1]
+            and not any(
+                _is_classic_script(script_tag)
+                and _is_synchronous_script(script_tag)
+                and script_tag.start_offset > script_group.script_tags[-1].start_offset
+                for script_tag in executed_script_tags
+            )
+            and not has_deferred_scripts
+            and "document.write" not in bundle
+        )
+
+        replacements.extend(
+            (_get_removed_script_tag(page, script_tag), "")
+            for script_tag in script_group.script_tags[:-1]
+        )
+        replacements.append(
+            (
+                _get_removed_script_tag(page, script_group.script_tags[-1]),
+                html_assets.format_start_tag(
+                    "script",
+                    {"src": f"/{bundle_paths[bundle_hash]}"}
+                    | ({"defer": None} if is_deferrable else {}),
+                )
+                + "</script>",
+            )
+        )
+
+    return html_assets.replace_tags(page, replacements)
+
+
+def bundle_site_scripts(*, site_deploy_directory: Path) -> AbstractSet[PurePosixPath]:
+    """
+    Bundle the classic scripts of every page of the given built site.
+
+    Identical bundles are shared between pages. Returns the paths of the created bundles.
+    """
+    bundle_paths: Final[MutableMapping[str, PurePosixPath]] = {}
+
+    page_path: PurePosixPath
+    for page_path in deploy_files.get_site_file_paths(site_deploy_directory):
+        if page_path.suffix != ".html":
+            continue
+
+        page: str = (site_deploy_directory / page_path).read_text(encoding="utf-8")
+        bundled_page: str = _bundle_page_scripts(
+            page_path,
+            page,
+            site_deploy_directory=site_deploy_directory,
+            bundle_paths=bundle_paths,
+        )
+        if bundled_page != page:
+            deploy_files.detach_deploy_file(site_deploy_directory, page_path).write_text(
+                bundled_page, encoding="utf-8"
+            )
+
+    SITE_LOGGER: Final[LoggerAdapter[Logger]] = logging_setup.get_context_logger(
+        site_deploy_directory.name
+    )
+    SITE_LOGGER.debug("Bundled the site's scripts (%d bundle(s)).", len(bundle_paths))
+
+    return set(bundle_paths.values())
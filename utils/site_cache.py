@@ -0,0 +1,180 @@
+"""Cache of each site's rendered pages, keyed by a fingerprint of every input of the site."""
+
+import functools
+import importlib.metadata
+import json
+import logging
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING
+
+import utils
+from sites import SITE_MODULE_NAMES
+from utils import PROJECT_ROOT, cache, manifest
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+    from logging import Logger
+    from pathlib import Path
+    from typing import Final
+
+__all__: Sequence[str] = (
+    "clear_shared_fingerprint",
+    "get_site_fingerprint",
+    "load_site_pages",
+    "store_site_pages",
+)
+
+
+logger: Final[Logger] = logging.getLogger("static-websites-builder")
+
+SHARED_SOURCE_PATHS: Final[Sequence[PurePosixPath]] = (
+    PurePosixPath("build.py"),
+    PurePosixPath("components"),
+    PurePosixPath("sites/__init__.py"),
+    PurePosixPath("utils/__init__.py"),
+    PurePosixPath("utils/html_assets.py"),
+    PurePosixPath("utils/image_dimensions.py"),
+    PurePosixPath("utils/page_stages"),
+)
+FINGERPRINTED_DISTRIBUTION_NAMES: Final[Sequence[str]] = ("htpy", "markupsafe")
+
+
+@functools.cache
+def _get_shared_fingerprint_parts() -> Sequence[bytes | str]:
+    """
+    Get the fingerprint parts that are shared by every site, which are only read once.
+
+    These are the sources of the components & build code used to render every site,
+    and the installed versions of the HTML-generating libraries.
+    """
+    fingerprint_parts: list[bytes | str] = []
+
+    shared_source_path: PurePosixPath
+    for shared_source_path in SHARED_SOURCE_PATHS:
+        full_shared_source_path: Path = PROJECT_ROOT / shared_source_path
+
+        source_file_path: Path
+        for source_file_path in (
+            sorted(full_shared_source_path.rglob("*.py"))
+            if full_shared_source_path.is_dir()
+            else (full_shared_source_path,)
+        ):
+            fingerprint_parts.extend(
+                (
+                    source_file_path.relative_to(PROJECT_ROOT).as_posix(),
+                    source_file_path.read_bytes(),
+                )
+            )
+
+    distribution_name: str
+    for distribution_name in FINGERPRINTED_DISTRIBUTION_NAMES:
+        fingerprint_parts.extend(
+            (distribution_name, importlib.metadata.version(distribution_name))
+        )
+
+    return fingerprint_parts
+
+
+def clear_shared_fingerprint() -> None:
+    """
+    Forget the fingerprint parts shared by every site, so that they are read again when used.
+
+    Long-running processes (e.g. watch mode) must call this whenever a shared source changes.
+    """
+    _get_shared_fingerprint_parts.cache_clear()
+
+
+def _get_static_fingerprint_parts(site_name: str) -> Sequence[str]:
+    """
+    Get the fingerprint parts of the given site's static files, which page stages may read.
+
+    Each file's content hash is reused from the manifest's hash cache where possible,
+    so unchanged static files are not read again.
+    """
+    STATIC_DIRECTORY: Final[Path] = PROJECT_ROOT / "static" / site_name
+
+    return [
+        fingerprint_part
+        for static_file_path in sorted(STATIC_DIRECTORY.rglob("*"))
+        if static_file_path.is_file()
+        for fingerprint_part in (
+            static_file_path.relative_to(STATIC_DIRECTORY).as_posix(),
+            manifest.hash_linked_file(static_file_path),
+        )
+    ]
+
+
+def get_site_fingerprint(site_name: str) -> str:
+    """
+    Get the fingerprint of every input that the given site's rendered pages depend upon.
+
+    This can be calculated without importing the site's module,
+    so that unchanged sites can be restored from the cache without ever being rendered.
+    Alongside the sources, static files & library versions, the copyright year is included
+    (which comes from `SOURCE_DATE_EPOCH`, if it is set).
+    """
+    SITE_MODULE_PATH: Final[Path] = (
+        PROJECT_ROOT / "sites" / f"{SITE_MODULE_NAMES[site_name]}.py"
+    )
+
+    return cache.get_cache_key(
+        site_name,
+        SITE_MODULE_PATH.read_bytes(),
+        *_get_shared_fingerprint_parts(),
+        *_get_static_fingerprint_parts(site_name),
+        str(utils.get_current_year()),
+    )
+
+
+def load_site_pages(site_fingerprint: str) -> Mapping[PurePosixPath, bytes] | None:
+    """
+    Load the rendered pages of the site build with the given fingerprint.
+
+    `None` is returned if the site has not been built with this fingerprint,
+    or if any of its pages have since been evicted from the cache.
+    """
+    raw_site_index: bytes | None = cache.load("site_builds", site_fingerprint)
+    if raw_site_index is None:
+        return None
+
+    site_pages: dict[PurePosixPath, bytes] = {}
+
+    raw_page_path: str
+    page_key: str
+    for raw_page_path, page_key in json.loads(raw_site_index)["pages"].items():
+        page_content: bytes | None = cache.load("pages", page_key)
+        if page_content is None:
+            logger.debug("Cached page %s has been evicted, so ignoring cache.", raw_page_path)
+            return None
+
+        site_pages[PurePosixPath(raw_page_path)] = page_content
+
+    return site_pages
+
+
+def store_site_pages(
+    site_fingerprint: str, *, site_deploy_directory: Path, page_paths: Iterable[PurePosixPath]
+) -> None:
+    """
+    Save the given rendered pages from a site's `deploy/` directory into the cache.
+
+    Each page is stored by the hash of its content, so identical pages are only stored once,
+    and are shared between every site build that rendered them.
+    """
+    page_keys: dict[str, str] = {}
+
+    page_path: PurePosixPath
+    for page_path in page_paths:
+        page_content: bytes = (site_deploy_directory / page_path).read_bytes()
+        page_key: str = cache.get_cache_key(page_content)
+
+        if cache.get_cached_path("pages", page_key) is None:
+            cache.store("pages", page_key, page_content)
+
+        page_keys[page_path.as_posix()] = page_key
+
+    cache.store(
+        "site_builds",
+        site_fingerprint,
+        json.dumps({"pages": page_keys}, sort_keys=True).encode("utf-8"),
+    )
@@ -0,0 +1,127 @@
+"""Asyncio-native subprocess runner that streams output line by line as it is produced."""
+
+import asyncio
+import collections
+import contextlib
+import os
+import re
+import signal
+from subprocess import CalledProcessError
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from asyncio.subprocess import Process
+    from collections.abc import AsyncIterator, Callable, Sequence
+    from typing import Final
+
+__all__: Sequence[str] = ("run_streamed_subprocess",)
+
+
+READ_CHUNK_SIZE: Final[int] = 4096
+STDERR_TAIL_LINE_COUNT: Final[int] = 20
+TERMINATION_GRACE_PERIOD: Final[float] = 5.0
+
+_LINE_SEPARATOR_PATTERN: Final[re.Pattern[str]] = re.compile(r"[\r\n]")
+
+
+async def _iterate_lines(stream: asyncio.StreamReader) -> AsyncIterator[str]:
+    """
+    Yield each non-empty line from the given stream as soon as it is complete.
+
+    Carriage returns are treated as line separators,
+    so that in-place progress updates are yielded individually.
+    """
+    partial_line: str = ""
+
+    while chunk := await stream.read(READ_CHUNK_SIZE):
+        lines: list[str] = _LINE_SEPARATOR_PATTERN.split(
+            partial_line + chunk.decode("utf-8", errors="replace")
+        )
+        partial_line = lines.pop()
+
+        line: str
+        for line in lines:
+            if line.strip():
+                yield line
+
+    if partial_line.strip():
+        yield partial_line
+
+
+async def _terminate_process_group(process: Process) -> None:
+    """
+    Terminate the given process, along with any children it has spawned (e.g. `ssh`).
+
+    The process group is sent `SIGTERM`,
+    then `SIGKILL` if it has not exited within the grace period.
+    """
+    with contextlib.suppress(ProcessLookupError):
+        os.killpg(process.pid, signal.SIGTERM)
+
+    try:
+        await asyncio.wait_for(process.wait(), TERMINATION_GRACE_PERIOD)
+    except TimeoutError:
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, signal.SIGKILL)
+
+        await process.wait()
+
+
+async def run_streamed_subprocess(
+    args: Sequence[str],
+    *,
+    on_stdout_line: Callable[[str], None],
+    on_stderr_line: Callable[[str], None],
+) -> None:
+    """
+    Run the given command, passing each line of its output to the given callbacks.
+
+    Output is never buffered in full; only the last few lines of stderr are kept,
+    to be attached to the raised `CalledProcessError` if the command fails.
+    The command is started in its own process group; if the awaiting task is cancelled
+    (e.g. by Ctrl-C), the whole group is terminated and reaped
+    before the cancellation propagates.
+
+    Raises:
+        FileNotFoundError: If the command could not be found.
+        CalledProcessError: If the command exits with a non-zero return code.
+    """
+    process: Final[Process] = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+
+    stderr_tail: Final[collections.deque[str]] = collections.deque(
+        maxlen=STDERR_TAIL_LINE_COUNT
+    )
+
+    def _handle_stderr_line(line: str) -> None:
+        stderr_tail.append(line)
+        on_stderr_line(line)
+
+    async def _consume_stream(
+        stream: asyncio.StreamReader | None, on_line: Callable[[str], None]
+    ) -> None:
+        if stream is None:
+            return
+
+        line: str
+        async for line in _iterate_lines(stream):
+            on_line(line)
+
+    try:
+        await asyncio.gather(
+            _consume_stream(process.stdout, on_stdout_line),
+            _consume_stream(process.stderr, _handle_stderr_line),
+        )
+        return_code: int = await process.wait()
+    except BaseException:
+        if process.returncode is None:
+            await asyncio.shield(_terminate_process_group(process))
+        raise
+
+    if return_code != 0:
+        raise CalledProcessError(return_code, args, stderr="\n".join(stderr_tail))
@@ -0,0 +1,262 @@
+"""Lightweight timing spans for build & deploy phases, exportable as a Chrome trace."""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Mapping, Sequence
+    from logging import Logger
+    from pathlib import Path
+    from typing import Final
+
+__all__: Sequence[str] = (
+    "Span",
+    "clear",
+    "export_chrome_trace",
+    "get_spans",
+    "log_site_summary",
+    "span",
+)
+
+
+logger: Final[Logger] = logging.getLogger("static-websites-builder")
+
+_spans: Final[list[Span]] = []
+_spans_lock: Final[threading.Lock] = threading.Lock()
+
+
+class Span(NamedTuple):
+    """A single completed, timed phase of the build or deployment of a site."""
+
+    name: str
+    phase: str
+    site_name: str | None
+    page_path: str | None
+    start_time: float
+    duration: float
+    lane: str
+    attributes: Mapping[str, int | str]
+
+    @property
+    def end_time(self) -> float:
+        """The `time.perf_counter()` value at which this span finished."""
+        return self.start_time + self.duration
+
+
+def _get_current_lane() -> str:
+    """
+    Get the name of the timeline lane that spans started here should be displayed in.
+
+    Each thread has its own lane, as does each asyncio task,
+    because concurrent tasks on the same thread would otherwise overlap on one lane.
+    """
+    try:
+        current_task: asyncio.Task[object] | None = asyncio.current_task()
+    except RuntimeError:
+        current_task = None
+
+    if current_task is not None:
+        return f"{threading.current_thread().name}/{current_task.get_name()}"
+
+    return threading.current_thread().name
+
+
+@contextlib.contextmanager
+def span(
+    name: str,
+    *,
+    phase: str,
+    site_name: str | None = None,
+    page_path: str | None = None,
+    **attributes: int | str,
+) -> Iterator[dict[str, int | str]]:
+    """
+    Time the code run within this context as a span of the given phase.
+
+    The yielded attributes dictionary can be updated within the context
+    (e.g. with the number of bytes written), and is stored alongside the span's timings.
+    The span is recorded even if the context exits with an exception,
+    with an `error` attribute naming the exception type.
+    """
+    span_attributes: dict[str, int | str] = dict(attributes)
+    lane: Final[str] = _get_current_lane()
+    start_time: Final[float] = time.perf_counter()
+
+    caught_exception: BaseException
+    try:
+        yield span_attributes
+    except BaseException as caught_exception:
+        span_attributes["error"] = type(caught_exception).__name__
+        raise
+    finally:
+        completed_span: Span = Span(
+            name=name,
+            phase=phase,
+            site_name=site_name,
+            page_path=page_path,
+            start_time=start_time,
+            duration=time.perf_counter() - start_time,
+            lane=lane,
+            attributes=span_attributes,
+        )
+
+        with _spans_lock:
+            _spans.append(completed_span)
+
+
+def get_spans() -> Sequence[Span]:
+    """Get every span recorded so far, in the order that they finished."""
+    with _spans_lock:
+        return tuple(_spans)
+
+
+def clear() -> None:
+    """Discard every recorded span."""
+    with _spans_lock:
+        _spans.clear()
+
+
+def export_chrome_trace(trace_file_path: Path, spans: Iterable[Span] | None = None) -> None:
+    """
+    Save the given spans (or every recorded span) as a Chrome trace-event JSON file.
+
+    The file can be opened in Perfetto (`ui.perfetto.dev`) or `chrome://tracing`,
+    to see parallel builds & concurrent deployments on a single timeline.
+    """
+    EXPORTED_SPANS: Final[Sequence[Span]] = tuple(get_spans() if spans is None else spans)
+    TRACE_START_TIME: Final[float] = min(
+        (exported_span.start_time for exported_span in EXPORTED_SPANS), default=0.0
+    )
+    LANE_IDS: Final[Mapping[str, int]] = {
+        lane: lane_id
+        for lane_id, lane in enumerate(
+            dict.fromkeys(exported_span.lane for exported_span in EXPORTED_SPANS), start=1
+        )
+    }
+
+    trace_events: list[Mapping[str, object]] = [
+        {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "tid": lane_id,
+            "args": {"name": lane},
+        }
+        for lane, lane_id in LANE_IDS.items()
+    ]
+    trace_events.extend(
+        {
+            "name": (
+                f"{exported_span.name} ({exported_span.page_path or exported_span.site_name})"
+                if exported_span.page_path or exported_span.site_name
+                else exported_span.name
+            ),
+            "cat": exported_span.phase,
+            "ph": "X",
+            "ts": (exported_span.start_time - TRACE_START_TIME) * 1_000_000,
+            "dur": exported_span.duration * 1_000_000,
+            "pid": os.getpid(),
+            "tid": LANE_IDS[exported_span.lane],
+            "args": {
+                **(
+                    {"site_name": exported_span.site_name}
+                    if exported_span.site_name is not None
+                    else {}
+                ),
+                **(
+                    {"page_path": exported_span.page_path}
+                    if exported_span.page_path is not None
+                    else {}
+                ),
+                **exported_span.attributes,
+            },
+        }
+        for exported_span in sorted(
+            EXPORTED_SPANS, key=lambda exported_span: exported_span.start_time
+        )
+    )
+
+    trace_file_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_trace_file_path: Path = trace_file_path.with_name(f"{trace_file_path.name}.tmp")
+    temporary_trace_file_path.write_text(
+        json.dumps({"traceEvents": trace_events, "displayTimeUnit": "ms"}), encoding="utf-8"
+    )
+    temporary_trace_file_path.replace(trace_file_path)
+
+
+def _get_phase_extent(spans: Iterable[Span]) -> float | None:
+    """Get the wall-clock time from the start of the first span to the end of the last."""
+    extent_spans: Final[Sequence[Span]] = tuple(spans)
+    if not extent_spans:
+        return None
+
+    return max(extent_span.end_time for extent_span in extent_spans) - min(
+        extent_span.start_time for extent_span in extent_spans
+    )
+
+
+def log_site_summary(spans: Iterable[Span] | None = None) -> None:
+    """
+    Log a table of the build & deploy durations of each site, at INFO level.
+
+    A site deployed to several servers concurrently is given the wall-clock time
+    from the start of its first upload to the end of its last.
+    """
+    SUMMARISED_SPANS: Final[Sequence[Span]] = tuple(get_spans() if spans is None else spans)
+    SITE_NAMES: Final[Sequence[str]] = sorted(
+        {
+            summarised_span.site_name
+            for summarised_span in SUMMARISED_SPANS
+            if summarised_span.site_name is not None
+        }
+    )
+    if not SITE_NAMES:
+        return
+
+    SITE_NAME_COLUMN_WIDTH: Final[int] = max(len("Site"), *map(len, SITE_NAMES))
+
+    def _format_duration(duration: float | None) -> str:
+        return f"{duration * 1000:>9.1f}ms" if duration is not None else f"{'-':>11}"
+
+    summary_lines: list[str] = [
+        (
+            f"{'Site':<{SITE_NAME_COLUMN_WIDTH}}  {'Pages':>5}  {'HTML bytes':>10}  "
+            f"{'Build':>11}  {'Deploy':>11}  {'Promote':>11}"
+        )
+    ]
+
+    site_name: str
+    for site_name in SITE_NAMES:
+        site_spans: Sequence[Span] = [
+            summarised_span
+            for summarised_span in SUMMARISED_SPANS
+            if summarised_span.site_name == site_name
+        ]
+        page_spans: Sequence[Span] = [
+            site_span for site_span in site_spans if site_span.phase == "build-page"
+        ]
+
+        html_byte_count: int = sum(
+            int(page_span.attributes.get("bytes", 0)) for page_span in page_spans
+        )
+
+        summary_lines.append(
+            f"{site_name:<{SITE_NAME_COLUMN_WIDTH}}  {len(page_spans):>5d}  "
+            f"{html_byte_count:>10d}  "
+            + "  ".join(
+                _format_duration(
+                    _get_phase_extent(
+                        site_span for site_span in site_spans if site_span.phase == phase
+                    )
+                )
+                for phase in ("build", "deploy", "promote")
+            )
+        )
+
+    logger.info("Per-site timings:\n%s", "\n".join(summary_lines))
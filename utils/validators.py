@@ -2,10 +2,11 @@
 
 import abc
 import re
-import socket
 from pathlib import Path
 from typing import TYPE_CHECKING, final, overload, override
 
+from . import resolver
+
 if TYPE_CHECKING:
     from collections.abc import Sequence
     from typing import Final
@@ -58,9 +59,11 @@ class SimpleValidator[T](abc.ABC):
     @override
     def __init__(self, value: T, /) -> None:
         """Validate and store the cleaned wrapped value."""
-        self.validate(value)
+        cleaned_value: T = self.clean(value)
+
+        self._validate(value=cleaned_value)
 
-        self._value: T = self.clean(value)
+        self._value: T = cleaned_value
 
     @override
     def __str__(self) -> str:
@@ -125,13 +128,23 @@ class Hostname(_StrippedStringValidator):
     @classmethod
     @override
     def _validate(cls, value: str) -> None:
-        hostname_error: socket.gaierror
+        hostname_error: OSError | UnicodeError
         try:
-            socket.gethostbyname(value)
-        except socket.gaierror as hostname_error:
+            resolver.resolve_hostname(value)
+        except (OSError, UnicodeError) as hostname_error:
             INVALID_HOSTNAME_MESSAGE: Final[str] = "Invalid hostname."
             raise ValueError(INVALID_HOSTNAME_MESSAGE) from hostname_error
 
+    @property
+    def resolved_address(self) -> str:
+        """
+        The IP address that this hostname resolves to.
+
+        Resolutions are cached, so this does not perform another lookup
+        of the address that was resolved when validating this hostname.
+        """
+        return resolver.resolve_hostname(self._value)
+
 
 class Username(_StrippedStringValidator):
     """Wrapper validator holding an SSH remote username string."""
@@ -0,0 +1,288 @@
+"""Rebuild each site whenever its sources change, reloading its pages open in a browser."""
+
+import argparse
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING
+
+import build
+import serve
+from sites import SITE_MODULE_NAMES, SITES_MAP
+from utils import PROJECT_ROOT, change_detection, logging_setup, site_cache
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+    from collections.abc import Set as AbstractSet
+    from logging import Logger
+    from pathlib import Path
+    from typing import Final
+
+__all__: Sequence[str] = ("get_changed_paths", "rebuild_changed_sites", "run", "watch")
+
+
+logger: Final[Logger] = logging.getLogger("static-websites-builder")
+
+WATCHED_PATHS: Final[Sequence[PurePosixPath]] = (
+    PurePosixPath("components"),
+    PurePosixPath("sites"),
+    PurePosixPath("static"),
+)
+DEFAULT_POLL_INTERVAL: Final[float] = 0.1
+DEFAULT_WORKER_COUNT: Final[int] = 16
+
+type _Snapshot = Mapping[PurePosixPath, tuple[int, int]]
+
+
+def _take_snapshot() -> _Snapshot:
+    """Get the modification time & size of every watched file, relative to the project root."""
+    snapshot: dict[PurePosixPath, tuple[int, int]] = {}
+
+    watched_path: PurePosixPath
+    for watched_path in WATCHED_PATHS:
+        directory_path: str
+        directory_names: list[str]
+        file_names: list[str]
+        for directory_path, directory_names, file_names in os.walk(
+            PROJECT_ROOT / watched_path
+        ):
+            directory_names[:] = [
+                directory_name
+                for directory_name in directory_names
+                if directory_name != "__pycache__"
+            ]
+
+            file_name: str
+            for file_name in file_names:
+                file_path: Path = PROJECT_ROOT / directory_path / file_name
+
+                try:
+                    file_stat: os.stat_result = file_path.stat()
+                except FileNotFoundError:
+                    continue
+
+                snapshot[PurePosixPath(file_path.relative_to(PROJECT_ROOT).as_posix())] = (
+                    file_stat.st_mtime_ns,
+                    file_stat.st_size,
+                )
+
+    return snapshot
+
+
+def get_changed_paths(
+    previous_snapshot: _Snapshot, current_snapshot: _Snapshot
+) -> AbstractSet[PurePosixPath]:
+    """Get the paths of every file that was created, modified or deleted between snapshots."""
+    return {
+        file_path
+        for file_path in previous_snapshot.keys() | current_snapshot.keys()
+        if previous_snapshot.get(file_path) != current_snapshot.get(file_path)
+    }
+
+
+def _unload_site_modules(site_names: Iterable[str], *, unload_components: bool) -> None:
+    """
+    Remove the given sites' modules, so that their pages are imported & rendered again.
+
+    The `components` package must also be unloaded whenever it changes,
+    because each site module holds its own references to the components it imports.
+    """
+    UNLOADED_MODULE_NAMES: Final[AbstractSet[str]] = {
+        f"sites.{SITE_MODULE_NAMES[site_name]}" for site_name in site_names
+    }
+
+    module_name: str
+    for module_name in list(sys.modules):
+        if module_name in UNLOADED_MODULE_NAMES or (
+            unload_components
+            and (module_name == "components" or module_name.startswith("components."))
+        ):
+            del sys.modules[module_name]
+
+    importlib.invalidate_caches()
+
+
+def rebuild_changed_sites(
+    changed_paths: AbstractSet[PurePosixPath], *, site_names: AbstractSet[str]
+) -> AbstractSet[str]:
+    """
+    Rebuild only those of the given sites that are affected by the given changed paths.
+
+    Returns the names of the sites that were successfully rebuilt.
+    """
+    affected_site_names: Final[AbstractSet[str]] = (
+        change_detection.get_affected_site_names(changed_paths) & site_names
+    )
+    if not affected_site_names:
+        return frozenset()
+
+    if PurePosixPath("sites/__init__.py") in changed_paths:
+        logger.warning(
+            "Changes to `sites/__init__.py` (e.g. adding a site) "
+            "are only picked up by restarting watch mode."
+        )
+
+    SHARED_SOURCES_CHANGED: Final[bool] = any(
+        changed_path.is_relative_to("components") for changed_path in changed_paths
+    )
+    if SHARED_SOURCES_CHANGED:
+        site_cache.clear_shared_fingerprint()
+
+    _unload_site_modules(affected_site_names, unload_components=SHARED_SOURCES_CHANGED)
+
+    start_time: Final[float] = time.perf_counter()
+    rebuilt_site_names: Final[AbstractSet[str]] = {
+        site_deploy_directory.name
+        for site_deploy_directory in build.build_all_sites(site_names=affected_site_names)
+    }
+
+    logger.info(
+        "Rebuilt %s in %.0fms.",
+        ", ".join(sorted(rebuilt_site_names)) or "no sites",
+        (time.perf_counter() - start_time) * 1000,
+    )
+
+    return rebuilt_site_names
+
+
+def watch(
+    *,
+    site_names: AbstractSet[str],
+    stop_event: threading.Event,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    live_reload_broadcaster: serve.LiveReloadBroadcaster | None = None,
+) -> None:
+    """
+    Poll the watched sources for changes, rebuilding the affected sites, until stopped.
+
+    Polling (rather than inotify) is used, so that no extra dependencies are required;
+    the watched sources are small enough that each poll only takes a few milliseconds.
+    """
+    snapshot: _Snapshot = _take_snapshot()
+
+    while not stop_event.wait(poll_interval):
+        current_snapshot: _Snapshot = _take_snapshot()
+        changed_paths: AbstractSet[PurePosixPath] = get_changed_paths(
+            snapshot, current_snapshot
+        )
+        snapshot = current_snapshot
+
+        if not changed_paths:
+            continue
+
+        logger.debug("Detected changes: %s", ", ".join(map(str, sorted(changed_paths))))
+
+        try:
+            rebuilt_site_names: AbstractSet[str] = rebuild_changed_sites(
+                changed_paths, site_names=site_names
+            )
+        except Exception:
+            # NOTE: Half-saved edits can raise almost anything when their site is imported
+            # (e.g. `NameError` or `KeyError`), but should not stop watching,
+            # so log the traceback & wait for the next change
+            logger.exception("Rebuilding failed.")
+            continue
+
+        if live_reload_broadcaster is not None and rebuilt_site_names:
+            live_reload_broadcaster.notify_reload(rebuilt_site_names)
+
+
+def _get_argument_parser() -> argparse.ArgumentParser:
+    argument_parser: Final[argparse.ArgumentParser] = argparse.ArgumentParser(
+        prog="python -m watch", description=__doc__
+    )
+    argument_parser.add_argument(
+        "--site",
+        choices=list(SITES_MAP),
+        help="Only build & serve this site, regardless of the Host header of each request.",
+    )
+    argument_parser.add_argument(
+        "--host",
+        default=serve.DEFAULT_HOST,
+        help="Address for the preview server to listen on. (Default: %(default)s)",
+    )
+    argument_parser.add_argument(
+        "--port",
+        type=int,
+        default=serve.DEFAULT_PORT,
+        help="Port for the preview server to listen on. (Default: %(default)d)",
+    )
+    argument_parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKER_COUNT,
+        help=(
+            "Number of preview server worker threads (each open page holds one). "
+            "(Default: %(default)d)"
+        ),
+    )
+    argument_parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help="Seconds between each poll for changes. (Default: %(default)s)",
+    )
+    argument_parser.add_argument(
+        "--verbose",
+        "-v",
+        action="count",
+        default=0,
+        help="Log every detected change & request (at debug level).",
+    )
+    return argument_parser
+
+
+def run(argv: Sequence[str] | None = None) -> int:
+    """Build the chosen sites, then serve them whilst rebuilding them as they change."""
+    parsed_arguments: Final[argparse.Namespace] = _get_argument_parser().parse_args(argv)
+
+    logging_setup.setup(verbosity=2 if parsed_arguments.verbose else 1)
+
+    if parsed_arguments.interval <= 0:
+        INVALID_POLL_INTERVAL_MESSAGE: Final[str] = "Poll interval must be positive."
+        raise ValueError(INVALID_POLL_INTERVAL_MESSAGE)
+
+    SITE_NAMES: Final[AbstractSet[str]] = (
+        frozenset({parsed_arguments.site})
+        if parsed_arguments.site is not None
+        else frozenset(SITES_MAP)
+    )
+
+    build.build_all_sites(site_names=SITE_NAMES)
+
+    LIVE_RELOAD_BROADCASTER: Final[serve.LiveReloadBroadcaster] = serve.LiveReloadBroadcaster()
+    STOP_EVENT: Final[threading.Event] = threading.Event()
+    WATCHER_THREAD: Final[threading.Thread] = threading.Thread(
+        target=watch,
+        kwargs={
+            "site_names": SITE_NAMES,
+            "stop_event": STOP_EVENT,
+            "poll_interval": parsed_arguments.interval,
+            "live_reload_broadcaster": LIVE_RELOAD_BROADCASTER,
+        },
+        name="watcher",
+        daemon=True,
+    )
+    WATCHER_THREAD.start()
+
+    try:
+        serve.serve(
+            site_name=parsed_arguments.site,
+            host=parsed_arguments.host,
+            port=parsed_arguments.port,
+            worker_count=parsed_arguments.workers,
+            live_reload_broadcaster=LIVE_RELOAD_BROADCASTER,
+        )
+    finally:
+        STOP_EVENT.set()
+        WATCHER_THREAD.join()
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())